@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark bkmkorg.bibtex.latex against the conversions it replaced.
+Not collected by pytest. Run with:
+python -m bkmkorg.bibtex.__tests.bench_latex
+"""
+##-- imports
+from __future__ import annotations
+
+import random
+import re
+import timeit
+
+import regex
+from bibtexparser import customization as bib_customization
+from bibtexparser import latexenc
+
+from bkmkorg.bibtex import latex
+##-- end imports
+
+NEWLINE_RE = regex.compile(r"\n+\s*")
+
+def original_string_to_latex(string):
+    if string.isascii():
+        return string
+    return "".join(char if char.isascii() or char in [' ', '{', '}'] else latexenc.unicode_to_latex_map.get(char, char)
+                   for char in string)
+
+def original_to_unicode(entry):
+    entry = bib_customization.convert_to_unicode(entry)
+    entry.update({k: NEWLINE_RE.sub(" ", v) for k, v in entry.items()})
+    return entry
+
+def make_entries(count:int, seed:int=0) -> list[dict]:
+    """ Entries with repeating journals and publishers, and some latex """
+    rand       = random.Random(seed)
+    journals   = [f"Journal of {{Things}} {i}" for i in range(50)]
+    publishers = ["Oxford University Press", "Presses Universitaires de France", "Springer-Verlag", "G\\\"ottingen Verlag"]
+    accents    = ["\\'{e}", "\\\"{o}", "\\c{c}", "\\`{a}", "", "", ""]
+    entries    = []
+    for i in range(count):
+        entries.append({
+            "ID"        : f"key_{i}",
+            "ENTRYTYPE" : "article",
+            "author"    : f"Sm{rand.choice(accents)}ith, John and D{rand.choice(accents)}oe, Jane",
+            "title"     : f"A {{Title}} about caf{rand.choice(accents)} number {i}\n   continued",
+            "journal"   : rand.choice(journals),
+            "publisher" : rand.choice(publishers),
+            "year"      : str(1900 + i % 120),
+            "tags"      : "ai,history",
+        })
+    return entries
+
+def clear():
+    latex.latex_to_unicode.cache_clear()
+    latex.field_to_unicode.cache_clear()
+    latex.string_to_latex.cache_clear()
+
+def bench(count:int=2000, repeat:int=3):
+    entries = make_entries(count)
+    unicode = [original_to_unicode(dict(x)) for x in entries]
+    fields  = [v for x in unicode for v in x.values()]
+
+    def run(name, fn):
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print(f"{name:<40} : {best:.4f}s")
+        return best
+
+    print(f"-- {count} entries")
+    old = run("bibtexparser convert_to_unicode", lambda: [original_to_unicode(dict(x)) for x in entries])
+    new = run("entry_to_unicode (cold cache)", lambda: (clear(), [latex.entry_to_unicode(dict(x)) for x in entries]))
+    run("entry_to_unicode (warm cache)", lambda: [latex.entry_to_unicode(dict(x)) for x in entries])
+    print(f"{'speedup (cold)':<40} : {old / new:.1f}x")
+
+    old = run("per character string_to_latex", lambda: [original_string_to_latex(x) for x in fields])
+    new = run("translate string_to_latex (cold cache)", lambda: (clear(), [latex.string_to_latex(x) for x in fields]))
+    print(f"{'speedup':<40} : {old / new:.1f}x")
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,78 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import inspect
+import logging as logmod
+import os
+import pathlib as pl
+import tempfile
+
+from bkmkorg.bibtex.cache import BibCache, pipeline_id
+from bkmkorg.bibtex.clean import BibEntryPreprocess
+from bkmkorg.bibtex.tokenizer import BibTokenizer
+
+class TestBibCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp   = tempfile.TemporaryDirectory()
+        root       = pl.Path(self.tmp.name)
+        self.bib   = root / "2001.bib"
+        self.bib.write_text("@book{a, title = {A}, tags = {x,y}}")
+        self.fn    = BibEntryPreprocess(root)
+        self.cache = BibCache(root / "cache", pipeline_id(self.fn))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def parse(self):
+        db = BibTokenizer(customization=self.fn, crossref=False).parse_file(self.bib)
+        self.cache.put(self.bib, db)
+        return db
+
+    def test_hit(self):
+        self.assertIsNone(self.cache.get(self.bib))
+        self.parse()
+        cached = self.cache.get(self.bib)
+        self.assertEqual(cached.entries[0]['__tags'], {"x", "y"})
+
+    def test_touched_unchanged(self):
+        self.parse()
+        stat = self.bib.stat()
+        os.utime(self.bib, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+        self.assertIsNotNone(self.cache.get(self.bib))
+
+    def test_changed_file(self):
+        self.parse()
+        self.bib.write_text("@book{a, title = {B}, tags = {x,y}}")
+        self.assertIsNone(self.cache.get(self.bib))
+
+    def test_changed_pipeline(self):
+        self.parse()
+        other = BibCache(self.cache.root, pipeline_id(BibEntryPreprocess(pl.Path("/other"))))
+        self.assertIsNone(other.get(self.bib))
+        self.assertNotEqual(pipeline_id(None), self.cache.pipeline)
+        self.assertEqual(pipeline_id(BibEntryPreprocess(self.bib.parent)), self.cache.pipeline)
+
+    def test_pipelines_share_root(self):
+        self.parse()
+        other = BibCache(self.cache.root, pipeline_id(None))
+        other.put(self.bib, BibTokenizer(crossref=False).parse_file(self.bib))
+        self.assertNotEqual(other.target(self.bib), self.cache.target(self.bib))
+        self.assertEqual(self.cache.get(self.bib).entries[0]['__tags'], {"x", "y"})
+        self.assertNotIn('__tags', other.get(self.bib).entries[0])
+
+    def test_changed_latex_module(self):
+        from bkmkorg.bibtex import latex as bib_latex
+        source = inspect.getsourcefile
+        edited = lambda x: str(self.bib) if x is bib_latex else source(x)
+        with mock.patch("bkmkorg.bibtex.cache.inspect.getsourcefile", side_effect=edited):
+            self.assertNotEqual(pipeline_id(self.fn), self.cache.pipeline)
@@ -0,0 +1,46 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+import pathlib as pl
+import pickle
+
+from bkmkorg.bibtex.clean import BibEntryPreprocess
+from bkmkorg.bibtex.tokenizer import BibTokenizer
+
+EXAMPLE = """
+@book{smith_2001,
+  author = {Sm{\\'i}th, John and Doe, Jane},
+  title  = {A Title},
+  year   = {2001},
+  tags   = {ai, history;planning},
+  file   = {2001/smith.pdf},
+}
+"""
+
+class TestBibEntryPreprocess(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def test_preprocess(self):
+        preprocess = BibEntryPreprocess(pl.Path("/library"))
+        entry      = BibTokenizer(customization=preprocess).parse(EXAMPLE).entries[0]
+        self.assertEqual(entry['__tags'], {"ai", "history", "planning"})
+        self.assertEqual(entry['__paths']['file'], pl.Path("/library/2001/smith.pdf"))
+        self.assertEqual([x['last'] for x in entry['__authors']], [["Smíth"], ["Doe"]])
+        self.assertTrue(entry['__as_unicode'])
+
+    def test_picklable(self):
+        preprocess = pickle.loads(pickle.dumps(BibEntryPreprocess(pl.Path("/library"))))
+        self.assertEqual(preprocess.lib_root, pl.Path("/library"))
+
+    def test_failure_returns_entry(self):
+        entry = BibEntryPreprocess(pl.Path("/library"))({"ID": "bad", "author": None})
+        self.assertEqual(entry['ID'], "bad")
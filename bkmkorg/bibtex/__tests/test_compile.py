@@ -0,0 +1,79 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import pathlib as pl
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from bkmkorg.bibtex.compile import BibCompiler, group_by_tag, group_by_year
+
+# stands in for the TeX toolchain: copies the .bib to the .pdf, and counts runs
+FAKE_TEX = ((sys.executable, "-c", "import pathlib as pl; pl.Path('{stem}.pdf').write_text(pl.Path('{stem}.bib').read_text())"),)
+FAILING  = ((sys.executable, "-c", "raise SystemExit(1)"),)
+
+def entry(ident, year, tags):
+    return {"ENTRYTYPE": "article", "ID": ident, "year": year, "tags": tags,
+            "title": f"Title of {ident}", "__tags": {x.strip() for x in tags.split(",")}}
+
+class TestBibCompile(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp     = tempfile.TemporaryDirectory()
+        self.root    = pl.Path(self.tmp.name)
+        self.entries = [entry("a", "2001", "ai,games"), entry("b", "2001", "games"), entry("c", "2002", "ai_ethics")]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compiler(self, toolchain=FAKE_TEX):
+        return BibCompiler(self.root / "out", self.root / "work", toolchain=toolchain, workers=2)
+
+    def test_group_by_year(self):
+        targets = group_by_year(self.entries)
+        self.assertEqual([x.name for x in targets], ["year_2001", "year_2002"])
+        self.assertEqual([x['ID'] for x in targets[0].entries], ["a", "b"])
+        self.assertEqual([x.name for x in group_by_year(self.entries, min_entries=2)], ["year_2001"])
+
+    def test_group_by_tag(self):
+        targets = group_by_tag(self.entries)
+        self.assertEqual([x.name for x in targets], ["tag_ai", "tag_ai_ethics", "tag_games"])
+        self.assertIn(r"\title{Bibliography: ai\_ethics}", targets[1].tex_text())
+
+    def test_generated_bib(self):
+        target = group_by_year(self.entries)[1]
+        bib    = target.bib_text(self.compiler().writer)
+        self.assertIn("@article{c,", bib)
+        self.assertNotIn("__tags", bib)
+
+    def test_compile_and_cache(self):
+        results = self.compiler().compile(group_by_year(self.entries))
+        self.assertEqual(results, {"year_2001": True, "year_2002": True})
+        self.assertIn("@article{c,", (self.root / "out" / "year_2002.pdf").read_text())
+
+        compiler = self.compiler()
+        with mock.patch.object(compiler, "_build", side_effect=AssertionError("not cached")):
+            self.assertEqual(compiler.compile(group_by_year(self.entries)), results)
+
+    def test_only_changed_recompile(self):
+        self.compiler().compile(group_by_year(self.entries))
+        self.entries[2]['title'] = "A New Title"
+
+        compiler = self.compiler()
+        with mock.patch.object(compiler, "_build", wraps=compiler._build) as build:
+            compiler.compile(group_by_year(self.entries))
+
+        self.assertEqual([x.args[0].name for x in build.call_args_list], ["year_2002"])
+        self.assertIn("A New Title", (self.root / "out" / "year_2002.pdf").read_text())
+
+    def test_failure_not_cached(self):
+        results = self.compiler(FAILING).compile(group_by_year(self.entries))
+        self.assertEqual(results, {"year_2001": False, "year_2002": False})
+        self.assertFalse(self.compiler(FAILING).manifest)
+        self.assertEqual(list((self.root / "work").iterdir()), [self.root / "work" / "manifest.json"])
@@ -0,0 +1,114 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import pathlib as pl
+import random
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from bibtexparser.bibdatabase import BibDatabase
+
+from bkmkorg.bibtex.dedupe import (DupeFinder, merge_clusters, merge_entries,
+                                   norm_doi, norm_isbn, norm_title)
+from bkmkorg.bibtex.incremental import BibRewrite
+from bkmkorg.bibtex.tokenizer import BibTokenizer
+
+def entry(ident, **fields):
+    return {"ENTRYTYPE": "article", "ID": ident, **fields}
+
+class TestDedupe(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def clusters(self, entries):
+        finder = DupeFinder(entries)
+        return [([entries[x]['ID'] for x in c.members], c.reasons) for c in finder.clusters()]
+
+    def test_normalise(self):
+        self.assertEqual(norm_doi("https://doi.org/10.1000/ABC"), "10.1000/abc")
+        self.assertEqual(norm_doi("doi: 10.1000/abc"), "10.1000/abc")
+        self.assertIsNone(norm_doi("not a doi"))
+        self.assertEqual(norm_isbn("0-306-40615-2"), {"9780306406157"})
+        self.assertEqual(norm_isbn("978-0-306-40615-7, 0306406152"), {"9780306406157"})
+        self.assertEqual(norm_title(r"The {\"U}ber {G}ame: Part 1"), "the uber game part 1")
+
+    def test_exact_keys(self):
+        entries = [
+            entry("a", doi="10.1000/abc", title="One"),
+            entry("b", doi="https://doi.org/10.1000/ABC", title="Other"),
+            entry("c", isbn="0-306-40615-2", title="Book"),
+            entry("d", isbn="9780306406157", title="Book Again"),
+            entry("e", author="Smith, John", year="2001", title="A Study of Games and Play"),
+            entry("f", author="J. Smith and A. Doe", year="2001", title="The Study of Games and Play, Revisited"),
+            entry("a", title="Same ID"),
+            entry("g", author="Smith, John", year="2002", title="A Study of Games and Play"),
+        ]
+        self.assertEqual(self.clusters(entries), [(["a", "b", "a"], {"doi", "id"}),
+                                                  (["c", "d"], {"isbn"}),
+                                                  (["e", "f", "g"], {"name", "title"})])
+
+    def test_fuzzy_titles(self):
+        entries = [
+            entry("a", author="Smith, John", year="2001", title="Procedural Generation of Game Worlds"),
+            entry("b", author="Doe, Jane",   year="2001", title="Procedural Generation of Game World"),
+            entry("c", author="Doe, Jane",   year="1995", title="Procedural Generation of Game Worlds"),
+            entry("d", author="Roe, Rick",   year="1995", title="Something Else Entirely Here"),
+        ]
+        clusters = self.clusters(entries)
+        self.assertEqual(clusters, [(["a", "b", "c"], {"title"})])
+
+    def test_distinct_library(self):
+        rand    = random.Random(3)
+        words   = ["games", "play", "theory", "agents", "logic", "planning", "narrative", "design", "social", "models"]
+        entries = [entry(f"e_{i}", author=f"Person{i}, A", year=str(1950 + i % 50),
+                         title=" ".join(rand.sample(words, 6)) + f" volume {i}")
+                   for i in range(500)]
+        self.assertEqual(self.clusters(entries), [])
+
+    def test_merge(self):
+        first  = entry("a", title="Title", year="2001", tags="ai", file="a.pdf")
+        second = entry("b", title="Title", year="2001", doi="10.1/x", publisher="Pub", tags="games,ai", file="b.pdf", file1="a.pdf")
+        primary, removed = merge_entries([first, second])
+        self.assertIs(primary, second)
+        self.assertEqual(removed, [first])
+        self.assertEqual(primary['tags'], "ai,games")
+        self.assertEqual((primary['file'], primary['file1']), ("b.pdf", "a.pdf"))
+        self.assertNotIn("file2", primary)
+
+    def test_merge_unrelated_file_fields(self):
+        first  = entry("a", title="Title", profile="kept", filename_note="note", file="a.pdf")
+        second = entry("b", title="Title", file="b.pdf")
+        primary, _ = merge_entries([first, second])
+        self.assertEqual(primary['profile'], "kept")
+        self.assertEqual(primary['filename_note'], "note")
+        self.assertEqual((primary['file'], primary['file1']), ("a.pdf", "b.pdf"))
+
+    def test_merge_clusters_with_crossref(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {pl.Path(tmp) / "2001.bib" : ("@book{parent_a,\n  title = {The Collected Volume},\n  year = {2001},\n"
+                                                  "  doi = {10.1000/vol},\n  publisher = {Pub},\n}\n\n"
+                                                  "@incollection{child,\n  crossref = {parent_b},\n  title = {A Chapter},\n}\n"),
+                     pl.Path(tmp) / "2002.bib" : ("@book{parent_b,\n  title = {The Collected Volume},\n  year = {2001},\n"
+                                                  "  doi = {10.1000/VOL},\n}\n")}
+            dbs = {}
+            for fpath, text in files.items():
+                fpath.write_text(text)
+                dbs[fpath] = BibDatabase()
+                dbs[fpath].entries.extend(BibTokenizer(dbs[fpath], crossref=True).entries(text, source=fpath))
+
+            entries  = [x for db in dbs.values() for x in db.entries]
+            clusters = DupeFinder(entries).clusters()
+            changed  = merge_clusters(dbs, clusters, entries)
+            self.assertEqual(changed, set(files))
+            for fpath in changed:
+                BibRewrite.read(fpath).write(dbs[fpath], fpath)
+
+            first, second = [x.read_text() for x in files]
+            self.assertNotIn("_crossref", first)
+            self.assertRegex(first, r"crossref\s*= {parent_a}")
+            self.assertIn("@book{parent_a,", first)
+            self.assertNotIn("parent_b", first + second)
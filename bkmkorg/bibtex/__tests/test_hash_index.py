@@ -0,0 +1,79 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import hashlib
+import logging as logmod
+import os
+import pathlib as pl
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from bkmkorg.bibtex import hash_index
+from bkmkorg.bibtex.hash_index import HashIndex, hash_file
+
+class TestHashIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp   = tempfile.TemporaryDirectory()
+        self.root  = pl.Path(self.tmp.name)
+        self.files = []
+        for i, text in enumerate(["a", "b", "a", "c" * 100_000, ""]):
+            fpath = self.root / f"{i}.pdf"
+            fpath.write_text(text)
+            self.files.append(fpath)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_file(self):
+        for fpath in self.files:
+            self.assertEqual(hash_file(fpath)[1], hashlib.sha256(fpath.read_bytes()).hexdigest())
+
+    def test_duplicates_and_missing(self):
+        index  = HashIndex(self.root / "index")
+        report = index.update(self.files + [self.root / "missing.pdf"])
+        self.assertEqual(report.hashed, len(self.files))
+        self.assertEqual(report.missing, [self.root / "missing.pdf"])
+        self.assertEqual(list(report.duplicates.values()), [[self.files[0], self.files[2]]])
+
+    def test_incremental(self):
+        index = HashIndex(self.root / "index")
+        index.update(self.files)
+        index.write()
+
+        index = HashIndex.read(self.root / "index")
+        self.files[1].write_text("modified")
+        report = index.update(self.files)
+        self.assertEqual(report.hashed, 1)
+        self.assertEqual(report.modified, [self.files[1]])
+
+    def test_verify_corruption(self):
+        index = HashIndex(self.root / "index")
+        index.update(self.files)
+        stat  = self.files[1].stat()
+        self.files[1].write_text("x")
+        os.utime(self.files[1], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        report = index.update(self.files, verify=1.0)
+        self.assertEqual(report.hashed, 0)
+        self.assertEqual(report.verified, len(self.files))
+        self.assertEqual(report.corrupt, [self.files[1]])
+
+    def test_fast_verify_without_xxhash(self):
+        index = HashIndex(self.root / "index")
+        with mock.patch.object(hash_index, "xxhash", None):
+            index.update(self.files)
+            report = index.update(self.files, verify=1.0, fast=True)
+
+        self.assertFalse(report.corrupt)
+
+    def test_report_owners(self):
+        index  = HashIndex(self.root / "index")
+        report = index.update(self.files)
+        report.owners = {self.files[0]: {"smith_2001"}, self.files[2]: {"doe_2002"}}
+        self.assertIn("(smith_2001)", str(report))
@@ -0,0 +1,88 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import pathlib as pl
+import tempfile
+import unittest
+
+from bkmkorg.bibtex.incremental import BibRewrite, RewritePlan
+from bkmkorg.bibtex.tokenizer import BibTokenizer
+from bkmkorg.bibtex.writer import JGBibTexWriter
+
+ENTRIES = {
+    "a_2001" : {"ENTRYTYPE": "book", "ID": "a_2001", "title": "First", "year": "2001"},
+    "b_2001" : {"ENTRYTYPE": "book", "ID": "b_2001", "title": "Second", "year": "2001"},
+    "c_2001" : {"ENTRYTYPE": "book", "ID": "c_2001", "title": "Third", "year": "2001"},
+    "d_2001" : {"ENTRYTYPE": "book", "ID": "d_2001", "title": "Fourth", "year": "2001"},
+}
+
+class TestBibRewrite(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.text = "% a leading comment\n\n" + JGBibTexWriter().write(self.db())
+
+    def db(self, **changes):
+        db = BibTokenizer().parse("")
+        db.entries = [dict(x, **changes.get(x['ID'], {})) for x in ENTRIES.values()]
+        return db
+
+    def test_unchanged(self):
+        plan, changed = BibRewrite(self.text).plan(self.db())
+        self.assertEqual(plan, RewritePlan.unchanged)
+        self.assertFalse(changed)
+
+    def test_splice(self):
+        rewrite       = BibRewrite(self.text)
+        plan, changed = rewrite.plan(self.db(b_2001={"title": "Changed"}))
+        self.assertEqual(plan, RewritePlan.splice)
+        self.assertEqual(list(changed), ["b_2001"])
+
+        spliced = rewrite.splice(changed)
+        self.assertTrue(spliced.startswith("% a leading comment"))
+        self.assertIn("{Changed}", spliced)
+        self.assertNotIn("{Second}", spliced)
+        self.assertEqual(spliced.replace("Changed", "Second"), self.text)
+
+    def test_many_changes_rewrite(self):
+        db   = self.db(a_2001={"title": "x"}, b_2001={"title": "y"}, c_2001={"title": "z"})
+        plan, _ = BibRewrite(self.text).plan(db)
+        self.assertEqual(plan, RewritePlan.rewrite)
+
+    def test_removed_entry_rewrite(self):
+        db = self.db()
+        db.entries.pop()
+        plan, _ = BibRewrite(self.text).plan(db)
+        self.assertEqual(plan, RewritePlan.rewrite)
+
+    def test_reformat_only_splices(self):
+        """ Differently formatted but otherwise equal entries are still canonicalised """
+        text    = self.text.replace(" title        = {Third},", "  title={Third},")
+        plan, changed = BibRewrite(text).plan(self.db())
+        self.assertEqual(plan, RewritePlan.splice)
+        self.assertEqual(list(changed), ["c_2001"])
+
+    def test_write_unchanged_keeps_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            target = pl.Path(tmp) / "2001.bib"
+            target.write_text(self.text)
+            mtime  = target.stat().st_mtime_ns
+            plan   = BibRewrite.read(target).write(self.db(), target)
+            self.assertEqual(plan, RewritePlan.unchanged)
+            self.assertEqual(target.stat().st_mtime_ns, mtime)
+
+    def test_write_unchanged_to_other_target(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = pl.Path(tmp) / "2001.bib"
+            target = pl.Path(tmp) / "temp" / "2001.bib"
+            target.parent.mkdir()
+            source.write_text(self.text)
+            target.write_text("stale")
+            plan   = BibRewrite.read(source).write(self.db(), target)
+            self.assertEqual(plan, RewritePlan.unchanged)
+            self.assertEqual(target.read_text(), self.text)
+            self.assertFalse(list(target.parent.glob(".*.staged")))
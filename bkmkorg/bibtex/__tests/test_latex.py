@@ -0,0 +1,57 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+import random
+
+from bibtexparser import customization as bib_customization
+from bibtexparser import latexenc
+
+from bkmkorg.bibtex import latex
+
+def original_string_to_latex(string):
+    """ The per character version formerly in load_save """
+    if string.isascii():
+        return string
+    return "".join(char if char.isascii() or char in [' ', '{', '}'] else latexenc.unicode_to_latex_map.get(char, char)
+                   for char in string)
+
+class TestLatexConversion(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.WARNING)
+        rand      = random.Random(0)
+        latexes   = [x for _, x in latexenc.unicode_to_latex + latexenc.unicode_to_crappy_latex1]
+        cls.texts = [f"Pre {x}e post {{Braced}}" for x in latexes]
+        cls.texts += [" ".join(rand.choices(latexes, k=4)) + " {x}" for _ in range(500)]
+        cls.texts += ["Plain ascii", "", "{\\'E}cole", "M\\\"{u}ller and G\\\"odel", "caf\\'{e} {\\c c}a", "a\\`"]
+
+    def test_latex_to_unicode(self):
+        for text in self.texts:
+            try:
+                expected = latexenc.latex_to_unicode(text)
+            except TypeError:
+                # a few of bibtexparser's multi character replacements fail, in both
+                with self.assertRaises(TypeError):
+                    latex.latex_to_unicode(text)
+                continue
+
+            self.assertEqual(latex.latex_to_unicode(text), expected, text)
+
+    def test_string_to_latex(self):
+        texts = ["Plain", "Smíth and Gödel", "Ærø {Ω} – ≤ 漢", *(x for x, _ in latexenc.unicode_to_latex)]
+        for text in texts:
+            self.assertEqual(latex.string_to_latex(text), original_string_to_latex(text), text)
+
+    def test_entry_to_unicode(self):
+        entry    = {"ID": "a", "title": "Caf\\'{e}\n    society", "author": "M\\\"{u}ller, A"}
+        expected = bib_customization.convert_to_unicode(dict(entry))
+        expected = {k: latex.NEWLINE_RE.sub(" ", v) for k, v in expected.items()}
+        self.assertEqual(latex.entry_to_unicode(entry), expected)
+        self.assertEqual(entry['title'], "Café society")
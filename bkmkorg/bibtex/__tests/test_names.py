@@ -3,7 +3,8 @@
 
 import unittest
 
-from bibtexparser.customization import InvalidName, splitname
+from bkmkorg.bibtex.names import InvalidName, split_name, split_names, splitname
+from bibtexparser.customization import splitname as bib_splitname
 
 class TestSplitnameMethod(unittest.TestCase):
     def test_splitname_basic(self):
@@ -96,6 +97,36 @@ class TestSplitnameMethod(unittest.TestCase):
             result = splitname(name)
             self.assertEqual(result, expected, msg="Input name: {0}".format(name))
 
+    def test_matches_bibtexparser(self):
+        """ Both the plain and braced paths split as bibtexparser does """
+        names = [x for x, _ in splitname_test_cases] + [
+            "", "  ", "AA,", "AA,,", ", BB", "aa bb, cc, dd, ee", "Émile Zola", "émile zola",
+            "de la Fontaine, Jean", "AA {BB CC", "AA }BB", "jean de la fontaine", "AA bb CC dd EE",
+            "1a 2b 3C", "O'Brien,\tPat", "Smith~Jones, J.",
+        ]
+        for name in names:
+            for strict in (True, False):
+                try:
+                    expected = bib_splitname(name, strict_mode=strict)
+                except InvalidName:
+                    with self.assertRaises(InvalidName, msg=name):
+                        splitname(name, strict_mode=strict)
+                    continue
+                self.assertEqual(splitname(name, strict_mode=strict), expected, msg=name)
+
+    def test_split_name_copies(self):
+        first = split_name("Brinch Hansen, Per")
+        first['last'].append("Modified")
+        self.assertEqual(split_name("Brinch Hansen, Per")['last'], ["Brinch", "Hansen"])
+
+    def test_split_names(self):
+        result = split_names("Knuth, Donald and Per Brinch Hansen AND {Delgado de Molina}")
+        self.assertEqual([x['last'] for x in result], [["Knuth"], ["Hansen"], ["{Delgado de Molina}"]])
+
+    def test_trailing_escape(self):
+        with self.assertRaises(InvalidName):
+            splitname("AA BB\\", strict_mode=False)
+
 
 splitname_test_cases = (
     (r'Per Brinch Hansen',
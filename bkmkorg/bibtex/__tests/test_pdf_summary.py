@@ -0,0 +1,78 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import pathlib as pl
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from pdfrw import PdfDict, PdfName, PdfString, PdfWriter
+
+from bkmkorg.bibtex import pdf_summary
+from bkmkorg.bibtex.hash_index import HashIndex
+from bkmkorg.bibtex.pdf_summary import PdfLibrarySummary, summarise_pdf
+
+def make_pdf(fpath, pages, **info):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.addpage(PdfDict(Type=PdfName.Page, MediaBox=[0, 0, 100, 100]))
+    writer.trailer.Info = PdfDict(**{x: PdfString.encode(y) for x, y in info.items()})
+    writer.write(str(fpath))
+    return fpath
+
+class TestPdfSummary(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.root = pl.Path(self.tmp.name)
+        self.pdfs = [
+            make_pdf(self.root / "a.pdf", 3, Title="A Title", Author="Smith, J", Subject="doi:10.1000/xyz123."),
+            make_pdf(self.root / "b.pdf", 12),
+        ]
+        self.broken = self.root / "broken.pdf"
+        self.broken.write_text("not a pdf")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_summarise(self):
+        summary = summarise_pdf(self.pdfs[0])
+        self.assertEqual(summary.pages, 3)
+        self.assertEqual(summary.title, "A Title")
+        self.assertEqual(summary.author, "Smith, J")
+        self.assertEqual(summary.doi, "10.1000/xyz123")
+        self.assertIsNone(summary.error)
+
+    def test_broken(self):
+        summary = summarise_pdf(self.broken)
+        self.assertIsNone(summary.pages)
+        self.assertIsNotNone(summary.error)
+
+    def test_library_cache(self):
+        files   = self.pdfs + [self.broken]
+        first   = PdfLibrarySummary(self.root / "summary.cache", HashIndex(self.root / "hashes"), workers=2)
+        results = first.run(files)
+        self.assertEqual(results[self.pdfs[1]].pages, 12)
+
+        with mock.patch.object(pdf_summary, "summarise_pdf", side_effect=AssertionError("not cached")):
+            second = PdfLibrarySummary(self.root / "summary.cache", HashIndex.read(self.root / "hashes"), workers=2)
+            cached = second.run(self.pdfs)
+
+        self.assertEqual(cached, {x: results[x] for x in self.pdfs})
+        # failures are retried
+        third = PdfLibrarySummary(self.root / "summary.cache", HashIndex.read(self.root / "hashes"), workers=2)
+        self.assertEqual(len(third._cache), len(self.pdfs))
+        self.assertIsNotNone(third.run(files)[self.broken].error)
+
+    def test_table(self):
+        summary = PdfLibrarySummary(self.root / "summary.cache", HashIndex(self.root / "hashes"), workers=2)
+        summary.run(self.pdfs)
+        rows    = summary.table({self.pdfs[0]: {"smith_2001", "smith_2001b"}}).splitlines()
+        self.assertEqual(rows[0].split("\t"), pdf_summary.TABLE_COLUMNS)
+        self.assertEqual([x.split("\t")[0] for x in rows[1:]], ["smith_2001", "smith_2001b", ""])
+        self.assertEqual(rows[1].split("\t")[3:], ["3", "A Title", "Smith, J", "10.1000/xyz123"])
@@ -0,0 +1,135 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import json
+import logging as logmod
+import pathlib as pl
+import tempfile
+import unittest
+
+from bkmkorg.bibtex.relocate import MoveJournal, MovePlan, prune_empty
+
+class TestRelocate(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.root = pl.Path(self.tmp.name)
+        self.srcs = []
+        for i in range(10):
+            src = self.root / "old" / f"{i}" / f"file_{i}.pdf"
+            src.parent.mkdir(parents=True)
+            src.write_text(str(i))
+            self.srcs.append(src)
+
+        self.journal = MoveJournal(self.root / "moves.journal", workers=4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def plan(self):
+        plan = MovePlan()
+        for i, src in enumerate(self.srcs):
+            plan.add(src, self.root / "new" / f"{i % 3}" / "same.pdf")
+        return plan
+
+    def test_plan_collisions_renamed(self):
+        plan = self.plan()
+        self.assertEqual(len(set(plan.moves.values())), len(self.srcs))
+        self.assertFalse(plan.collisions())
+
+        existing = self.root / "exists.pdf"
+        existing.write_text("x")
+        self.assertNotEqual(plan.add(self.root / "other.pdf", existing), existing)
+
+    def test_discard_colliding(self):
+        plan    = self.plan()
+        blocked = plan.moves[self.srcs[1]]
+        blocked.parent.mkdir(parents=True)
+        blocked.write_text("x")
+        self.srcs[2].unlink()
+
+        colliding = plan.colliding()
+        self.assertEqual(set(colliding), {self.srcs[1], self.srcs[2]})
+        self.assertEqual(len(plan.collisions()), 2)
+
+        reverted = plan.discard(colliding)
+        self.assertEqual(reverted, {blocked: self.srcs[1], self.root / "new" / "2" / "same.pdf": self.srcs[2]})
+        self.assertFalse(plan.collisions())
+        self.assertEqual(len(self.journal.execute(plan)), len(self.srcs) - 2)
+
+    def test_execute(self):
+        plan  = self.plan()
+        moved = self.journal.execute(plan)
+        self.assertEqual(moved, plan.moves)
+        self.assertTrue(all(x.exists() for x in plan.moves.values()))
+        self.assertFalse(any(x.exists() for x in plan.moves))
+
+        removed = prune_empty((x.parent for x in plan.moves), self.root)
+        self.assertIn(self.root / "old", removed)
+        self.assertFalse((self.root / "old").exists())
+
+    def test_resume(self):
+        plan  = self.plan()
+        moves = list(plan.moves.items())
+        # interrupted: the plan journaled, two moves done, one unjournaled
+        with open(self.journal.path, 'w') as f:
+            for src, dst in moves:
+                f.write(json.dumps({"src": str(src), "dst": str(dst)}) + "\n")
+            for src, dst in moves[:3]:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                src.rename(dst)
+            for src, _ in moves[:2]:
+                f.write(json.dumps({"done": str(src)}) + "\n")
+            f.write('{"done": "/tr')
+
+        moved = self.journal.resume()
+        self.assertEqual(moved, plan.moves)
+        self.assertTrue(all(x.exists() for x in plan.moves.values()))
+
+    def test_rollback(self):
+        plan = self.plan()
+        self.journal.execute(plan)
+        prune_empty((x.parent for x in plan.moves), self.root)
+
+        self.assertEqual(self.journal.rollback(), len(self.srcs))
+        self.assertTrue(all(x.exists() for x in self.srcs))
+        self.assertFalse(any(x.exists() for x in plan.moves.values()))
+        self.assertFalse(self.journal.exists())
+
+    def test_successive_runs_keep_redirects(self):
+        """ Bibs not cleaned in place keep naming the first run's sources """
+        first  = MovePlan()
+        second = MovePlan()
+        moved  = self.root / "moved" / "file_0.pdf"
+        again  = self.root / "again" / "file_0.pdf"
+        first.add(self.srcs[0], moved)
+        self.journal.execute(first)
+
+        redirects = self.journal.resume()
+        self.assertEqual(redirects, {self.srcs[0]: moved})
+        second.add(redirects[self.srcs[0]], again)
+        second.add(self.srcs[1], self.root / "moved" / "file_1.pdf")
+        self.journal.execute(second)
+
+        redirects = self.journal.resume()
+        self.assertEqual(redirects[self.srcs[0]], again)
+        self.assertEqual(redirects[moved], again)
+        self.assertTrue(redirects[self.srcs[0]].exists())
+
+        self.assertEqual(self.journal.rollback(), 3)
+        self.assertTrue(self.srcs[0].exists())
+        self.assertTrue(self.srcs[1].exists())
+        self.assertFalse(again.exists())
+
+    def test_failed_move_raises(self):
+        plan = self.plan()
+        self.srcs[0].unlink()
+        with self.assertRaises(OSError):
+            self.journal.execute(plan)
+
+        _, done = self.journal.load()
+        self.assertEqual(len(done), len(self.srcs) - 1)
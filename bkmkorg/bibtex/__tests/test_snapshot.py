@@ -0,0 +1,97 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import os
+import pathlib as pl
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from bkmkorg.bibtex.clean import BibPathCleanMixin
+from bkmkorg.bibtex.snapshot import LibrarySnapshot
+
+class TestLibrarySnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.root = pl.Path(self.tmp.name).resolve()
+        (self.root / "2001" / "smith").mkdir(parents=True)
+        (self.root / "2001" / "empty").mkdir()
+        (self.root / "2001" / "smith" / "a.pdf").write_text("a")
+        os.link(self.root / "2001" / "smith" / "a.pdf", self.root / "2001" / "hard.pdf")
+        (self.root / "outside").mkdir()
+        (self.root / "outside" / "b.pdf").write_text("b")
+        (self.root / "2001" / "link").symlink_to(self.root / "outside")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queries(self):
+        snap = LibrarySnapshot(self.root)
+        with mock.patch("os.stat", side_effect=AssertionError("stat")):
+            self.assertTrue(snap.exists(self.root / "2001" / "smith" / "a.pdf"))
+            self.assertTrue(snap.is_dir(self.root / "2001" / "smith"))
+            self.assertTrue(snap.is_empty(self.root / "2001" / "empty"))
+            self.assertFalse(snap.is_empty(self.root / "2001"))
+            self.assertTrue(snap.samefile(self.root / "2001" / "smith" / "a.pdf", self.root / "2001" / "hard.pdf"))
+            self.assertEqual(snap.resolve(self.root / "2001" / "." / "smith"), self.root / "2001" / "smith")
+
+    def test_misses_fall_through(self):
+        snap  = LibrarySnapshot(self.root)
+        added = self.root / "2001" / "added.pdf"
+        self.assertFalse(snap.exists(self.root / "2001" / "missing.pdf"))
+        self.assertFalse(snap.is_dir(self.root / "2001" / "missing"))
+        # as if the filesystem matched a differently spelt name
+        added.write_text("c")
+        self.assertTrue(snap.exists(added))
+        self.assertTrue(snap.samefile(added, added))
+        with self.assertRaises(FileNotFoundError):
+            snap.samefile(added, self.root / "2001" / "missing.pdf")
+
+    def test_symlinks_fall_through(self):
+        snap = LibrarySnapshot(self.root)
+        self.assertTrue(snap.exists(self.root / "2001" / "link" / "b.pdf"))
+        self.assertEqual(snap.resolve(self.root / "2001" / "link" / "b.pdf"), self.root / "outside" / "b.pdf")
+        self.assertEqual(snap.resolve(self.root / "2001" / ".." / "2001"), self.root / "2001")
+
+    def test_aliased_root(self):
+        alias = self.root / "alias"
+        alias.symlink_to(self.root / "2001")
+        snap  = LibrarySnapshot(alias)
+        self.assertTrue(snap.exists(alias / "smith" / "a.pdf"))
+        self.assertEqual(snap.resolve(alias / "smith"), self.root / "2001" / "smith")
+
+    def test_rename_and_mkdir(self):
+        snap   = LibrarySnapshot(self.root)
+        orig   = self.root / "2001" / "smith" / "a.pdf"
+        target = self.root / "2002" / "jones" / "a.pdf"
+        snap.mkdir(target.parent)
+        self.assertTrue(snap.is_dir(self.root / "2002"))
+        self.assertTrue(snap.is_empty(target.parent))
+
+        self.assertEqual(snap.rename(orig, target), target)
+        self.assertFalse(snap.exists(orig))
+        self.assertTrue(snap.exists(target))
+        self.assertTrue(snap.is_empty(orig.parent))
+        self.assertFalse(snap.is_empty(target.parent))
+        self.assertTrue(snap.samefile(target, self.root / "2001" / "hard.pdf"))
+
+    def test_unique_stem(self):
+        snap  = LibrarySnapshot(self.root)
+        mixin = BibPathCleanMixin()
+        orig  = self.root / "2001" / "smith" / "a.pdf"
+        self.assertIsNone(mixin.bc_unique_stem(orig, self.root / "2001" / "hard.pdf", fs=snap))
+        self.assertEqual(mixin.bc_unique_stem(orig, self.root / "2002" / "b.pdf", fs=snap), self.root / "2002" / "b.pdf")
+
+    def test_expand_and_check(self):
+        snap  = LibrarySnapshot(self.root)
+        mixin = BibPathCleanMixin()
+        entry = {"ID": "x", "file": "2001/smith/a.pdf", "file2": "2001/missing.pdf"}
+        mixin.bc_expand_paths(entry, self.root, fs=snap)
+        self.assertEqual(entry['__paths']['file'], self.root / "2001" / "smith" / "a.pdf")
+        self.assertEqual(len(mixin.bc_check_files(entry, "{file}", fs=snap)), 1)
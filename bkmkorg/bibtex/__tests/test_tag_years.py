@@ -0,0 +1,68 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import unittest
+import unittest.mock as mock
+
+import numpy as np
+
+from bkmkorg.bibtex.tag_years import NO_YEAR, SPARKS, BibTagTable
+
+class TestBibTagTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.table = BibTagTable()
+        self.table.add("c", "1992", {"ai", "ethics"})
+        self.table.add("a", "1990", {"ai", "planning"})
+        self.table.add("b", 1990, {"ai"})
+        self.table.add("d", "forthcoming", {"ai"})
+
+    def test_columns(self):
+        cols = self.table.columns()
+        self.assertEqual(len(self.table), 6)
+        self.assertEqual(sorted(cols['year'].tolist()), [NO_YEAR, 1990, 1990, 1990, 1992, 1992])
+        self.assertEqual(self.table.counts()[self.table.vocab["ai"]], 4)
+
+    def test_matrix(self):
+        years, counts = self.table.matrix()
+        self.assertEqual(years.tolist(), [1990, 1991, 1992])
+        self.assertEqual(counts[self.table.vocab["ai"]].tolist(), [2, 0, 1])
+        self.assertEqual(counts[self.table.vocab["ethics"]].tolist(), [0, 0, 1])
+
+    def test_timelines(self):
+        timelines = self.table.timelines()
+        self.assertEqual(timelines["ai"], [(1990, "a"), (1990, "b"), (1992, "c")])
+        self.assertEqual(set(self.table.timelines(min_entries=2)), {"ai"})
+
+    def test_sparklines(self):
+        lines = self.table.sparklines()
+        self.assertEqual(lines["ai"], SPARKS[-1] + SPARKS[0] + SPARKS[4])
+        self.assertEqual(lines["ethics"], SPARKS[0] + SPARKS[0] + SPARKS[-1])
+
+    def test_matrix_tsv(self):
+        rows = self.table.matrix_tsv().splitlines()
+        self.assertEqual(rows[0].split("\t"), ["tag", "total", "1990", "1991", "1992"])
+        self.assertEqual(rows[1].split("\t"), ["ai", "3", "2", "0", "1"])
+
+    def test_implausible_years(self):
+        self.table.add("e", "20011", {"ai"})
+        self.table.add("f", "199", {"ai"})
+        years, counts = self.table.matrix()
+        self.assertEqual(years.tolist(), [1990, 1991, 1992])
+        self.assertEqual(self.table.counts()[self.table.vocab["ai"]], 6)
+
+        table = BibTagTable(years=(1991, 1992))
+        table.add("a", "1990", {"ai"})
+        table.add("c", "1992", {"ai"})
+        self.assertEqual(table.timelines(), {"ai": [(1992, "c")]})
+
+    def test_empty(self):
+        table = BibTagTable()
+        self.assertEqual(table.timelines(), {})
+        self.assertEqual(table.sparklines(), {})
+        self.assertEqual(table.matrix()[0].size, 0)
@@ -0,0 +1,139 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import importlib.util
+import logging as logmod
+import pathlib as pl
+import tempfile
+
+from bibtexparser.bibdatabase import BibDatabase
+from bibtexparser.bparser import BibTexParser
+
+from bkmkorg.bibtex.tokenizer import BibTokenizer
+
+EXAMPLE = """
+% A leading comment
+@string{ pub = "Example Press" }
+@String(city = {Lon} # "don")
+
+@comment{ not an entry }
+
+@Book{smith_2001,
+  Author        = {Smith, John and {Jones and Co}},
+  title         = "The {Quoted} Title",
+  publisher     = pub,
+  address       = city # {, UK},
+  year          = 2001,
+  abstract      = {Line one
+                   line two},
+  tags          = {ai,history},
+  title         = {Duplicate},
+  empty         = {{}},
+}
+
+@incollection(jones_2002,
+  author    = {Jones, Ann},
+  title     = {A Chapter},
+  crossref  = {smith_2001}
+)
+
+@article{bad entry,
+  title = {skipped}
+}
+@misc{last_2003, note = {nested {braces {here}}}, year = {2003}}
+"""
+
+class TestBibTokenizer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def bibtexparser_db(self, text, customization=None):
+        parser = BibTexParser(common_strings=False)
+        parser.customization             = customization
+        parser.ignore_nonstandard_types  = False
+        parser.add_missing_from_crossref = True
+        return parser.parse(text, partial=True)
+
+    def test_matches_bibtexparser(self):
+        expected = self.bibtexparser_db(EXAMPLE)
+        result   = BibTokenizer(common_strings=False).parse(EXAMPLE)
+        self.assertEqual(result.entries, expected.entries)
+        self.assertEqual(result.strings, expected.strings)
+        self.assertEqual(result.comments, expected.comments)
+
+    def test_values(self):
+        entries = BibTokenizer().parse(EXAMPLE).entries_dict
+        smith   = entries['smith_2001']
+        self.assertEqual(smith['ENTRYTYPE'], "book")
+        self.assertEqual(smith['author'], "Smith, John and {Jones and Co}")
+        self.assertEqual(smith['title'], "The {Quoted} Title")
+        self.assertEqual(smith['publisher'], "Example Press")
+        self.assertEqual(smith['address'], "London, UK")
+        self.assertEqual(smith['abstract'], "Line one\nline two")
+        self.assertEqual(smith['empty'], "")
+        self.assertEqual(entries['last_2003']['note'], "nested {braces {here}}")
+        self.assertNotIn("bad entry", entries)
+
+    def test_crossref(self):
+        jones = BibTokenizer().parse(EXAMPLE).entries_dict['jones_2002']
+        self.assertEqual(jones['publisher'], "Example Press")
+        self.assertIn("publisher", jones['_FROM_CROSSREF'])
+        self.assertNotIn("_crossref", jones)
+
+    def test_customization(self):
+        def custom(entry):
+            entry['__seen'] = entry['ID']
+            return entry
+
+        entries = list(BibTokenizer(customization=custom).entries(EXAMPLE))
+        self.assertEqual([x['__seen'] for x in entries], ["smith_2001", "jones_2002", "last_2003"])
+        self.assertEqual(entries[1]['_crossref'], "smith_2001")
+
+    def test_comments(self):
+        db = BibTokenizer().parse(EXAMPLE)
+        self.assertIn("% A leading comment", db.comments)
+        self.assertIn(" not an entry ", db.comments)
+        self.assertTrue(any(x.startswith("@article{bad entry") for x in db.comments))
+
+    def test_shared_db(self):
+        db = BibDatabase()
+        tokenizer = BibTokenizer(db)
+        tokenizer.parse("@misc{a, title = {A}}")
+        tokenizer.parse("@misc{b, title = {B}}")
+        self.assertEqual([x['ID'] for x in db.entries], ["a", "b"])
+
+    def test_common_strings(self):
+        text     = "@misc{a, month = jan, title = {A}}\n@misc{b, month = sep # {~1}, note = undefined}"
+        entries  = BibTokenizer().parse(text).entries_dict
+        self.assertEqual(entries['a']['month'], "January")
+        self.assertEqual(entries['b']['month'], "September~1")
+        self.assertEqual(entries['b']['note'], "undefined")
+
+    def test_month_macros(self):
+        text     = '@misc{a, month = jan, title = {A}}\n@misc{b, month = "feb" # jan}'
+        entries  = BibTokenizer(common_strings=False).parse(text).entries_dict
+        self.assertEqual(entries['a']['month'], "jan")
+        self.assertEqual(entries['b']['month'], "febjan")
+
+    @unittest.skipUnless(importlib.util.find_spec("doot"), "doot not installed")
+    def test_month_macros_kept_on_load(self):
+        from bkmkorg.bibtex import load_save
+        with tempfile.TemporaryDirectory() as tmp:
+            fpath = pl.Path(tmp) / "2001.bib"
+            fpath.write_text('@misc{a, month = jan, title = {A}}\n@misc{b, month = "feb" # jan}')
+            for db in (load_save._parse_bib_file(fpath), load_save.BibLoadSaveMixin()._parse_bib_files([fpath])):
+                self.assertEqual(db.entries_dict['a']['month'], "jan")
+                self.assertEqual(db.entries_dict['b']['month'], "febjan")
+
+    def test_own_strings_kept(self):
+        db = BibDatabase()
+        db.strings['jan'] = "Jan."
+        entries = BibTokenizer(db).parse("@misc{a, month = jan}").entries
+        self.assertEqual(entries[0]['month'], "Jan.")
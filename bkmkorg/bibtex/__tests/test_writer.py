@@ -0,0 +1,60 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import io
+import unittest
+
+import logging as logmod
+
+from bibtexparser.bibdatabase import BibDatabase, BibDataString
+
+from bkmkorg.bibtex.writer import JGBibTexWriter
+
+EXPECTED = """@book{a_2001,
+ author       = {Smith, John},
+ title        = {{A} Title},
+ year         = {2001},
+ tags         = {ai},
+ a_very_long_field_name= {x},
+ file         = {2001/a.pdf},
+ month        = jan,
+}
+
+@article{b_2002,
+ title        = {Other},
+ doi          = {10.1/x},
+}
+"""
+
+class TestJGBibTexWriter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def make_db(self):
+        db = BibDatabase()
+        db.entries.append({"ENTRYTYPE": "article", "ID": "b_2002", "doi": "10.1/x", "title": "{Other}"})
+        db.entries.append({"ENTRYTYPE": "book", "ID": "a_2001", "file": "2001/a.pdf", "tags": "ai", "year": "2001",
+                           "title": "{A} Title", "author": "Smith, John", "__tags": {"ai"},
+                           "month": BibDataString(db, "jan"), "a_very_long_field_name": "x"})
+        return db
+
+    def test_write(self):
+        self.assertEqual(JGBibTexWriter().write(self.make_db()), EXPECTED)
+
+    def test_dump_matches_write(self):
+        writer = JGBibTexWriter()
+        handle = io.StringIO()
+        writer.dump(self.make_db(), handle)
+        self.assertEqual(handle.getvalue(), writer.write(self.make_db()))
+
+    def test_display_order_update(self):
+        writer = JGBibTexWriter()
+        writer.display_order = ["doi"]
+        result = writer._entry_to_bibtex(self.make_db().entries[0])
+        self.assertLess(result.index("doi"), result.index("title"))
+
+    def test_non_string(self):
+        with self.assertRaises(TypeError):
+            JGBibTexWriter()._entry_to_bibtex({"ENTRYTYPE": "misc", "ID": "x", "year": 2001})
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+A persistent cache of parsed and customized bibtex files.
+
+Each .bib file gets a pickle of its entries, strings, comments and preambles,
+as they were after parse time customization, before crossref resolution.
+A cache is valid if the file's contents and the customization pipeline are unchanged.
+Unchanged size and mtime skip rehashing the file.
+"""
+##-- imports
+from __future__ import annotations
+
+import hashlib
+import inspect
+import logging as logmod
+import os
+import pathlib as pl
+import pickle
+from dataclasses import InitVar, dataclass, field, is_dataclass
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bibtexparser.bibdatabase import BibDatabase
+
+from bkmkorg.bibtex import clean as bib_clean
+from bkmkorg.bibtex import latex as bib_latex
+from bkmkorg.bibtex import names as bib_names
+from bkmkorg.bibtex import tokenizer as bib_tokenizer
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["BibCache", "pipeline_id"]
+
+CACHE_VERSION : Final = 1
+CACHE_EXT     : Final = ".bibcache"
+
+def _source_hash(*objs) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for obj in objs:
+        try:
+            hasher.update(pl.Path(inspect.getsourcefile(obj)).read_bytes())
+        except (TypeError, OSError):
+            hasher.update(repr(obj).encode())
+    return hasher.hexdigest()
+
+def pipeline_id(fn:None|Callable) -> str:
+    """
+    A stable identity for a parse customization:
+    its qualified name, its parameters if it is a dataclass,
+    and the source of its module, the tokenizer, the clean mixins,
+    name splitting and latex conversion
+    """
+    match fn:
+        case None:
+            name = "None"
+            code = None
+        case _ if inspect.ismethod(fn):
+            owner = type(fn.__self__)
+            name  = f"{owner.__module__}.{owner.__qualname__}.{fn.__name__}"
+            code  = owner
+        case _ if is_dataclass(fn):
+            name  = f"{type(fn).__module__}.{type(fn).__qualname__}:{fn!r}"
+            code  = type(fn)
+        case _:
+            name  = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+            code  = fn
+
+    sources = [bib_tokenizer, bib_clean, bib_names, bib_latex] + ([inspect.getmodule(code)] if code is not None else [])
+    return f"{CACHE_VERSION}:{name}:{_source_hash(*sources)}"
+
+def file_hash(fpath:pl.Path) -> str:
+    return hashlib.blake2b(fpath.read_bytes(), digest_size=16).hexdigest()
+
+@dataclass
+class BibCache:
+    """ Pickled BibDatabases, one per source file, for a single pipeline """
+
+    root     : pl.Path = field()
+    pipeline : str     = field()
+
+    def __post_init__(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def target(self, fpath:pl.Path) -> pl.Path:
+        # keyed by pipeline as well, so tasks with different pipelines can share a cache root
+        key  = f"{pl.Path(fpath).resolve()}\n{self.pipeline}"
+        name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return self.root / f"{name}{CACHE_EXT}"
+
+    def get(self, fpath:pl.Path) -> None|BibDatabase:
+        fpath  = pl.Path(fpath)
+        target = self.target(fpath)
+        if not target.exists():
+            return None
+
+        try:
+            cached = pickle.loads(target.read_bytes())
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as err:
+            logging.warning("Bad Bibtex Cache %s : %s", target, err)
+            return None
+
+        if cached['pipeline'] != self.pipeline:
+            return None
+
+        stat = fpath.stat()
+        if cached['stat'] != (stat.st_size, stat.st_mtime_ns):
+            if cached['hash'] != file_hash(fpath):
+                return None
+            # Touched but unchanged, so refresh the stat
+            cached['stat'] = (stat.st_size, stat.st_mtime_ns)
+            self._write(target, cached)
+
+        return cached['db']
+
+    def put(self, fpath:pl.Path, db:BibDatabase, data:None|bytes=None):
+        """ Cache a parsed file. Pass the bytes it was parsed from to avoid rereading it """
+        fpath = pl.Path(fpath)
+        stat  = fpath.stat()
+        self._write(self.target(fpath), {
+            "pipeline" : self.pipeline,
+            "stat"     : (stat.st_size, stat.st_mtime_ns),
+            "hash"     : file_hash(fpath) if data is None else hashlib.blake2b(data, digest_size=16).hexdigest(),
+            "db"       : db,
+        })
+
+    def _write(self, target:pl.Path, cached:dict):
+        # write then rename, so concurrent workers never read a partial cache
+        temp = target.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_bytes(pickle.dumps(cached, protocol=pickle.HIGHEST_PROTOCOL))
+        temp.replace(target)
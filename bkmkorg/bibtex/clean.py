@@ -18,6 +18,9 @@ from uuid import uuid4
 
 import regex as re
 from bibtexparser.latexenc import latex_to_unicode
+from bkmkorg.bibtex.latex import entry_to_unicode
+from bkmkorg.bibtex.names import InvalidName, split_names
+from bkmkorg.bibtex.snapshot import LIVE_FILES, LiveFiles
 from bkmkorg.bibtex.writer import JGBibTexWriter
 
 ##-- end imports
@@ -26,7 +29,7 @@ from bkmkorg.bibtex.writer import JGBibTexWriter
 logging = logmod.getLogger(__name__)
 ##-- end logging
 
-__all__ = ["BibFieldCleanMixin", "BibPathCleanMixin"]
+__all__ = ["BibFieldCleanMixin", "BibPathCleanMixin", "BibEntryPreprocess"]
 
 from bibtexparser import customization as bib_customization
 from bibtexparser.latexenc import string_to_latex
@@ -34,7 +37,6 @@ from bibtexparser.latexenc import string_to_latex
 STEM_CLEAN_RE  : Final = re.compile(r"[^a-zA-Z0-9_]+")
 UNDERSCORE_RE  : Final = re.compile(r"_+")
 NEWLINE_RE     : Final = re.compile(r"\n+\s*")
-AND_RE         : Final = re.compile(r"\ and\ ", flags=re.IGNORECASE)
 TAGSPLIT_RE    : Final = re.compile(r",|;")
 TITLESPLIT_RE  : Final = re.compile(r"^\s*(.+?): (.+)$")
 TITLE_CLEAN_RE : Final = re.compile("[^a-zA-Z0-9]")
@@ -82,8 +84,7 @@ class BibFieldCleanMixin:
         """
         convert the entry to unicode, removing newlines
         """
-        entry = bib_customization.convert_to_unicode(entry)
-        entry.update({k:NEWLINE_RE.sub(" ", v) for k,v in entry.items()})
+        entry = entry_to_unicode(entry)
         entry['__as_unicode'] = True
         return entry
 
@@ -130,18 +131,17 @@ class BibFieldCleanMixin:
 
     def _separate_names(self, text):
         try:
-            names = AND_RE.split(text)
-            result = [bib_customization.splitname(x.strip(), False) for x in names]
-            return result
-        except StopIteration:
+            return split_names(text)
+        except InvalidName:
             raise IndexError(f"Unbalanced curlys in {text}")
 
 class BibPathCleanMixin:
     """
-    Mixin for cleaning path elements of bib records
+    Mixin for cleaning path elements of bib records.
+    Filesystem queries go through `fs`, which can be a LibrarySnapshot of the library
     """
 
-    def bc_expand_paths(self, entry, lib_root):
+    def bc_expand_paths(self, entry, lib_root, fs:LiveFiles=LIVE_FILES):
         if 'crossref' in entry:
             entry['__paths'] = {}
             return
@@ -153,19 +153,19 @@ class BibPathCleanMixin:
             assert(field not in results)
             if fname[0] not in  ["~", "/"]:
                 fname = lib_root / fname
-            fpath = pl.Path(fname).expanduser().resolve()
+            fpath = fs.resolve(fname)
             results[field] = fpath
 
         entry['__paths'] = results
 
-    def bc_check_files(self, entry, msg) -> list[tuple[str, str]]:
+    def bc_check_files(self, entry, msg, fs:LiveFiles=LIVE_FILES) -> list[tuple[str, str]]:
         """
         check all files exist
         """
         assert('__paths' in entry)
         results = []
         for field, fpath in entry['__paths'].items():
-            if pl.Path(fpath).exists():
+            if fs.exists(fpath):
                 continue
 
             results.append((entry['ID'], msg.format(file=fpath)))
@@ -217,14 +217,14 @@ class BibPathCleanMixin:
         collapsed  = UNDERSCORE_RE.sub("_", clean)
         entry['__ideal_stem'] = collapsed.strip()
 
-    def bc_prepare_file_movements(self, entry, lib_root) -> list:
+    def bc_prepare_file_movements(self, entry, lib_root, fs:LiveFiles=LIVE_FILES) -> list:
         """
         Calculate the proper place for files
         """
         assert('__paths' in entry)
         assert('__base_name' in entry)
         assert('__ideal_stem' in entry)
-        parents = self.__clean_parent_paths(entry, lib_root)
+        parents = self.__clean_parent_paths(entry, lib_root, fs)
         stem    = entry['__ideal_stem']
 
         results = []
@@ -236,7 +236,7 @@ class BibPathCleanMixin:
 
         return results
 
-    def __clean_parent_paths(self, entry, lib_root) -> list[tuple[str, pl.Path]]:
+    def __clean_parent_paths(self, entry, lib_root, fs:LiveFiles=LIVE_FILES) -> list[tuple[str, pl.Path]]:
         """ prepare parent directories if they have commas in them
         handles clean target already existing
         """
@@ -247,7 +247,7 @@ class BibPathCleanMixin:
         results = []
 
         for field, fpath in entry['__paths'].items():
-            if not fpath.exists():
+            if not fs.exists(fpath):
                 continue
             match self.__ideal_parent(fpath, year, base, lib_root):
                 case None:
@@ -277,11 +277,11 @@ class BibPathCleanMixin:
 
         return cleaned
 
-    def bc_unique_stem(self, orig:pl.Path, proposed:pl.Path) -> None|pl.Path:
+    def bc_unique_stem(self, orig:pl.Path, proposed:pl.Path, fs:LiveFiles=LIVE_FILES) -> None|pl.Path:
         """
         Returns a guaranteed non-existing path, or None
         """
-        if not orig.exists() or (proposed.exists() and orig.samefile(proposed)):
+        if not fs.exists(orig) or (fs.exists(proposed) and fs.samefile(orig, proposed)):
             return None
 
         stems_eq   = orig.stem[:-6] == proposed.stem
@@ -295,13 +295,33 @@ class BibPathCleanMixin:
                 pass
 
         hexed  = proposed
-        while hexed.exists():
+        while fs.exists(hexed):
             logging.debug("Finding a unique non-existent path")
             hex_val     = str(uuid4().hex)[:5]
             hexed       = proposed.with_stem(f"_{hex_val}")
 
         return hexed
 
+@dataclass
+class BibEntryPreprocess(BibFieldCleanMixin, BibPathCleanMixin):
+    """
+    A picklable parse customization, for loading in worker processes:
+    unicode conversion, path expansion, tag and name splitting
+    """
+
+    lib_root : pl.Path = field()
+
+    def __call__(self, entry):
+        try:
+            self.bc_to_unicode(entry)
+            self.bc_expand_paths(entry, self.lib_root)
+            self.bc_tag_split(entry)
+            self.bc_split_names(entry)
+        except Exception as err:
+            logging.warning("Failure to process %s : %s", entry['ID'], err)
+
+        return entry
+
 def basic_clean(entry):
     """
     basic transforms from bibtexparser
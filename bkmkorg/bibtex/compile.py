@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Compile bibliography pdfs from groups of bibtex entries, with local TeX tools.
+
+Each target (a year, a tag) gets a generated .tex and .bib,
+compiled in its own sandbox directory by a thread pool.
+A target is keyed by the hash of its entries, the template and the toolchain,
+so only targets whose inputs changed are recompiled.
+"""
+##-- imports
+from __future__ import annotations
+
+import hashlib
+import json
+import logging as logmod
+import os
+import pathlib as pl
+import re
+import shutil
+import subprocess
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import InitVar, dataclass, field
+from string import Template
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bibtexparser.bibdatabase import BibDatabase
+
+from bkmkorg.bibtex.writer import JGBibTexWriter
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["BibTarget", "BibCompiler", "group_by_year", "group_by_tag", "DEFAULT_TOOLCHAIN"]
+
+Entry : TypeAlias = dict[str, Any]
+
+TEX_TEMPLATE : Final = Template(r"""\documentclass[a4paper]{article}
+\usepackage[utf8]{inputenc}
+\usepackage[T1]{fontenc}
+\usepackage[backend=biber, style=authoryear, sorting=nyt]{biblatex}
+\addbibresource{$bib}
+\title{$title}
+\date{}
+\begin{document}
+\maketitle
+\nocite{*}
+\printbibliography[heading=none]
+\end{document}
+""")
+
+# no shell escape, and nothing that fetches from the network
+DEFAULT_TOOLCHAIN : Final = (
+    ("pdflatex", "-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape", "{stem}.tex"),
+    ("biber", "--quiet", "{stem}"),
+    ("pdflatex", "-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape", "{stem}.tex"),
+    ("pdflatex", "-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape", "{stem}.tex"),
+)
+
+MANIFEST_VERSION : Final = 1
+TEX_ESCAPE       : Final = str.maketrans({x: f"\\{x}" for x in "&%$#_{}"})
+NAME_CLEAN_RE    : Final = re.compile(r"[^a-zA-Z0-9_\-]+")
+TAGSPLIT_RE      : Final = re.compile(r",|;")
+
+def _writable(entry:Entry) -> Entry:
+    """ The entry without processing fields, or crossrefs, as they are already merged in """
+    return {x: y for x, y in entry.items() if x[0] != "_" and x != "crossref"}
+
+@dataclass
+class BibTarget:
+    """ A named group of entries, compiled to a single bibliography """
+
+    name    : str         = field()
+    title   : str         = field()
+    entries : list[Entry] = field(default_factory=list)
+
+    @property
+    def stem(self) -> str:
+        return NAME_CLEAN_RE.sub("_", self.name)
+
+    def bib_text(self, writer:JGBibTexWriter) -> str:
+        db = BibDatabase()
+        db.entries = [_writable(x) for x in self.entries]
+        return writer.write(db)
+
+    def tex_text(self) -> str:
+        return TEX_TEMPLATE.substitute(bib=f"{self.stem}.bib", title=self.title.translate(TEX_ESCAPE))
+
+def group_by_year(entries:Iterable[Entry], min_entries:int=1) -> list[BibTarget]:
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[entry.get('year', "unknown")].append(entry)
+
+    return [BibTarget(f"year_{year}", f"Bibliography: {year}", group)
+            for year, group in sorted(groups.items()) if min_entries <= len(group)]
+
+def group_by_tag(entries:Iterable[Entry], min_entries:int=1) -> list[BibTarget]:
+    groups = defaultdict(list)
+    for entry in entries:
+        tags = entry.get('__tags') or {x.strip() for x in TAGSPLIT_RE.split(entry.get('tags', "")) if bool(x.strip())}
+        for tag in tags:
+            groups[tag].append(entry)
+
+    return [BibTarget(f"tag_{tag}", f"Bibliography: {tag}", group)
+            for tag, group in sorted(groups.items()) if min_entries <= len(group)]
+
+@dataclass
+class BibCompiler:
+    """
+    Compile targets into `out_dir`, skipping those whose key is unchanged in the manifest.
+    Each target is built in a fresh directory under `work_dir`
+    """
+
+    out_dir   : pl.Path                       = field()
+    work_dir  : pl.Path                       = field()
+    toolchain : tuple[tuple[str, ...], ...]   = field(default=DEFAULT_TOOLCHAIN)
+    workers   : None|int                      = field(default=None)
+    timeout   : int                           = field(default=300)
+
+    writer    : JGBibTexWriter                = field(default_factory=JGBibTexWriter)
+    manifest  : dict[str, str]                = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.work_dir / "manifest.json"
+        if not manifest.exists():
+            return
+        try:
+            data = json.loads(manifest.read_text())
+        except json.JSONDecodeError as err:
+            logging.warning("Bad Compile Manifest %s : %s", manifest, err)
+            return
+        if data.get("version") == MANIFEST_VERSION:
+            self.manifest = data['targets']
+
+    def write_manifest(self):
+        manifest = self.work_dir / "manifest.json"
+        temp     = manifest.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_text(json.dumps({"version": MANIFEST_VERSION, "targets": self.manifest}, indent=1, sort_keys=True))
+        temp.replace(manifest)
+
+    def key(self, bib:str, tex:str) -> str:
+        hasher = hashlib.sha256()
+        for part in (bib, tex, json.dumps(self.toolchain)):
+            hasher.update(part.encode())
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def target_pdf(self, target:BibTarget) -> pl.Path:
+        return self.out_dir / f"{target.stem}.pdf"
+
+    def compile(self, targets:Iterable[BibTarget]) -> dict[str, bool]:
+        """ Compile changed targets. Returns target name -> whether it is up to date """
+        jobs, results = [], {}
+        for target in targets:
+            bib, tex = target.bib_text(self.writer), target.tex_text()
+            key      = self.key(bib, tex)
+            if self.manifest.get(target.name) == key and self.target_pdf(target).exists():
+                results[target.name] = True
+                continue
+            jobs.append((target, bib, tex, key))
+
+        logging.info("Compiling %s targets, %s unchanged", len(jobs), len(results))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._build, target, bib, tex) : (target, key) for target, bib, tex, key in jobs}
+            for future in as_completed(futures):
+                target, key = futures[future]
+                results[target.name] = future.result()
+                if results[target.name]:
+                    self.manifest[target.name] = key
+                else:
+                    self.manifest.pop(target.name, None)
+
+        self.write_manifest()
+        return results
+
+    def _build(self, target:BibTarget, bib:str, tex:str) -> bool:
+        with tempfile.TemporaryDirectory(dir=self.work_dir, prefix=f"{target.stem}_") as sandbox:
+            sandbox = pl.Path(sandbox)
+            (sandbox / f"{target.stem}.bib").write_text(bib)
+            (sandbox / f"{target.stem}.tex").write_text(tex)
+            # keep TeX's caches in the sandbox, so parallel builds don't share them
+            env = dict(os.environ, TEXMFVAR=str(sandbox / ".texmf-var"), HOME=str(sandbox))
+            for step in self.toolchain:
+                cmd = [x.format(stem=target.stem) for x in step]
+                try:
+                    result = subprocess.run(cmd, cwd=sandbox, env=env, capture_output=True,
+                                            stdin=subprocess.DEVNULL, timeout=self.timeout, shell=False)
+                except (OSError, subprocess.TimeoutExpired) as err:
+                    logging.warning("Compile Failed: %s : %s : %s", target.name, cmd[0], err)
+                    return False
+                if result.returncode != 0:
+                    tail = result.stdout.decode("utf-8", "replace").splitlines()[-10:]
+                    logging.warning("Compile Failed: %s : %s\n%s", target.name, cmd[0], "\n".join(tail))
+                    return False
+
+            built = sandbox / f"{target.stem}.pdf"
+            if not built.exists():
+                logging.warning("Compile Produced No Pdf: %s", target.name)
+                return False
+
+            shutil.copyfile(built, self.target_pdf(target))
+            return True
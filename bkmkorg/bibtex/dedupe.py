@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Find the same work entered more than once across the bibtex library.
+
+Entries are indexed by exact keys: their bibtex ID, normalised DOI,
+normalised ISBN-13, and (first surname, year, title prefix).
+Titles are also MinHashed, and banded into buckets (LSH),
+so near identical titles meet in a bucket without comparing every pair.
+Each key and bucket is visited once, and buckets larger than `max_bucket`
+are skipped, so the pass is linear in the size of the library.
+
+Candidate pairs are joined into clusters with a union-find,
+and a cluster can be merged into its most complete entry.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import pathlib as pl
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import numpy as np
+from bibtexparser.bibdatabase import BibDatabase
+
+from bkmkorg.bibtex.latex import latex_to_unicode
+from bkmkorg.bibtex.names import InvalidName, split_names
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["DupeCluster", "DupeFinder", "merge_entries", "merge_clusters", "norm_doi", "norm_isbn", "norm_title"]
+
+Entry : TypeAlias = dict[str, Any]
+
+DOI_PREFIX_RE : Final = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", flags=re.IGNORECASE)
+ISBN_RE       : Final = re.compile(r"[0-9Xx][0-9Xx\- ]{8,16}[0-9Xx]")
+NON_WORD_RE   : Final = re.compile(r"[^a-z0-9]+")
+LATEX_CMD_RE  : Final = re.compile(r"\\[a-zA-Z]+\s*|[{}\\]")
+TAGSPLIT_RE   : Final = re.compile(r"\s*,\s*")
+FILE_KEY_RE   : Final = re.compile(r"file\d*")
+MERSENNE      : Final = (1 << 31) - 1
+SHINGLE       : Final = 3
+STOPWORDS     : Final = frozenset(["a", "an", "the", "of", "on", "in", "and", "to", "for"])
+
+def _fold(text:str) -> str:
+    """ lowercase ascii alphanumerics and single spaces """
+    text = latex_to_unicode(text) if ("\\" in text or "{" in text) else text
+    text = LATEX_CMD_RE.sub("", text)
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return NON_WORD_RE.sub(" ", text.lower()).strip()
+
+def norm_doi(value:str) -> None|str:
+    value = DOI_PREFIX_RE.sub("", value.strip()).strip().lower()
+    return value if value.startswith("10.") else None
+
+def _isbn13(digits:str) -> None|str:
+    match len(digits):
+        case 10 if digits[:9].isdigit():
+            digits = "978" + digits[:9]
+        case 13 if digits.isdigit():
+            digits = digits[:12]
+        case _:
+            return None
+
+    check = (10 - sum(int(x) * (3 if i % 2 else 1) for i, x in enumerate(digits)) % 10) % 10
+    return f"{digits}{check}"
+
+def norm_isbn(value:str) -> set[str]:
+    """ Every ISBN in a field, as ISBN-13, with its check digit recomputed """
+    results = set()
+    for found in ISBN_RE.findall(value):
+        digits = found.replace("-", "").replace(" ", "").upper()
+        if (isbn := _isbn13(digits)) is not None:
+            results.add(isbn)
+    return results
+
+def norm_title(value:str) -> str:
+    return _fold(value)
+
+def _surname(entry:Entry) -> None|str:
+    for key in ("author", "editor"):
+        if not bool(entry.get(key, "")):
+            continue
+        try:
+            first = split_names(entry[key])[0]
+        except (InvalidName, IndexError):
+            return None
+        return _fold(" ".join(first.get('last', []))) or None
+    return None
+
+@dataclass
+class DupeCluster:
+    """ Indices of entries that appear to be the same work, and why """
+
+    members : list[int] = field(default_factory=list)
+    reasons : set[str]  = field(default_factory=set)
+
+class _UnionFind:
+
+    def __init__(self, size:int):
+        self.parent  = list(range(size))
+        self.reasons = defaultdict(set)
+
+    def find(self, idx:int) -> int:
+        parent = self.parent
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx         = parent[idx]
+        return idx
+
+    def union(self, left:int, right:int, reason:str):
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            if right < left:
+                left, right = right, left
+            self.parent[right] = left
+            self.reasons[left] |= self.reasons.pop(right, set())
+        self.reasons[left].add(reason)
+
+@dataclass
+class DupeFinder:
+    """
+    Cluster duplicate candidates among `entries`.
+    `title_threshold` is the estimated title Jaccard similarity (of character shingles)
+    above which a fuzzy title match counts, when the entries also share a surname or a year
+    """
+
+    entries         : list[Entry] = field()
+    num_perm        : int         = field(default=64)
+    bands           : int         = field(default=16)
+    title_threshold : float       = field(default=0.8)
+    prefix_words    : int         = field(default=3)
+    min_title       : int         = field(default=12)
+    max_bucket      : int         = field(default=50)
+    seed            : int         = field(default=1)
+
+    _titles         : list[str]          = field(init=False, repr=False, default_factory=list)
+    _surnames       : list[None|str]     = field(init=False, repr=False, default_factory=list)
+
+    def __post_init__(self):
+        assert(self.num_perm % self.bands == 0)
+        self._titles   = [norm_title(x.get('title', "")) for x in self.entries]
+        self._surnames = [_surname(x) for x in self.entries]
+
+    def keys(self, idx:int) -> Iterator[tuple[str, Any]]:
+        """ The exact index keys of an entry """
+        entry = self.entries[idx]
+        yield "id", entry['ID']
+        if (doi := norm_doi(entry.get('doi', ""))) is not None:
+            yield "doi", doi
+        for isbn in norm_isbn(entry.get('isbn', "")):
+            yield "isbn", isbn
+
+        words = [x for x in self._titles[idx].split() if x not in STOPWORDS][:self.prefix_words]
+        if bool(words) and self._surnames[idx] is not None and bool(entry.get('year', "")):
+            yield "name", (self._surnames[idx], entry['year'].strip(), " ".join(words))
+
+    def minhashes(self, chunk:int=2048) -> np.ndarray:
+        """ An entries x num_perm matrix of title minhashes. Short titles are all 0, and are skipped """
+        rand       = np.random.default_rng(self.seed)
+        mult       = rand.integers(1, MERSENNE, size=self.num_perm, dtype=np.uint64)
+        add        = rand.integers(0, MERSENNE, size=self.num_perm, dtype=np.uint64)
+        signatures = np.zeros((len(self.entries), self.num_perm), dtype=np.uint64)
+
+        for start in range(0, len(self.entries), chunk):
+            rows, hashes = [], []
+            for idx in range(start, min(start + chunk, len(self.entries))):
+                title = self._titles[idx].replace(" ", "")
+                if len(title) < self.min_title:
+                    continue
+                shingles = {title[i:i+SHINGLE] for i in range(len(title) - SHINGLE + 1)}
+                rows.append((idx, len(shingles)))
+                hashes.extend(zlib.crc32(x.encode()) % MERSENNE for x in shingles)
+
+            if not bool(rows):
+                continue
+            values  = np.array(hashes, dtype=np.uint64)
+            # (a * x + b) mod p, for every shingle and permutation at once
+            permed  = (values[:, None] * mult[None, :] + add[None, :]) % MERSENNE
+            offsets = np.cumsum([0] + [x[1] for x in rows[:-1]])
+            signatures[[x[0] for x in rows]] = np.minimum.reduceat(permed, offsets, axis=0)
+
+        return signatures
+
+    def clusters(self) -> list[DupeCluster]:
+        found = _UnionFind(len(self.entries))
+
+        ##-- exact keys
+        index = defaultdict(list)
+        for idx in range(len(self.entries)):
+            for key in self.keys(idx):
+                index[key].append(idx)
+
+        for (kind, _), members in index.items():
+            for other in members[1:]:
+                found.union(members[0], other, kind)
+        ##-- end exact keys
+
+        ##-- fuzzy titles
+        signatures = self.minhashes()
+        rows       = self.num_perm // self.bands
+        active     = np.flatnonzero(signatures.any(axis=1))
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            cols    = signatures[active, band*rows:(band+1)*rows]
+            for idx, key in zip(active.tolist(), map(bytes, cols)):
+                buckets[key].append(idx)
+
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                if self.max_bucket < len(members):
+                    logging.info("Skipping Oversized Title Bucket: %s entries", len(members))
+                    continue
+                self._check_bucket(members, signatures, found)
+        ##-- end fuzzy titles
+
+        groups = defaultdict(list)
+        for idx in range(len(self.entries)):
+            groups[found.find(idx)].append(idx)
+
+        return [DupeCluster(members, found.reasons[root]) for root, members in sorted(groups.items()) if 1 < len(members)]
+
+    def _check_bucket(self, members:list[int], signatures:np.ndarray, found:_UnionFind):
+        for i, left in enumerate(members):
+            for right in members[i+1:]:
+                if found.find(left) == found.find(right):
+                    continue
+                same_context = ((self._surnames[left] is not None and self._surnames[left] == self._surnames[right])
+                                or self.entries[left].get('year') == self.entries[right].get('year'))
+                if not same_context:
+                    continue
+                similarity = float((signatures[left] == signatures[right]).mean())
+                if self.title_threshold <= similarity:
+                    found.union(left, right, "title")
+
+    def report(self, clusters:list[DupeCluster], sources:None|list[Any]=None) -> str:
+        """ A readable list of clusters. `sources` gives each entry's file """
+        report = [f"Entries: {len(self.entries)}", f"Candidate Clusters: {len(clusters)}"]
+        for i, cluster in enumerate(clusters, 1):
+            report += ["", f"-- Cluster {i} ({', '.join(sorted(cluster.reasons))})"]
+            width   = max(len(self.entries[x]['ID']) for x in cluster.members)
+            for idx in cluster.members:
+                entry  = self.entries[idx]
+                source = f" : {sources[idx]}" if sources is not None else ""
+                report.append(f"{entry['ID']:<{width}} : {entry.get('year', '')}{source} : {entry.get('title', '')}")
+
+        return "\n".join(report)
+
+def _is_file(key:str) -> bool:
+    return FILE_KEY_RE.fullmatch(key) is not None
+
+def _writable(entry:Entry) -> Entry:
+    """ The entry without the parser's `_` prefixed fields, such as _crossref """
+    return {x: y for x, y in entry.items() if x[0] != "_"}
+
+def _completeness(entry:Entry) -> int:
+    return sum(1 for key, value in entry.items() if key[0] != "_" and bool(value))
+
+def merge_entries(entries:list[Entry]) -> tuple[Entry, list[Entry]]:
+    """
+    Merge a cluster into its most complete entry, the earliest on ties.
+    Missing fields are filled from the others, tags are combined,
+    and every distinct file is kept, as file, file1, file2...
+    Returns the updated entry and the entries to remove.
+    """
+    primary = max(entries, key=_completeness)
+    others  = [x for x in entries if x is not primary]
+    tags    = set()
+    files   = []
+    for entry in [primary, *others]:
+        tags.update(x for x in TAGSPLIT_RE.split(entry.get('tags', "").strip()) if bool(x))
+        files += [value for key, value in sorted(entry.items()) if _is_file(key) and bool(value) and value not in files]
+        for key, value in entry.items():
+            if key[0] != "_" and not _is_file(key) and bool(value) and not bool(primary.get(key, "")):
+                primary[key] = value
+
+    for key in [x for x in primary if _is_file(x)]:
+        del primary[key]
+    for i, fname in enumerate(files):
+        primary["file" if i == 0 else f"file{i}"] = fname
+    if bool(tags):
+        primary['tags'] = ",".join(sorted(tags))
+
+    return primary, others
+
+def merge_clusters(dbs:dict[Any, BibDatabase], clusters:list[DupeCluster], entries:list[Entry]) -> set[Any]:
+    """
+    Merge each cluster of `entries`, which are the entries of `dbs` in order,
+    removing the merged away entries and redirecting crossrefs to them.
+    Returns the keys of the databases that changed,
+    whose entries are left ready for the writer
+    """
+    owners    = {id(entry): key for key, db in dbs.items() for entry in db.entries}
+    removed   = set()
+    redirects = {}
+    changed   = set()
+    for cluster in clusters:
+        primary, others = merge_entries([entries[x] for x in cluster.members])
+        changed.update(owners[id(entries[x])] for x in cluster.members)
+        for entry in others:
+            removed.add(id(entry))
+            redirects[entry['ID']] = primary['ID']
+
+    for key, db in dbs.items():
+        db.entries = [x for x in db.entries if id(x) not in removed]
+        for entry in db.entries:
+            for ref in ("crossref", "_crossref"):
+                if entry.get(ref, None) in redirects:
+                    entry[ref] = redirects[entry[ref]]
+                    changed.add(key)
+
+    for key in changed:
+        dbs[key].entries = [_writable(x) for x in dbs[key].entries]
+
+    return changed
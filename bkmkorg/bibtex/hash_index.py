@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+An incremental content hash index of library files.
+
+Each file's SHA-256 is recorded with its size and mtime,
+so only new or modified files are rehashed on later runs.
+Files are read once through mmap, in a thread pool,
+as hashlib releases the GIL for large updates.
+
+If xxhash is installed, an xxh3 digest is computed in the same pass,
+so `fast` verification of unchanged files can skip SHA-256.
+"""
+##-- imports
+from __future__ import annotations
+
+import hashlib
+import json
+import logging as logmod
+import mmap
+import os
+import pathlib as pl
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["HashRecord", "HashReport", "HashIndex", "hash_file"]
+
+INDEX_VERSION : Final = 1
+CHUNK         : Final = 2 ** 22
+
+@dataclass
+class HashRecord:
+    size     : int           = field()
+    mtime_ns : int           = field()
+    sha256   : str           = field()
+    xxh3     : None|str      = field(default=None)
+
+    def same_stat(self, stat:os.stat_result) -> bool:
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+def hash_file(fpath:pl.Path, sha:bool=True) -> tuple[os.stat_result, None|str, None|str]:
+    """ The stat, sha256 and xxh3 of a file, in one read. sha=False only computes xxh3, if available """
+    sha_h   = hashlib.sha256() if sha or xxhash is None else None
+    xxh3_h  = xxhash.xxh3_128() if xxhash is not None else None
+    hashers = [x for x in (sha_h, xxh3_h) if x is not None]
+
+    with open(fpath, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for start in range(0, stat.st_size, CHUNK):
+                    for hasher in hashers:
+                        hasher.update(view[start:start+CHUNK])
+
+    return (stat,
+            None if sha_h is None else sha_h.hexdigest(),
+            None if xxh3_h is None else xxh3_h.hexdigest())
+
+@dataclass
+class HashReport:
+    hashed     : int                        = field(default=0)
+    verified   : int                        = field(default=0)
+    missing    : list[pl.Path]              = field(default_factory=list)
+    modified   : list[pl.Path]              = field(default_factory=list)
+    corrupt    : list[pl.Path]              = field(default_factory=list)
+    duplicates : dict[str, list[pl.Path]]   = field(default_factory=dict)
+    owners     : dict[pl.Path, set[str]]    = field(default_factory=dict)
+
+    def _describe(self, fpath:pl.Path) -> str:
+        if fpath in self.owners:
+            return f"{fpath} ({', '.join(sorted(self.owners[fpath]))})"
+        return str(fpath)
+
+    def __str__(self):
+        report = [f"Hashed   : {self.hashed}",
+                  f"Verified : {self.verified}",
+                  f"Missing  : {len(self.missing)}",
+                  f"Modified : {len(self.modified)}",
+                  f"Corrupt  : {len(self.corrupt)}",
+                  f"Duplicate Sets : {len(self.duplicates)}",
+                  ]
+        report += ["", "-- Corrupt (content changed, size and mtime unchanged)"] + [self._describe(x) for x in sorted(self.corrupt)]
+        report += ["", "-- Modified"] + [self._describe(x) for x in sorted(self.modified)]
+        report += ["", "-- Missing"] + [self._describe(x) for x in sorted(self.missing)]
+        report += ["", "-- Duplicates"]
+        for digest, paths in sorted(self.duplicates.items(), key=lambda x: sorted(x[1])):
+            report.append(f"{digest} : " + " : ".join(self._describe(x) for x in sorted(paths)))
+
+        return "\n".join(report)
+
+@dataclass
+class HashIndex:
+    """
+    path -> HashRecord, persisted as json.
+    `update` hashes files that are new or whose size or mtime changed,
+    and rehashes a `verify` fraction of the rest to detect silent corruption.
+    """
+
+    path    : pl.Path               = field()
+    workers : None|int              = field(default=None)
+    records : dict[str, HashRecord] = field(default_factory=dict)
+
+    @classmethod
+    def read(cls, path:pl.Path, **kwargs) -> HashIndex:
+        index = cls(path, **kwargs)
+        if not path.exists():
+            return index
+
+        try:
+            data = json.loads(path.read_text())
+        except json.JSONDecodeError as err:
+            logging.warning("Bad Hash Index %s : %s", path, err)
+            return index
+
+        if data.get("version") == INDEX_VERSION:
+            index.records = {x: HashRecord(*y) for x, y in data['records'].items()}
+
+        return index
+
+    def write(self):
+        temp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_text(json.dumps({"version" : INDEX_VERSION,
+                                    "records" : {x: [y.size, y.mtime_ns, y.sha256, y.xxh3] for x, y in sorted(self.records.items())}}))
+        temp.replace(self.path)
+
+    def update(self, files:Iterable[pl.Path], verify:float=0.0, fast:bool=False, seed:None|int=None) -> HashReport:
+        report   = HashReport()
+        to_hash  = []
+        to_check = []
+        files    = sorted(set(files))
+        for fpath in files:
+            try:
+                stat = fpath.stat()
+            except FileNotFoundError:
+                report.missing.append(fpath)
+                continue
+
+            match self.records.get(str(fpath)):
+                case None:
+                    to_hash.append(fpath)
+                case record if not record.same_stat(stat):
+                    to_hash.append(fpath)
+                case record:
+                    to_check.append(fpath)
+
+        checking = random.Random(seed).sample(to_check, k=round(len(to_check) * verify)) if bool(to_check) else []
+        fast     = fast and xxhash is not None
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            hashed   = pool.map(self._hash, to_hash)
+            # fast verification only needs the xxh3 digest, if the record has one
+            needs_sha = [not (fast and self.records[str(x)].xxh3 is not None) for x in checking]
+            verified  = pool.map(self._hash, checking, needs_sha)
+
+            for fpath, (stat, sha, xxh3) in zip(to_hash, hashed):
+                if stat is None:
+                    report.missing.append(fpath)
+                    continue
+                if str(fpath) in self.records and self.records[str(fpath)].sha256 != sha:
+                    report.modified.append(fpath)
+                self.records[str(fpath)] = HashRecord(stat.st_size, stat.st_mtime_ns, sha, xxh3)
+                report.hashed += 1
+
+            for fpath, with_sha, (stat, sha, xxh3) in zip(checking, needs_sha, verified):
+                if stat is None:
+                    report.missing.append(fpath)
+                    continue
+                record = self.records[str(fpath)]
+                if with_sha:
+                    same = record.sha256 == sha
+                else:
+                    same = record.xxh3 == xxh3
+                if not same:
+                    report.corrupt.append(fpath)
+                report.verified += 1
+
+        report.duplicates = self.duplicates(files)
+        return report
+
+    def _hash(self, fpath:pl.Path, sha:bool=True) -> tuple[None|os.stat_result, None|str, None|str]:
+        try:
+            return hash_file(fpath, sha=sha)
+        except OSError as err:
+            logging.warning("Failed to Hash %s : %s", fpath, err)
+            return None, None, None
+
+    def duplicates(self, files:None|Iterable[pl.Path]=None) -> dict[str, list[pl.Path]]:
+        """ sha256 -> paths, for digests shared by more than one of `files`, or of the whole index """
+        keys    = self.records.keys() if files is None else {str(x) for x in files}
+        by_hash = defaultdict(list)
+        for key in keys:
+            if key in self.records:
+                by_hash[self.records[key].sha256].append(pl.Path(key))
+
+        return {x: sorted(y) for x, y in by_hash.items() if 1 < len(y)}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Minimal rewrites of cleaned bib files.
+
+Each entry's canonical form is its JGBibTexWriter output.
+Hashing each entry's original text and its cleaned canonical form
+finds the entries cleaning actually changed:
+- none changed: the file is left alone, keeping its mtime,
+  or copied if the target is not the file itself.
+- a few changed: only those entries are spliced into the original text.
+- otherwise, or if entries were added, removed or reordered: the file is rewritten.
+"""
+##-- imports
+from __future__ import annotations
+
+import enum
+import hashlib
+import logging as logmod
+import pathlib as pl
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bibtexparser.bibdatabase import BibDatabase
+
+from bkmkorg.bibtex.tokenizer import BibTokenizer
+from bkmkorg.bibtex.writer import JGBibTexWriter
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["RewritePlan", "BibRewrite", "entry_hash"]
+
+class RewritePlan(enum.Enum):
+    unchanged = enum.auto()
+    splice    = enum.auto()
+    rewrite   = enum.auto()
+
+def entry_hash(text:str) -> str:
+    return hashlib.blake2b(text.rstrip().encode(), digest_size=16).hexdigest()
+
+@dataclass
+class BibRewrite:
+    """
+    Compare a bib file's text to a cleaned database of its entries,
+    and write only what changed.
+    `splice_ratio` is the largest fraction of changed entries that are spliced instead of rewriting.
+    """
+
+    text         : str            = field()
+    writer       : JGBibTexWriter = field(default_factory=JGBibTexWriter)
+    splice_ratio : float          = field(default=0.5)
+    source       : None|pl.Path   = field(default=None)
+
+    ids          : list[str]                 = field(init=False, default_factory=list)
+    spans        : dict[str, tuple[int, int]] = field(init=False, default_factory=dict)
+    before       : dict[str, str]            = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        tokenizer = BibTokenizer(crossref=False)
+        for kind, value, start, end in tokenizer.spans(self.text):
+            if kind != "entry":
+                continue
+            self.ids.append(value['ID'])
+            self.spans[value['ID']]  = (start, end)
+            self.before[value['ID']] = entry_hash(self.text[start:end])
+
+    @classmethod
+    def read(cls, fpath:pl.Path, **kwargs) -> BibRewrite:
+        # decoded as the tokenizer does, so spans match what was parsed
+        return cls(pl.Path(fpath).read_bytes().decode("utf-8", "replace"), source=pl.Path(fpath), **kwargs)
+
+    def render(self, db:BibDatabase) -> dict[str, str]:
+        """ The canonical form of each entry, in writer order """
+        sep = self.writer.entry_separator
+        return {entry['ID']: self.writer._entry_to_bibtex(entry).removesuffix(sep)
+                for entry in self.writer._sorted_entries(db)}
+
+    def plan(self, db:BibDatabase) -> tuple[RewritePlan, dict[str, str]]:
+        """ How to update the file, and the changed entries' canonical text """
+        after = self.render(db)
+        if list(after) != self.ids:
+            return RewritePlan.rewrite, after
+
+        changed = {key: text for key, text in after.items() if entry_hash(text) != self.before[key]}
+        if not bool(changed):
+            return RewritePlan.unchanged, changed
+        if len(changed) <= len(after) * self.splice_ratio:
+            return RewritePlan.splice, changed
+
+        return RewritePlan.rewrite, after
+
+    def splice(self, changed:dict[str, str]) -> str:
+        """ The original text, with only the changed entries replaced """
+        pieces, pos = [], 0
+        for start, end, key in sorted((*self.spans[key], key) for key in changed):
+            pieces.append(self.text[pos:start])
+            pieces.append(changed[key])
+            pos = end
+
+        pieces.append(self.text[pos:])
+        return "".join(pieces)
+
+    def stage(self, db:BibDatabase, target:pl.Path) -> tuple[RewritePlan, None|pl.Path]:
+        """
+        Write the update next to the target, to be moved into place later.
+        None if unchanged and the target is the source file
+        """
+        plan, changed = self.plan(db)
+        staged        = target.with_name(f".{target.name}.staged")
+        match plan:
+            case RewritePlan.unchanged if self.source is not None and target.resolve() == self.source.resolve():
+                logging.info("Unchanged: %s", target)
+                return plan, None
+            case RewritePlan.unchanged if self.source is not None:
+                logging.info("Unchanged, Copying to: %s", target)
+                staged.write_bytes(self.source.read_bytes())
+            case RewritePlan.unchanged:
+                logging.info("Unchanged, Writing: %s", target)
+                staged.write_text(self.text)
+            case RewritePlan.splice:
+                logging.info("Splicing %s entries into: %s", len(changed), target)
+                staged.write_text(self.splice(changed))
+            case RewritePlan.rewrite:
+                logging.info("Rewriting: %s", target)
+                with open(staged, 'w') as f:
+                    self.writer.dump(db, f)
+
+        return plan, staged
+
+    def write(self, db:BibDatabase, target:pl.Path) -> RewritePlan:
+        plan, staged = self.stage(db, target)
+        if staged is not None:
+            staged.replace(target)
+
+        return plan
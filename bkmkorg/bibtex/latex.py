@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Fast LaTeX <-> unicode conversion of bibtex fields.
+
+Equivalent to bibtexparser's latex_to_unicode and the repo's string_to_latex,
+but with tables built once at import:
+- unicode -> latex is a single str.translate table.
+- latex -> unicode applies bibtexparser's ~2500 ordered replacements,
+  but only those whose first two characters occur in the string,
+  found through an index instead of a substring search per replacement.
+
+Both are memoised with a bounded LRU cache,
+as journals, publishers and names repeat across the library.
+"""
+##-- imports
+from __future__ import annotations
+
+import itertools as itz
+import logging as logmod
+import re
+import unicodedata
+from functools import lru_cache
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import regex
+from bibtexparser import latexenc
+from bibtexparser.latexenc import _replace_latex
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["string_to_latex", "latex_to_unicode", "field_to_unicode", "entry_to_unicode"]
+
+CACHE_SIZE     : Final = 2 ** 14
+DEFAULT_ESCAPE : Final = (' ', '{', '}')
+NEWLINE_RE     : Final = regex.compile(r"\n+\s*")
+
+##-- tables
+# unicode -> latex, for single non-ascii characters only, as ascii is never converted
+TO_LATEX       : Final = {ord(x): y for x, y in latexenc.unicode_to_latex_map.items() if len(x) == 1 and not x.isascii()}
+
+# latex -> unicode, in bibtexparser's order
+TO_UNICODE     : Final = [(x, y.rstrip()) for x, y in itz.chain(latexenc.unicode_to_crappy_latex1,
+                                                                latexenc.unicode_to_latex)]
+TO_UNICODE_2   : Final = [(x, y.rstrip()) for x, y in latexenc.unicode_to_crappy_latex2]
+
+def _build_index(replacements) -> dict[str, list[int]]:
+    index = {}
+    for i, (_, latex) in enumerate(replacements):
+        index.setdefault(latex[:2], []).append(i)
+    return index
+
+UNICODE_INDEX  : Final = _build_index(TO_UNICODE)
+STARTS_RE      : Final = re.compile("[{}]".format(re.escape("".join(sorted({x[0] for x in UNICODE_INDEX})))))
+##-- end tables
+
+@lru_cache(maxsize=CACHE_SIZE)
+def string_to_latex(string:str, escape_chars:tuple[str, ...]=DEFAULT_ESCAPE) -> str:
+    """
+    Convert a string to its latex equivalent
+    modified slightly from the default in bibtexparser
+    """
+    if string.isascii():
+        return string
+
+    table = TO_LATEX
+    if any(not x.isascii() for x in escape_chars):
+        table = {x: y for x, y in TO_LATEX.items() if chr(x) not in escape_chars}
+
+    return string.translate(table)
+
+def _candidates(string:str, after:int=-1) -> list[int]:
+    """ Indices of replacements that might apply, from the first two characters of each """
+    found = set()
+    for match in STARTS_RE.finditer(string):
+        found.update(x for x in UNICODE_INDEX.get(string[match.start():match.start()+2], ()) if after < x)
+    return sorted(found)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def latex_to_unicode(string:str) -> str:
+    """ As bibtexparser.latexenc.latex_to_unicode """
+    if '\\' in string or '{' in string:
+        candidates = _candidates(string)
+        pos        = 0
+        while pos < len(candidates):
+            idx      = candidates[pos]
+            unicod, latex = TO_UNICODE[idx]
+            replaced = _replace_latex(string, latex, unicod)
+            pos     += 1
+            if replaced != string:
+                # A replacement can create new matches, so look again
+                string     = replaced
+                candidates = _candidates(string, after=idx)
+                pos        = 0
+
+    string = string.replace("{", "").replace("}", "")
+
+    if '\\' in string or '{' in string:
+        for unicod, latex in TO_UNICODE_2:
+            string = _replace_latex(string, latex, unicod)
+
+    return unicodedata.normalize("NFC", string)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def field_to_unicode(value:str) -> str:
+    """ A field in unicode, with newlines collapsed to spaces """
+    return NEWLINE_RE.sub(" ", latex_to_unicode(value))
+
+def entry_to_unicode(entry:dict) -> dict:
+    """ As bibtexparser's convert_to_unicode, followed by collapsing newlines in str fields """
+    for key, value in entry.items():
+        match value:
+            case str():
+                entry[key] = field_to_unicode(value)
+            case list():
+                entry[key] = [latex_to_unicode(x) for x in value]
+            case dict():
+                entry[key] = {k: latex_to_unicode(v) for k, v in value.items()}
+            case _:
+                entry[key] = latex_to_unicode(value)
+
+    return entry
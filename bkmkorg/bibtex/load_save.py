@@ -37,33 +37,15 @@ logging = logmod.getLogger(__name__)
 import bibtexparser as b
 import doot
 from bibtexparser import customization as c
-from bibtexparser.bparser import BibTexParser
-from bibtexparser.latexenc import unicode_to_latex_map
+from concurrent.futures import ProcessPoolExecutor
+from .cache import BibCache, pipeline_id
+from .incremental import BibRewrite, RewritePlan
+from .latex import string_to_latex
+from .tokenizer import BibTokenizer
 from .writer import JGBibTexWriter
 
 __all__ = ["BibLoadSaveMixin"]
 
-default_escape = [' ', '{', '}']
-
-def string_to_latex(string, escape_chars=None):
-    """
-    Convert a string to its latex equivalent
-    modified slightly from the default in bibtexparser
-    """
-    if string.isascii():
-        return string
-
-    escape_chars = escape_chars or default_escape
-    new = []
-    for char in string:
-        match char.isascii() or char in escape_chars:
-            case True:
-                new.append(char)
-            case False:
-                new.append(unicode_to_latex_map.get(char, char))
-
-    return ''.join(new)
-
 class OverrideDict(dict):
     """
     A Simple dict that doesn't error if a key isn't found.
@@ -74,7 +56,29 @@ class OverrideDict(dict):
         if k not in self:
             logging.warning("Adding string to override dict: %s", k)
             self[k] = k
-        return k
+        return super().__getitem__(k)
+
+def _parse_bib_file(fpath:str|pl.Path, fn:callable=None, cache:None|BibCache=None) -> BibtexDatabase:
+    """ Parse a single file, marking but not resolving its crossrefs """
+    if cache is not None and (db:=cache.get(fpath)) is not None:
+        return db
+
+    db           = b.bibdatabase.BibDatabase()
+    db.strings   = OverrideDict()
+    # month macros are kept as written, as BibTexParser(common_strings=False)
+    tokenizer    = BibTokenizer(db, customization=fn, crossref=True, common_strings=False)
+    data         = pl.Path(fpath).read_bytes()
+    try:
+        db.entries.extend(tokenizer.entries(data.decode("utf-8", "replace"), source=fpath))
+    except UnicodeDecodeError as err:
+        raise Exception(f"File: {fpath}, Start: {err.start}") from err
+    except Exception as err:
+        raise err.__class__(f"File: {fpath}", *err.args) from err
+
+    if cache is not None:
+        cache.put(fpath, db, data=data)
+
+    return db
 
 class BibLoadSaveMixin:
 
@@ -86,14 +90,78 @@ class BibLoadSaveMixin:
         except Exception as err:
             raise err.__class__(f"File: {files}", *err.args) from err
 
+    def bc_load_db_parallel(self, files:list[str|pl.Path], fn:callable=None, db=None, workers:None|int=None, cache:None|pl.Path=None) -> BibtexDatabase:
+        """
+        Parse each file in a worker process, running the `fn` customization there,
+        then merge into a single database and resolve crossrefs across all files.
+        `fn` is sent to the workers, so must be picklable, unlike a tasker's bound method.
+
+        If `cache` is a directory, each file's customized entries are cached there,
+        so only changed files are reparsed. Only cache pure customizations,
+        as side effects of `fn` won't happen for cached files.
+        """
+        if db is None:
+            logging.info("Creating new database")
+            db = b.bibdatabase.BibDatabase()
+
+        db.strings = OverrideDict()
+        for fpath, loaded in self.bc_load_dbs_parallel(files, fn=fn, workers=workers, cache=cache).items():
+            db.entries   += loaded.entries
+            db.comments  += loaded.comments
+            db.preambles += loaded.preambles
+            db.strings.update(loaded.strings)
+
+        db.add_missing_from_crossref()
+        logging.info("Bibtex loaded: %s entries", len(db.entries))
+        return db
+
+    def bc_load_dbs_parallel(self, files:list[str|pl.Path], fn:callable=None, workers:None|int=None, cache:None|pl.Path=None) -> dict[str|pl.Path, BibtexDatabase]:
+        """
+        As bc_load_db_parallel, but keeping a database per file, in file order,
+        with crossrefs marked but unresolved, so each can be written back to its file
+        """
+        bib_cache = BibCache(cache, pipeline_id(fn)) if cache is not None else None
+        results   = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map keeps the file order, so the merged entries are deterministic
+            for fpath, loaded in zip(files, pool.map(_parse_bib_file, files, itz.repeat(fn), itz.repeat(bib_cache))):
+                logging.info("Loaded bibtex: %s (%s entries)", fpath, len(loaded.entries))
+                results[fpath] = loaded
+
+        return results
+
     def bc_db_to_str(self, db, fn:callable, lib_root) -> str:
         writer = JGBibTexWriter()
         for entry in db.entries:
             fn(entry, lib_root)
 
-        result = writer.write(self.current_db)
+        result = writer.write(db)
         return result
 
+    def bc_db_to_file(self, db, fn:callable, lib_root, fpath:pl.Path):
+        """ As bc_db_to_str, but streaming each entry to the file """
+        writer = JGBibTexWriter()
+        for entry in db.entries:
+            fn(entry, lib_root)
+
+        with open(fpath, 'w') as f:
+            writer.dump(db, f)
+
+    def bc_update_file(self, db, fn:callable, lib_root, source:pl.Path, target:pl.Path) -> RewritePlan:
+        """ As bc_db_to_file, but only writes the entries that changed from the source file """
+        for entry in db.entries:
+            fn(entry, lib_root)
+
+        return BibRewrite.read(source).write(db, target)
+
+    def bc_stage_file(self, db, fn:callable, lib_root, source:pl.Path, target:pl.Path) -> None|pl.Path:
+        """ As bc_update_file, but leaves the update next to the target, to replace it later """
+        for entry in db.entries:
+            fn(entry, lib_root)
+
+        _, staged = BibRewrite.read(source).stage(db, target)
+        return staged
+
     def bc_prepare_entry_for_write(self, entry, lib_root) -> None:
         """ convert processed __{field}'s into strings in {field},
         removing the the __{field} once processed
@@ -175,38 +243,17 @@ class BibLoadSaveMixin:
 
         return results
 
-    def _make_parser(self, func):
-        bparser = BibTexParser(common_strings=False)
-        bparser.customization             = func
-        bparser.ignore_nonstandard_types  = False
-        bparser.homogenise_fields         = True
-        bparser.expect_multiple_parse     = True
-        bparser.add_missing_from_crossref = True
-        bparser.alt_dict = {
-            'authors'  : u'author',
-            'editors'  : u'editor',
-            'urls'     : u'url',
-            'link'     : u'url',
-            'links'    : u'url',
-            'subjects' : u'subject',
-            'xref'     : u'crossref',
-            "school"   : "institution",
-        }
-        return bparser
-
     def _parse_bib_files(self, bib_files:list[str|pl.Path], fn=None, db=None):
         """ Parse all the bibtext files into a shared database """
-        bparser = self._make_parser(fn)
         if db is None:
             logging.info("Creating new database")
             db = b.bibdatabase.BibDatabase()
 
         db.strings = OverrideDict()
 
-        bparser.bib_database = db
+        tokenizer = BibTokenizer(db, customization=fn, crossref=True, common_strings=False)
         for x in bib_files:
             logging.info("Loading bibtex: %s", x)
-            text = pl.Path(x).read_bytes().decode("utf-8", "replace")
-            bparser.parse(text, partial=True)
+            tokenizer.parse_file(x)
         logging.info("Bibtex loaded: %s entries", len(db.entries))
         return db
@@ -24,7 +24,7 @@ from uuid import UUID, uuid1
 from weakref import ref
 
 import fitz
-from bibtexparser.customization import splitname
+from bkmkorg.bibtex.names import splitname
 from bkmkorg.bibtex.writer import JGBibTexWriter
 from pdfrw import PdfName, PdfReader, PdfWriter
 
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Splitting bibtex names into their First, von, Last and Jr parts.
+
+Equivalent to bibtexparser's customization.splitname,
+(see http://tug.ctan.org/info/bibtex/tamethebeast/ttb_en.pdf),
+but plain names, without braces or escapes, are split with str methods
+instead of a character loop.
+Only names using braces or escapes take the slow path.
+
+`split_name` and `split_names` memoise on the raw string,
+as the same authors recur across a library.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import re
+from functools import lru_cache
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bibtexparser.customization import InvalidName
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["splitname", "split_name", "split_names", "InvalidName"]
+
+NameParts : TypeAlias = dict[str, list[str]]
+
+CACHE_SIZE : Final = 2 ** 14
+WHITESPACE : Final = frozenset(' ~\r\n\t')
+WORD_SEP   : Final = re.compile(r"[ ~\r\n\t]+")
+AND_RE     : Final = re.compile(r"\ and\ ", flags=re.IGNORECASE)
+SLOW_CHARS : Final = re.compile(r"[{}\\]")
+
+def _case(word:str) -> int:
+    """ 1 = uppercase, 0 = lowercase, -1 = caseless, from the first letter """
+    for char in word:
+        if char.isalpha():
+            return 1 if char.isupper() else 0
+    return -1
+
+def _plain_sections(name:str) -> list[list[str]]:
+    """ Words of each comma separated section, for names with no braces or escapes """
+    # Commas after the third section are just word separators
+    return [[x for x in WORD_SEP.split(section) if bool(x)]
+            for section in (x.replace(",", " ") for x in name.split(",", 2))]
+
+def _braced_sections(name:str, strict_mode:bool) -> tuple[list[list[str]], list[list[int]]]:
+    """ The full character loop, tracking brace levels, escapes and special characters """
+    sections   = [[]]
+    cases      = [[]]
+    word       = []
+    case       = -1
+    level      = 0
+    bracestart = False
+    controlseq = True
+    specialchar = None
+
+    nameiter = iter(name)
+    for char in nameiter:
+        if char == '\\':
+            escaped = next(nameiter, None)
+            if escaped is None:
+                raise InvalidName(f"Trailing escape in the name {{{name}}}.")
+            # Whitespace can't be escaped, so fall through to end the word
+            if escaped in WHITESPACE:
+                word.append(char)
+                char = escaped
+            else:
+                if bracestart:
+                    bracestart  = False
+                    controlseq  = escaped.isalpha()
+                    specialchar = True
+                elif case == -1 and escaped.isalpha():
+                    case = 1 if escaped.isupper() else 0
+                word.append(char)
+                word.append(escaped)
+                continue
+
+        if char == '{':
+            level      += 1
+            bracestart  = True
+            controlseq  = False
+            specialchar = False
+            word.append(char)
+            continue
+
+        bracestart = False
+        if char == '}':
+            if level:
+                level -= 1
+            elif strict_mode:
+                raise InvalidName(f"Unmatched closing brace in name {{{name}}}.")
+            else:
+                word.insert(0, '{')
+            controlseq  = False
+            specialchar = False
+            word.append(char)
+            continue
+
+        if level:
+            if controlseq:
+                controlseq = char.isalpha()
+            elif specialchar and case == -1 and char.isalpha():
+                case = 1 if char.isupper() else 0
+            word.append(char)
+            continue
+
+        if char == ',' or char in WHITESPACE:
+            if word:
+                sections[-1].append(''.join(word))
+                cases[-1].append(case)
+                word        = []
+                case        = -1
+                controlseq  = False
+                specialchar = False
+            if char != ',':
+                pass
+            elif len(sections) < 3:
+                sections.append([])
+                cases.append([])
+            elif strict_mode:
+                raise InvalidName(f"Too many commas in the name {{{name}}}.")
+            continue
+
+        word.append(char)
+        if case == -1 and char.isalpha():
+            case = 1 if char.isupper() else 0
+
+    if level:
+        if strict_mode:
+            raise InvalidName(f"Unterminated opening brace in the name {{{name}}}.")
+        word += ['}'] * level
+
+    if word:
+        sections[-1].append(''.join(word))
+        cases[-1].append(case)
+
+    return sections, cases
+
+def splitname(name:str, strict_mode:bool=True) -> NameParts:
+    """
+    Break a name into its constituent parts: First, von, Last, and Jr,
+    as bibtexparser.customization.splitname.
+
+    Raises InvalidName in strict mode for a trailing comma, too many commas,
+    or unbalanced braces. Otherwise works around them.
+    A trailing escape is always invalid.
+    """
+    if SLOW_CHARS.search(name) is None:
+        if strict_mode and name.count(",") > 2:
+            raise InvalidName(f"Too many commas in the name {{{name}}}.")
+        sections = _plain_sections(name)
+        cases    = None
+    else:
+        sections, cases = _braced_sections(name, strict_mode)
+
+    # Get rid of a trailing section
+    if not sections[-1]:
+        if len(sections) > 1 and strict_mode:
+            raise InvalidName(f"Trailing comma at end of name {{{name}}}.")
+        sections.pop()
+
+    if not any(sections):
+        return {}
+
+    parts = {'first': [], 'last': [], 'von': [], 'jr': []}
+    lead  = sections[0]
+    if len(sections) == 1 and len(lead) < 3:
+        # First Last, or just Last
+        parts['first'] = lead[:-1]
+        parts['last']  = lead[-1:]
+        return parts
+
+    if len(sections) > 1:
+        # von Last, Jr, First
+        if sections[-1] and sections[-1][0]:
+            parts['first'] = sections[-1]
+        if len(sections) == 3 and sections[1] and sections[1][0]:
+            parts['jr'] = sections[1]
+        if len(lead) == 1:
+            parts['last'] = lead
+            return parts
+
+    lcases = [_case(x) for x in lead] if cases is None else cases[0]
+    if 0 not in lcases:
+        # No lowercase, so no von
+        if len(sections) == 1:
+            parts['first'] = lead[:-1]
+            parts['last']  = lead[-1:]
+        else:
+            parts['last'] = lead
+        return parts
+
+    if len(sections) == 1:
+        # First von Last: von is from the first to the last lowercase word, but Last can't be empty
+        firstl = lcases.index(0)
+        lastl  = min(len(lcases) - lcases[::-1].index(0), len(lcases) - 1)
+        parts['first'] = lead[:firstl]
+        parts['von']   = lead[firstl:lastl]
+        parts['last']  = lead[lastl:]
+    else:
+        # von Last: von ends with the last lowercase word, but Last can't be empty
+        split = len(lcases) - lcases[::-1].index(0)
+        if split == len(lcases):
+            split = 0
+        parts['von']  = lead[:split]
+        parts['last'] = lead[split:]
+
+    return parts
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _split_frozen(name:str) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    return tuple((key, tuple(words)) for key, words in splitname(name, strict_mode=False).items())
+
+def split_name(name:str) -> NameParts:
+    """ A memoised, non-strict splitname. Returns a fresh dict each call, so it can be modified """
+    return {key: list(words) for key, words in _split_frozen(name.strip())}
+
+def split_names(text:str) -> list[NameParts]:
+    """ Split an `and` separated list of names """
+    return [split_name(x) for x in AND_RE.split(text)]
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Page counts and embedded metadata of the pdf library.
+
+Each pdf is summarised in a worker process:
+its size, page count, and the title, author and DOI from its Info dict,
+or a DOI from its XMP metadata.
+Summaries are cached by content hash, using the incremental HashIndex,
+so only new or modified pdfs are opened on later runs.
+Failed summaries aren't cached, so they are retried.
+"""
+##-- imports
+from __future__ import annotations
+
+import json
+import logging as logmod
+import os
+import pathlib as pl
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import InitVar, asdict, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from pdfrw import PdfReader
+
+from bkmkorg.bibtex.hash_index import HashIndex
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["PdfSummary", "PdfLibrarySummary", "summarise_pdf"]
+
+CACHE_VERSION : Final = 2
+DOI_RE        : Final = re.compile(r"\b(10\.\d{4,9}/[^\s\"'<>\])]+)")
+TABLE_COLUMNS : Final = ["id", "path", "size", "pages", "title", "author", "doi"]
+
+@dataclass
+class PdfSummary:
+    path   : pl.Path   = field()
+    size   : int       = field(default=0)
+    pages  : None|int  = field(default=None)
+    title  : None|str  = field(default=None)
+    author : None|str  = field(default=None)
+    doi    : None|str  = field(default=None)
+    error  : None|str  = field(default=None)
+
+    def cached(self) -> list:
+        return [self.pages, self.title, self.author, self.doi, self.error]
+
+def _info_value(info, key:str) -> None|str:
+    match getattr(info, key, None):
+        case None:
+            return None
+        case value if hasattr(value, "to_unicode"):
+            text = value.to_unicode().strip()
+        case value:
+            text = str(value).strip()
+
+    return text or None
+
+def _xmp_text(reader) -> str:
+    metadata = getattr(reader.Root, "Metadata", None)
+    if metadata is None or metadata.stream is None:
+        return ""
+
+    data = metadata.stream.encode("latin-1")
+    if metadata.Filter == "/FlateDecode":
+        try:
+            data = zlib.decompress(data)
+        except zlib.error:
+            return ""
+    return data.decode("utf-8", "replace")
+
+def summarise_pdf(fpath:pl.Path) -> PdfSummary:
+    """ Open a pdf and summarise it. Failures are recorded, not raised """
+    summary = PdfSummary(fpath)
+    try:
+        summary.size  = fpath.stat().st_size
+        reader        = PdfReader(str(fpath))
+        summary.pages = len(reader.pages)
+        info          = reader.Info or {}
+        summary.title  = _info_value(info, "Title")
+        summary.author = _info_value(info, "Author")
+        for text in (_info_value(info, "doi"), _info_value(info, "Subject"), _info_value(info, "Keywords"), _xmp_text(reader)):
+            if text and (found := DOI_RE.search(text)):
+                summary.doi = found[1].rstrip(".,;")
+                break
+    except Exception as err:
+        summary.error = f"{type(err).__name__}: {err}"
+
+    return summary
+
+@dataclass
+class PdfLibrarySummary:
+    """
+    Summarise a set of pdfs, reusing cached summaries of unchanged content.
+    The cache maps sha256 -> summary fields, so moved or duplicated pdfs are not reopened
+    """
+
+    cache_path : pl.Path   = field()
+    index      : HashIndex = field()
+    workers    : None|int  = field(default=None)
+
+    summaries  : dict[pl.Path, PdfSummary] = field(init=False, default_factory=dict)
+    _cache     : dict[str, list]           = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        if not self.cache_path.exists():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text())
+        except json.JSONDecodeError as err:
+            logging.warning("Bad Pdf Summary Cache %s : %s", self.cache_path, err)
+            return
+        if data.get("version") == CACHE_VERSION:
+            self._cache = data['summaries']
+
+    def write_cache(self):
+        temp = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_text(json.dumps({"version": CACHE_VERSION, "summaries": self._cache}))
+        temp.replace(self.cache_path)
+
+    def run(self, files:Iterable[pl.Path]) -> dict[pl.Path, PdfSummary]:
+        files = sorted(set(files))
+        self.index.update(files)
+        self.index.write()
+
+        missing = []
+        for fpath in files:
+            record = self.index.records.get(str(fpath))
+            if record is None:
+                continue
+            if record.sha256 in self._cache:
+                self.summaries[fpath] = PdfSummary(fpath, record.size, *self._cache[record.sha256])
+            else:
+                missing.append(fpath)
+
+        logging.info("Summarising %s pdfs, %s cached", len(missing), len(self.summaries))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for summary in pool.map(summarise_pdf, missing, chunksize=16):
+                self.summaries[summary.path] = summary
+                if summary.error is not None:
+                    logging.warning("Pdf Summary Failed: %s : %s", summary.path, summary.error)
+                    continue
+                self._cache[self.index.records[str(summary.path)].sha256] = summary.cached()
+
+        self.write_cache()
+        return self.summaries
+
+    def table(self, owners:None|dict[pl.Path, set[str]]=None) -> str:
+        """
+        A tab separated table, one row per pdf and bibtex ID that references it.
+        Pdfs no entry references have an empty ID
+        """
+        owners = owners or {}
+        rows   = ["\t".join(TABLE_COLUMNS)]
+        for fpath, summary in sorted(self.summaries.items()):
+            cells = [str(fpath), str(summary.size), "" if summary.pages is None else str(summary.pages),
+                     *(_clean_cell(x) for x in (summary.title, summary.author, summary.doi))]
+            for ident in sorted(owners.get(fpath, None) or [""]):
+                rows.append("\t".join([ident, *cells]))
+
+        return "\n".join(rows)
+
+def _clean_cell(value:None|str) -> str:
+    if value is None:
+        return ""
+    return " ".join(value.split())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Planned, journaled moves of pdf library files.
+
+A MovePlan collects every move for the whole library before any happen,
+renaming destinations that collide with existing files or other moves.
+A MoveJournal writes the plan ahead of executing it in a thread pool,
+and records each completed move,
+so an interrupted run can be resumed or rolled back from the journal.
+"""
+##-- imports
+from __future__ import annotations
+
+import json
+import logging as logmod
+import os
+import pathlib as pl
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+from uuid import uuid4
+
+from bkmkorg.bibtex.snapshot import LIVE_FILES, LiveFiles
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["MovePlan", "MoveJournal", "prune_empty"]
+
+@dataclass
+class MovePlan:
+    """ src -> dst moves, with no two moves to the same destination """
+
+    moves : dict[pl.Path, pl.Path] = field(default_factory=dict)
+    _taken : set[pl.Path]          = field(default_factory=set, init=False, repr=False)
+
+    def __bool__(self):
+        return bool(self.moves)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def add(self, src:pl.Path, dst:pl.Path, fs:LiveFiles=LIVE_FILES) -> pl.Path:
+        """ Plan a move, returning the destination it will actually have """
+        if src in self.moves:
+            return self.moves[src]
+
+        while dst in self._taken or dst in self.moves or fs.exists(dst):
+            logging.debug("Move Collision, finding a unique path: %s", dst)
+            dst = dst.with_stem(f"{dst.stem}_{uuid4().hex[:5]}")
+
+        self._taken.add(dst)
+        self.moves[src] = dst
+        return dst
+
+    def collisions(self, fs:LiveFiles=LIVE_FILES) -> list[str]:
+        """ Problems that would stop the plan executing cleanly """
+        return [problem for problems in self.colliding(fs).values() for problem in problems]
+
+    def colliding(self, fs:LiveFiles=LIVE_FILES) -> dict[pl.Path, list[str]]:
+        """ src -> the problems of each move that can't execute cleanly """
+        problems = {}
+        targets  = {}
+        for src, dst in self.moves.items():
+            targets.setdefault(dst, []).append(src)
+
+        for src, dst in self.moves.items():
+            found = []
+            if len(targets[dst]) > 1:
+                found.append(f"Multiple moves to the same destination: {dst}")
+            if dst in self.moves:
+                found.append(f"Destination is also moved: {dst}")
+            if not fs.exists(src):
+                found.append(f"Source is missing: {src}")
+            if fs.exists(dst):
+                found.append(f"Destination exists: {dst}")
+            if bool(found):
+                problems[src] = found
+
+        return problems
+
+    def discard(self, srcs:Iterable[pl.Path]) -> dict[pl.Path, pl.Path]:
+        """ Remove moves from the plan, returning dst -> src of each removed move """
+        reverted = {}
+        for src in srcs:
+            dst = self.moves.pop(src, None)
+            if dst is None:
+                continue
+            self._taken.discard(dst)
+            reverted[dst] = src
+
+        return reverted
+
+def _move(src:pl.Path, dst:pl.Path) -> pl.Path:
+    if dst.exists():
+        raise FileExistsError(dst)
+    src.rename(dst)
+    return src
+
+def prune_empty(dirs:Iterable[pl.Path], lib_root:pl.Path) -> list[pl.Path]:
+    """ Remove empty directories, and their emptied parents, up to the library root """
+    removed = []
+    for current in sorted(set(dirs), key=lambda x: len(x.parts), reverse=True):
+        while current != lib_root and current.is_relative_to(lib_root):
+            try:
+                current.rmdir()
+            except OSError:
+                break
+            removed.append(current)
+            current = current.parent
+
+    return removed
+
+@dataclass
+class MoveJournal:
+    """
+    A write-ahead journal of json lines:
+    one `{"src", "dst"}` line per planned move, then a `{"done"}` line per completed move.
+    The journal is removed once the moves and bib updates are complete.
+    Until then later runs append to it, as the bib files still name the first run's sources.
+    """
+
+    path    : pl.Path  = field()
+    workers : None|int = field(default=None)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> tuple[dict[pl.Path, pl.Path], set[pl.Path]]:
+        moves, done = {}, set()
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # a partial last line from an interruption
+                    logging.warning("Bad Move Journal Line: %s", line)
+                    continue
+                match record:
+                    case {"src": src, "dst": dst}:
+                        moves[pl.Path(src)] = pl.Path(dst)
+                    case {"done": src}:
+                        done.add(pl.Path(src))
+
+        return moves, done
+
+    def _append(self, f, record:dict):
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    def execute(self, plan:MovePlan) -> dict[pl.Path, pl.Path]:
+        """ Journal the plan, then move everything in it. Returns the completed moves """
+        # appended, to keep the redirects of earlier runs whose bibs weren't updated
+        with open(self.path, 'a') as f:
+            for src, dst in plan.moves.items():
+                f.write(json.dumps({"src": str(src), "dst": str(dst)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        return self._run(plan.moves, set())
+
+    def _run(self, moves:dict[pl.Path, pl.Path], done:set[pl.Path]) -> dict[pl.Path, pl.Path]:
+        pending = {src: dst for src, dst in moves.items() if src not in done}
+        # create destinations first, so workers never race on mkdir
+        for parent in {dst.parent for dst in pending.values()}:
+            parent.mkdir(parents=True, exist_ok=True)
+
+        failures = []
+        with open(self.path, 'a') as f, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(_move, src, dst) : src for src, dst in pending.items()}
+            for future in as_completed(futures):
+                try:
+                    self._append(f, {"done": str(future.result())})
+                    done.add(futures[future])
+                except OSError as err:
+                    logging.warning("Move Failed: %s : %s", futures[future], err)
+                    failures.append(futures[future])
+
+        if bool(failures):
+            raise OSError(f"{len(failures)} Moves failed, see {self.path} to resume or roll back", failures)
+
+        logging.info("Moved %s files", len(pending))
+        return {src: moves[src] for src in done}
+
+    def resume(self) -> dict[pl.Path, pl.Path]:
+        """
+        Finish an interrupted run's moves.
+        Returns all the completed moves, each to its final destination
+        if a later run moved it again
+        """
+        moves, done = self.load()
+        for src, dst in moves.items():
+            # moved, but interrupted before it was journaled
+            if src not in done and dst.exists() and not src.exists():
+                done.add(src)
+
+        logging.info("Resuming Moves: %s of %s remaining", len(moves) - len(done), len(moves))
+        completed = self._run(moves, done)
+        for src, dst in completed.items():
+            seen = {src}
+            while dst in completed and dst not in seen:
+                seen.add(dst)
+                dst = completed[dst]
+            completed[src] = dst
+
+        return completed
+
+    def rollback(self) -> int:
+        """ Undo an interrupted run's moves, and remove the journal """
+        moves, done = self.load()
+        for src, dst in moves.items():
+            if src not in done and dst.exists() and not src.exists():
+                done.add(src)
+
+        undone = 0
+        # latest first, so moves of moved files are undone before the moves they follow
+        for src in reversed([x for x in moves if x in done]):
+            dst = moves[src]
+            if not dst.exists() or src.exists():
+                logging.warning("Can't roll back move: %s -> %s", src, dst)
+                continue
+            src.parent.mkdir(parents=True, exist_ok=True)
+            dst.rename(src)
+            undone += 1
+
+        logging.info("Rolled back %s moves", undone)
+        self.complete()
+        return undone
+
+    def complete(self):
+        self.path.unlink(missing_ok=True)
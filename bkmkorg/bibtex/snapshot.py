@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+An in-memory snapshot of the pdf library, to answer the path queries
+of bibtex cleaning without a syscall per file field.
+
+The library is walked once with os.scandir, recording each path's
+(device, inode) and each directory's children.
+Existence, samefile, emptiness and resolution under the root come from the snapshot.
+Paths outside the root, or under a symlink, fall through to the filesystem,
+as do misses, so case or unicode normalisation insensitive filesystems
+find paths spelt differently to their directory entries.
+Moves and directory creation through the snapshot keep it current.
+
+`LiveFiles` is the same interface, answered directly by the filesystem.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import os
+import pathlib as pl
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["LiveFiles", "LibrarySnapshot", "LIVE_FILES"]
+
+Node : TypeAlias = tuple[int, int, bool]  # device, inode, is_dir
+
+class LiveFiles:
+    """ Path queries answered directly by the filesystem """
+
+    def resolve(self, path:str|pl.Path) -> pl.Path:
+        return pl.Path(path).expanduser().resolve()
+
+    def exists(self, path:pl.Path) -> bool:
+        return pl.Path(path).exists()
+
+    def is_dir(self, path:pl.Path) -> bool:
+        return pl.Path(path).is_dir()
+
+    def samefile(self, path:pl.Path, other:pl.Path) -> bool:
+        return pl.Path(path).samefile(other)
+
+    def is_empty(self, path:pl.Path) -> bool:
+        return not any(pl.Path(path).iterdir())
+
+    def mkdir(self, path:pl.Path):
+        pl.Path(path).mkdir(parents=True, exist_ok=True)
+
+    def rename(self, orig:pl.Path, target:pl.Path) -> pl.Path:
+        return pl.Path(orig).rename(target)
+
+LIVE_FILES : Final = LiveFiles()
+
+@dataclass
+class LibrarySnapshot(LiveFiles):
+    """ Path queries for a library root, answered from a single scan """
+
+    root    : pl.Path          = field()
+
+    alias   : str              = field(init=False)
+    nodes   : dict[str, Node]  = field(init=False, default_factory=dict)
+    children: dict[str, set[str]] = field(init=False, default_factory=dict)
+    links   : set[str]         = field(init=False, default_factory=set)
+
+    def __post_init__(self):
+        self.alias = os.path.normpath(os.path.expanduser(self.root))
+        self.root  = pl.Path(self.alias).resolve()
+        self.scan(str(self.root))
+        logging.info("Library Snapshot: %s paths", len(self.nodes))
+
+    def scan(self, top:str):
+        """ Index `top` and everything below it """
+        try:
+            stat = os.stat(top, follow_symlinks=False)
+        except OSError:
+            return
+
+        self.nodes[top] = (stat.st_dev, stat.st_ino, os.path.isdir(top) and not os.path.islink(top))
+        if not self.nodes[top][2]:
+            return
+
+        stack = [(top, stat.st_dev)]
+        while stack:
+            current, dev = stack.pop()
+            names = self.children.setdefault(current, set())
+            try:
+                found = os.scandir(current)
+            except OSError as err:
+                logging.warning("Snapshot failed to scan %s : %s", current, err)
+                continue
+
+            with found:
+                for entry in found:
+                    names.add(entry.name)
+                    if entry.is_symlink():
+                        self.links.add(entry.path)
+                        self.nodes[entry.path] = (dev, entry.inode(), False)
+                    elif entry.is_dir(follow_symlinks=False):
+                        # directories may be mount points, so stat them for their device
+                        sub_dev = entry.stat(follow_symlinks=False).st_dev
+                        self.nodes[entry.path] = (sub_dev, entry.inode(), True)
+                        stack.append((entry.path, sub_dev))
+                    else:
+                        self.nodes[entry.path] = (dev, entry.inode(), False)
+
+    def forget(self, path:str):
+        """ Drop `path` and everything below it """
+        for name in self.children.pop(path, ()):
+            self.forget(os.path.join(path, name))
+        self.nodes.pop(path, None)
+        self.links.discard(path)
+        parent, name = os.path.split(path)
+        self.children.get(parent, set()).discard(name)
+
+    def invalidate(self, path:pl.Path):
+        """ Rescan a path after it was changed outside the snapshot """
+        key = self._key(path)
+        if key is None:
+            return
+        self.forget(key)
+        self.scan(key)
+        parent, name = os.path.split(key)
+        if key in self.nodes and parent in self.children:
+            self.children[parent].add(name)
+
+    def _key(self, path:str|pl.Path) -> None|str:
+        """ The snapshot key for a path, or None if the snapshot can't answer for it """
+        text = os.path.normpath(os.path.expanduser(path))
+        if not os.path.isabs(text) or ".." in pl.PurePath(str(path)).parts:
+            return None
+
+        root = str(self.root)
+        for prefix in (root, self.alias):
+            if text == prefix or text.startswith(prefix + os.sep):
+                break
+        else:
+            return None
+
+        key    = root + text[len(prefix):]
+        parent = os.path.dirname(key)
+        while len(root) < len(parent):
+            if parent in self.links:
+                return None
+            parent = os.path.dirname(parent)
+
+        return key
+
+    def resolve(self, path:str|pl.Path) -> pl.Path:
+        match self._key(path):
+            case None:
+                return super().resolve(path)
+            case key if key in self.links:
+                return super().resolve(path)
+            case key:
+                return pl.Path(key)
+
+    def exists(self, path:pl.Path) -> bool:
+        match self._key(path):
+            case None:
+                return super().exists(path)
+            case key if key in self.links:
+                return super().exists(path)
+            case key if key in self.nodes:
+                return True
+            case key:
+                return super().exists(path)
+
+    def is_dir(self, path:pl.Path) -> bool:
+        match self._key(path):
+            case None:
+                return super().is_dir(path)
+            case key if key in self.links:
+                return super().is_dir(path)
+            case key if key in self.nodes:
+                return self.nodes[key][2]
+            case key:
+                return super().is_dir(path)
+
+    def samefile(self, path:pl.Path, other:pl.Path) -> bool:
+        keys = self._key(path), self._key(other)
+        if any(x is None or x in self.links or x not in self.nodes for x in keys):
+            return super().samefile(path, other)
+
+        return self.nodes[keys[0]][:2] == self.nodes[keys[1]][:2]
+
+    def is_empty(self, path:pl.Path) -> bool:
+        match self._key(path):
+            case None:
+                return super().is_empty(path)
+            case key if key not in self.children:
+                return super().is_empty(path)
+            case key:
+                return not bool(self.children[key])
+
+    def mkdir(self, path:pl.Path):
+        super().mkdir(path)
+        key = self._key(path)
+        if key is None or key in self.nodes:
+            return
+
+        # index the newly created ancestors, from the highest
+        missing = []
+        while key not in self.nodes and len(str(self.root)) < len(key):
+            missing.append(key)
+            key = os.path.dirname(key)
+        for created in reversed(missing):
+            self.invalidate(pl.Path(created))
+
+    def rename(self, orig:pl.Path, target:pl.Path) -> pl.Path:
+        result = super().rename(orig, target)
+        for changed in (orig, target):
+            match self._key(changed):
+                case None:
+                    pass
+                case key if os.path.lexists(key):
+                    self.invalidate(pl.Path(key))
+                case key:
+                    self.forget(key)
+        return result
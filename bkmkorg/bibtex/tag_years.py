@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Columnar storage of the tags of bibtex entries, by year.
+
+Each (tag, entry) pair is a row of (tag_id, year, entry_id),
+appended to compact typed arrays and exposed as numpy arrays,
+so tag timelines, the tag x year matrix and sparklines
+are all produced from one sort and one bincount.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+from array import array
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import numpy as np
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["BibTagTable", "NO_YEAR", "SPARKS", "YEAR_RANGE"]
+
+NO_YEAR    : Final = -1
+SPARKS     : Final = " ▁▂▃▄▅▆▇█"
+YEAR_RANGE : Final = (1000, 2100)
+
+class BibTagTable:
+    """
+    A growable columnar table of (tag, year, entry) rows.
+    Entries whose year isn't a number, or is outside `years` (inclusive),
+    are recorded with NO_YEAR, and left out of timelines and the matrix
+    """
+
+    def __init__(self, years:tuple[int, int]=YEAR_RANGE):
+        self.years   : tuple[int, int] = years
+        self.vocab   : dict[str, int] = {}
+        self.names   : list[str]      = []
+        self.entries : list[str]      = []
+        self._tag    = array('I')
+        self._year   = array('i')
+        self._entry  = array('I')
+
+    def __len__(self):
+        return len(self._tag)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} uses, {len(self.names)} tags, {len(self.entries)} entries>"
+
+    def tag_id(self, tag:str) -> int:
+        idx = self.vocab.get(tag, None)
+        if idx is None:
+            idx = len(self.names)
+            self.vocab[tag] = idx
+            self.names.append(tag)
+        return idx
+
+    def add(self, entry_id:str, year:int|str, tags:Iterable[str]) -> int:
+        """ Add an entry's tags, returning the entry's row id """
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            year = NO_YEAR
+        else:
+            if not (self.years[0] <= year <= self.years[1]):
+                logging.warning("Implausible Year for %s : %s", entry_id, year)
+                year = NO_YEAR
+
+        entry = len(self.entries)
+        ids   = [self.tag_id(x) for x in set(tags)]
+        self.entries.append(entry_id)
+        self._tag.extend(ids)
+        self._year.extend([year] * len(ids))
+        self._entry.extend([entry] * len(ids))
+        return entry
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """ Each column as a numpy array """
+        # copied, as arrays can't be resized while exporting buffers
+        return {
+            "tag"   : np.frombuffer(self._tag,   dtype=np.uint32).copy(),
+            "year"  : np.frombuffer(self._year,  dtype=np.int32).copy(),
+            "entry" : np.frombuffer(self._entry, dtype=np.uint32).copy(),
+        }
+
+    def counts(self) -> np.ndarray:
+        """ Entries per tag, of all years """
+        return np.bincount(self.columns()['tag'], minlength=len(self.names))
+
+    def matrix(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (years, counts), where counts is a tags x years matrix of entries,
+        over every year from the first to the last with a dated entry
+        """
+        cols  = self.columns()
+        dated = cols['year'] != NO_YEAR
+        tags, years = cols['tag'][dated], cols['year'][dated]
+        if not bool(years.size):
+            return np.zeros(0, dtype=np.int32), np.zeros((len(self.names), 0), dtype=np.int64)
+
+        first, span = int(years.min()), int(years.max() - years.min()) + 1
+        combined    = tags.astype(np.int64) * span + (years - first)
+        counts      = np.bincount(combined, minlength=len(self.names) * span).reshape(len(self.names), span)
+        return np.arange(first, first + span, dtype=np.int32), counts
+
+    def timelines(self, min_entries:int=1) -> dict[str, list[tuple[int, str]]]:
+        """
+        tag -> [(year, entry id)], in year then insertion order,
+        for tags with at least `min_entries` dated entries
+        """
+        cols  = self.columns()
+        dated = cols['year'] != NO_YEAR
+        tags, years, entries = cols['tag'][dated], cols['year'][dated], cols['entry'][dated]
+        # lexsort is stable and sorts by the last key first
+        order = np.lexsort((entries, years, tags))
+        tags, years, entries = tags[order], years[order], entries[order]
+
+        bounds  = np.flatnonzero(np.diff(tags)) + 1
+        starts  = np.concatenate(([0], bounds)).tolist()
+        ends    = np.concatenate((bounds, [tags.size])).tolist()
+        names   = self.entries
+        results = {}
+        for start, end in zip(starts, ends):
+            if end <= start or end - start < min_entries:
+                continue
+            results[self.names[tags[start]]] = list(zip(years[start:end].tolist(), (names[x] for x in entries[start:end].tolist())))
+
+        return results
+
+    def sparklines(self, min_entries:int=1) -> dict[str, str]:
+        """
+        tag -> a sparkline of its entries per year, over the full year range,
+        each scaled to the tag's own busiest year
+        """
+        years, counts = self.matrix()
+        totals        = counts.sum(axis=1)
+        keep          = np.flatnonzero((totals >= min_entries) & (totals > 0))
+        if not bool(keep.size):
+            return {}
+
+        rows   = counts[keep]
+        peaks  = rows.max(axis=1, keepdims=True)
+        levels = np.ceil(rows * (len(SPARKS) - 1) / peaks).astype(np.int64)
+        chars  = np.array(list(SPARKS))[levels]
+        return {self.names[x]: "".join(y) for x, y in zip(keep.tolist(), chars.tolist())}
+
+    def matrix_tsv(self, min_entries:int=1) -> str:
+        """ The tags x years matrix as a tab separated table, one row per tag """
+        years, counts = self.matrix()
+        totals        = counts.sum(axis=1)
+        rows          = ["\t".join(["tag", "total", *(str(x) for x in years.tolist())])]
+        for idx in sorted(np.flatnonzero((totals >= min_entries) & (totals > 0)).tolist(), key=lambda x: self.names[x]):
+            rows.append("\t".join([self.names[idx], str(totals[idx]), *(str(x) for x in counts[idx].tolist())]))
+
+        return "\n".join(rows)
+
+    def sparkline_report(self, min_entries:int=1) -> str:
+        years, _ = self.matrix()
+        lines    = self.sparklines(min_entries)
+        if not bool(lines):
+            return ""
+
+        width  = max(len(x) for x in lines)
+        report = [f"{'':<{width}} : {years[0]} - {years[-1]}"]
+        report += [f"{tag:<{width}} : {line}" for tag, line in sorted(lines.items())]
+        return "\n".join(report)
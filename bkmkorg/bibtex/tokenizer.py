@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+A streaming bibtex tokenizer, replacing bibtexparser v1's pyparsing grammar.
+
+Produces the same entry dicts as BibTexParser with
+interpolated strings and no field homogenisation:
+lowercased field names, outer braces/quotes removed,
+`#` concatenations and @string macros expanded,
+and continuation lines left-stripped.
+
+Malformed items become comments, as in bibtexparser,
+but are logged with their line number.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import pathlib as pl
+import re
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bibtexparser.bibdatabase import COMMON_STRINGS, BibDatabase, UndefinedString
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+__all__ = ["BibTokenizer", "BibTokenizeError"]
+
+Entry : TypeAlias = dict[str, Any]
+
+WS_RE         : Final = re.compile(r"\s*")
+ITEM_RE       : Final = re.compile(r"@\s*([a-zA-Z]+)\s*([{(])")
+KEY_RE        : Final = re.compile(r"\s*([^,]*?)\s*,")
+FIELD_RE      : Final = re.compile(r"([a-zA-Z0-9_\-().+]+)\s*=\s*")
+NAME_RE       : Final = re.compile(r"[a-zA-Z0-9_\-:]+")
+DIGITS_RE     : Final = re.compile(r"[0-9]+")
+BRACE_RE      : Final = re.compile(r"[{}]")
+QUOTED_RE     : Final = re.compile(r"[{}\"]")
+NEXT_ITEM_RE  : Final = re.compile(r"[ \t]*\n\s*@")
+SPACE_RE      : Final = re.compile(r"\s")
+BOM           : Final = "﻿"
+
+CLOSERS       : Final = {"{": "}", "(": ")"}
+
+class BibTokenizeError(ValueError):
+    """ A malformed item, at a position in the text """
+
+    def __init__(self, msg, pos):
+        super().__init__(msg, pos)
+        self.pos = pos
+
+def strip_after_new_lines(value:str) -> str:
+    """ Left strip every line but the first, as bibtexparser does """
+    if "\n" not in value and "\r" not in value:
+        return value
+    lines = value.splitlines()
+    return "\n".join([lines[0]] + [x.lstrip() for x in lines[1:]])
+
+class BibTokenizer:
+    """
+    Tokenize bibtex text into (kind, value) items, where kind is one of
+    entry, string, preamble or comment.
+
+    `entries` streams customized entry dicts,
+    `parse` collects everything into a BibDatabase and resolves crossrefs.
+    """
+
+    def __init__(self, db:None|BibDatabase=None, customization:None|Callable[[Entry], Entry]=None, crossref:bool=True, common_strings:bool=True):
+        self.db            = db if db is not None else BibDatabase()
+        self.customization = customization
+        self.crossref      = crossref
+        if common_strings:
+            # month macros, as BibTexParser, without replacing the db's own strings
+            for name, expansion in COMMON_STRINGS.items():
+                self.db.strings.setdefault(name, expansion)
+
+    def parse_file(self, fpath:pl.Path) -> BibDatabase:
+        text = pl.Path(fpath).read_bytes().decode("utf-8", "replace")
+        return self.parse(text, source=fpath)
+
+    def parse(self, text:str, source:Any=None) -> BibDatabase:
+        self.db.entries.extend(self.entries(text, source=source))
+        if self.crossref:
+            self.db.add_missing_from_crossref()
+
+        return self.db
+
+    def entries(self, text:str, source:Any=None) -> Iterator[Entry]:
+        """
+        Stream entries, customized and with crossrefs marked but unresolved.
+        @strings, @comments and @preambles are stored in the database as they are found
+        """
+        for kind, value in self.tokenize(text, source=source):
+            match kind:
+                case "entry":
+                    if self.crossref and "crossref" in value:
+                        value['_crossref'] = value['crossref']
+                    if self.customization is not None:
+                        value = self.customization(value)
+                    yield value
+                case "string":
+                    name, expansion = value
+                    if name in self.db.strings:
+                        logging.warning("Overwriting existing string for key: %s.", name)
+                    self.db.strings[name] = expansion
+                case "preamble":
+                    self.db.preambles.append(value)
+                case "comment":
+                    self.db.comments.append(value)
+
+    def tokenize(self, text:str, source:Any=None) -> Iterator[tuple[str, Any]]:
+        for kind, value, _, _ in self.spans(text, source=source):
+            yield kind, value
+
+    def spans(self, text:str, source:Any=None) -> Iterator[tuple[str, Any, int, int]]:
+        """ As tokenize, with the start and end position of each item in the text """
+        pos, end = (1 if text.startswith(BOM) else 0), len(text)
+        while True:
+            pos = WS_RE.match(text, pos).end()
+            if end <= pos:
+                return
+
+            start = pos
+            if text[pos] == "@":
+                try:
+                    kind, value, pos = self._item(text, pos)
+                    if kind is not None:
+                        yield kind, value, start, pos
+                    continue
+                except BibTokenizeError as err:
+                    logging.warning("Malformed bibtex in %s (l:%s) : %s",
+                                    source, text.count("\n", 0, err.pos) + 1, err.args[0])
+
+            comment, pos = self._implicit_comment(text, pos)
+            yield "comment", comment, start, pos
+
+    def _implicit_comment(self, text:str, pos:int) -> tuple[str, int]:
+        """ Everything up to the next line starting with '@' """
+        match NEXT_ITEM_RE.search(text, pos):
+            case None:
+                return text[pos:].rstrip(), len(text)
+            case found:
+                return text[pos:found.start()].rstrip("\n"), found.start()
+
+    def _item(self, text:str, pos:int) -> tuple[None|str, Any, int]:
+        if text[pos:pos+8].lower() == "@comment" and not text[pos+8:pos+9].isalnum():
+            comment, pos = self._implicit_comment(text, WS_RE.match(text, pos + 8).end())
+            if comment.startswith("{"):
+                comment = comment[1:]
+            if comment.endswith("}"):
+                comment = comment[:-1]
+            return "comment", comment, pos
+
+        item = ITEM_RE.match(text, pos)
+        if item is None:
+            raise BibTokenizeError("No item type", pos)
+
+        kind, closer, pos = item[1].lower(), CLOSERS[item[2]], item.end()
+        match kind:
+            case "string":
+                name = NAME_RE.match(text, WS_RE.match(text, pos).end())
+                if name is None:
+                    raise BibTokenizeError("Bad string name", pos)
+                pos = self._expect(text, name.end(), "=")
+                parts, pos = self._value(text, pos)
+                value      = self._clean_val(self._join(parts, strip=False))
+                return "string", (name[0].lower(), value), self._expect(text, pos, closer)
+            case "preamble":
+                parts, pos = self._value(text, pos)
+                return "preamble", self._join(parts, strip=False), self._expect(text, pos, closer)
+            case _:
+                entry, pos = self._entry(text, pos, closer)
+                entry['ENTRYTYPE'] = kind
+                return "entry", entry, pos
+
+    def _entry(self, text:str, pos:int, closer:str) -> tuple[Entry, int]:
+        key = KEY_RE.match(text, pos)
+        if key is None or not bool(key[1]) or SPACE_RE.search(key[1]):
+            raise BibTokenizeError("Bad entry key", pos)
+
+        fields = []
+        pos    = key.end()
+        while True:
+            pos = WS_RE.match(text, pos).end()
+            if text.startswith(closer, pos):
+                pos += 1
+                break
+
+            field = FIELD_RE.match(text, pos)
+            if field is None:
+                raise BibTokenizeError("Bad field name", pos)
+
+            parts, pos = self._value(text, field.end())
+            fields.append((field[1], parts))
+            pos = WS_RE.match(text, pos).end()
+            if text.startswith(",", pos):
+                pos += 1
+            elif not text.startswith(closer, pos):
+                raise BibTokenizeError("Expected , or " + closer, pos)
+
+        # The first occurrence of a field wins, as in bibtexparser
+        entry = {}
+        for name, parts in reversed(fields):
+            entry[name.lower()] = self._clean_val(self._join(parts, strip=True))
+
+        entry['ID'] = key[1]
+        return entry, pos
+
+    def _value(self, text:str, pos:int) -> tuple[list[tuple[bool, str]], int]:
+        """ A `#` concatenation of literals and string names, as (is_literal, text) parts """
+        parts = []
+        while True:
+            pos = WS_RE.match(text, pos).end()
+            match text[pos:pos+1]:
+                case "{":
+                    literal, pos = self._braced(text, pos)
+                    parts.append((True, literal))
+                case '"':
+                    literal, pos = self._quoted(text, pos)
+                    parts.append((True, literal))
+                case _ if (digits:=DIGITS_RE.match(text, pos)) is not None and not bool(parts) and not NAME_RE.match(text, digits.end()):
+                    parts.append((True, digits[0]))
+                    return parts, digits.end()
+                case _ if (name:=NAME_RE.match(text, pos)) is not None:
+                    parts.append((False, name[0].lower()))
+                    pos = name.end()
+                case _:
+                    raise BibTokenizeError("Bad value", pos)
+
+            pos = WS_RE.match(text, pos).end()
+            if not text.startswith("#", pos):
+                return parts, pos
+            pos += 1
+
+    def _braced(self, text:str, pos:int) -> tuple[str, int]:
+        depth = 0
+        for brace in BRACE_RE.finditer(text, pos):
+            depth += 1 if brace[0] == "{" else -1
+            if depth == 0:
+                return text[pos+1:brace.start()], brace.end()
+
+        raise BibTokenizeError("Unbalanced braces", pos)
+
+    def _quoted(self, text:str, pos:int) -> tuple[str, int]:
+        depth = 0
+        for char in QUOTED_RE.finditer(text, pos + 1):
+            match char[0]:
+                case "{":
+                    depth += 1
+                case "}" if depth == 0:
+                    break
+                case "}":
+                    depth -= 1
+                case '"' if depth == 0:
+                    return text[pos+1:char.start()], char.end()
+
+        raise BibTokenizeError("Unbalanced quotes", pos)
+
+    def _join(self, parts:list[tuple[bool, str]], strip:bool) -> str:
+        if len(parts) == 1 and parts[0][0]:
+            return strip_after_new_lines(parts[0][1]) if strip else parts[0][1]
+
+        values = []
+        for literal, value in parts:
+            if not literal:
+                values.append(self._expand(value))
+            elif strip:
+                values.append(strip_after_new_lines(value))
+            else:
+                values.append(value)
+
+        return "".join(values)
+
+    def _expand(self, name:str) -> str:
+        """ Expand a macro, or keep its name if it is undefined """
+        try:
+            return self.db.expand_string(name)
+        except UndefinedString:
+            logging.warning("Undefined bibtex string: %s", name)
+            return name
+
+    def _clean_val(self, value:str) -> str:
+        if not value or value == "{}":
+            return ""
+        return value
+
+    def _expect(self, text:str, pos:int, char:str) -> int:
+        pos = WS_RE.match(text, pos).end()
+        if not text.startswith(char, pos):
+            raise BibTokenizeError(f"Expected {char}", pos)
+        return pos + 1
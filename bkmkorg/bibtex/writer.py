@@ -1,17 +1,23 @@
 #!/usr/bin/env python3
+"""
+A bibtex writer formatted for org-ref-clean.
+
+Field order is a precomputed rank map,
+lines are f-strings, and `dump` streams entries to a file handle,
+so writing a database never builds it as one string.
+"""
 ##-- imports
 from __future__ import annotations
 
-import abc
+import io
 import logging as logmod
-from dataclasses import InitVar, dataclass, field
-from string import Template
 from typing import (TYPE_CHECKING, Any, Callable, ClassVar, Final, Generic,
                     Iterable, Iterator, Mapping, Match, MutableMapping,
-                    Protocol, Sequence, Tuple, TypeAlias, TypeGuard, TypeVar,
-                    cast, final, overload, runtime_checkable)
+                    Protocol, Sequence, TextIO, Tuple, TypeAlias, TypeGuard,
+                    TypeVar, cast, final, overload, runtime_checkable)
 
 from bibtexparser import bwriter
+from bibtexparser.bibdatabase import BibDatabase
 
 if TYPE_CHECKING:
     # tc only imports
@@ -20,9 +26,8 @@ if TYPE_CHECKING:
 
 logging    = logmod.getLogger(__name__)
 
-head_line  : Final = Template("@$entry{$id,")
-field_line : Final = Template("$indent$field$eq_buffer= $value,")
 close_line : Final = "}"
+skip_keys  : Final = frozenset(["ENTRYTYPE", "ID"])
 
 class JGBibTexWriter(bwriter.BibTexWriter):
     """
@@ -31,38 +36,75 @@ class JGBibTexWriter(bwriter.BibTexWriter):
 
     def __init__(self, *args):
         super(JGBibTexWriter, self).__init__(*args)
-        self.equals_column = 14
+        self.equals_column   = 14
         self.entry_separator = "\n"
-        self.display_order = ["author", "editor", "title", "subtitle", "short_parties", "year", "journal", "booktitle", "institution", "country", "tags"]
+        self.display_order   = ["author", "editor", "title", "subtitle", "short_parties", "year", "journal", "booktitle", "institution", "country", "tags"]
+
+    @property
+    def display_order(self) -> list[str]:
+        return self._display_order
+
+    @display_order.setter
+    def display_order(self, order:list[str]):
+        # fields in the display order sort first, in that order, then the rest alphabetically
+        self._display_order = list(order)
+        self._rank          = {x: i for i, x in enumerate(self._display_order)}
+        self._prefixes      = {}
+
+    def _prefix(self, field:str) -> str:
+        """ The indented field name and padding up to the `=`, cached per field """
+        if field not in self._prefixes:
+            padding = " " * (self.equals_column - (len(self.indent) + len(field)))
+            self._prefixes[field] = f"{self.indent}{field}{padding}= "
+        return self._prefixes[field]
+
+    def _field_order(self, entry:dict) -> list[str]:
+        rank, last = self._rank, len(self._rank)
+        fields     = [x for x in entry if x[:2] != "__" and x not in skip_keys]
+        return sorted(fields, key=lambda x: (rank.get(x, last), x))
 
     def _entry_to_bibtex(self, entry):
-        filtered_entry     = {x:y for x,y in entry.items() if x[:2] != "__"}
-        bibtex : list[str] = []
-        # Write BibTeX key
-        bibtex.append(head_line.substitute(entry=filtered_entry['ENTRYTYPE'], id=filtered_entry['ID']))
-
-        # create display_order of fields for this entry
-        # first those keys which are both in self.display_order and in entry.keys
-        display_order = [i for i in self.display_order if i in filtered_entry]
-        # then all the other fields sorted alphabetically
-        display_order += [i for i in sorted(filtered_entry) if i not in self.display_order]
-
-        # Write field = value lines
-        for field in [i for i in display_order if i not in ['ENTRYTYPE', 'ID']]:
-            try:
-                buffer_val = " " * (self.equals_column - (len(self.indent) + len(field)))
-                field_val  = bwriter._str_or_expr_to_bibtex(filtered_entry[field])
+        lines = [f"@{entry['ENTRYTYPE']}{{{entry['ID']},"]
+        for field in self._field_order(entry):
+            value = entry[field]
+            if type(value) is not str:
+                try:
+                    value = bwriter._str_or_expr_to_bibtex(value)
+                except TypeError:
+                    raise TypeError(u"The field %s in entry %s must be a string" % (field, entry['ID']))
                 # Remove unnecessary double wrapping
-                if field_val[:2] == "{{" and field_val[-2:] == "}}":
-                    field_val = field_val[1:-1]
-
-                formatted  = field_line.substitute(indent=self.indent,
-                                                   field=field,
-                                                   eq_buffer=buffer_val,
-                                                   value=field_val)
-                bibtex.append(formatted)
-            except TypeError:
-                raise TypeError(u"The field %s in entry %s must be a string" % (field, filtered_entry['ID']))
-        bibtex.append(close_line)
-        as_string = "\n".join(bibtex) + self.entry_separator
-        return as_string
+                if value[:2] == "{{" and value[-2:] == "}}":
+                    value = value[1:-1]
+            elif not (value[:1] == "{" and value[-1:] == "}"):
+                value = f"{{{value}}}"
+
+            lines.append(f"{self._prefix(field)}{value},")
+
+        lines.append(close_line)
+        return "\n".join(lines) + self.entry_separator
+
+    def _sorted_entries(self, bib_database:BibDatabase) -> list[dict]:
+        if not self.order_entries_by:
+            return bib_database.entries
+        return sorted(bib_database.entries, key=lambda x: BibDatabase.entry_sort_key(x, self.order_entries_by))
+
+    def dump(self, bib_database:BibDatabase, handle:TextIO):
+        """ Write the database to an open text file, one entry at a time """
+        for content in self.contents:
+            if content not in self._valid_contents:
+                logging.warning("BibTeX item '%s' does not exist and will not be written. Valid items are %s.",
+                                content, self._valid_contents)
+                continue
+            if content != "entries":
+                handle.write(getattr(self, f"_{content}_to_bibtex")(bib_database))
+                continue
+
+            for i, entry in enumerate(self._sorted_entries(bib_database)):
+                if i:
+                    handle.write(self.entry_separator)
+                handle.write(self._entry_to_bibtex(entry))
+
+    def write(self, bib_database:BibDatabase) -> str:
+        handle = io.StringIO()
+        self.dump(bib_database, handle)
+        return handle.getvalue()
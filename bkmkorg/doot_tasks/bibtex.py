@@ -33,15 +33,23 @@ logging = logmod.getLogger(__name__)
 logmod.getLogger('bibtexparser').setLevel(logmod.CRITICAL)
 ##-- end logging
 
+import os
 import shutil
 
 import itertools
 import bkmkorg
 import doot
 from bkmkorg.bibtex import clean as bib_clean
+from bkmkorg.bibtex import compile as bib_compile
+from bkmkorg.bibtex import dedupe as bib_dedupe
 from bkmkorg.bibtex import utils as bib_utils
+from bkmkorg.bibtex.hash_index import HashIndex
 from bkmkorg.bibtex.load_save import BibLoadSaveMixin
-from bkmkorg.formats.timelinefile import TimelineFile
+from bkmkorg.bibtex.pdf_summary import PdfLibrarySummary
+from bkmkorg.bibtex.relocate import MoveJournal, MovePlan, prune_empty
+from bkmkorg.bibtex.snapshot import LIVE_FILES, LibrarySnapshot
+from bkmkorg.bibtex.tag_years import YEAR_RANGE, BibTagTable
+from bkmkorg.formats.timelinefile import TimelineEntry, TimelineFile
 from doot import globber, tasker
 from doot.mixins.commander import CommanderMixin
 from doot.mixins.batch import BatchMixin
@@ -54,8 +62,12 @@ from doot.tasks.files.backup import BackupTask
 pl_expand : Final = lambda x: pl.Path(x).expanduser().resolve()
 
 min_tag_timeline : Final = doot.config.on_fail(10, int).bibtex.min_timeline()
+tag_year_range   : Final = tuple(doot.config.on_fail(list(YEAR_RANGE), list).bibtex.year_range())
 stub_exts        : Final = doot.config.on_fail([".pdf", ".epub", ".djvu", ".ps"], list).bibtex.stub_exts()
 clean_in_place   : Final = doot.config.on_fail(False, bool).bibtex.clean_in_place()
+bib_workers      : Final = doot.config.on_fail(os.cpu_count(), int).bibtex.workers()
+hash_verify      : Final = doot.config.on_fail(0.05, float).bibtex.hash_verify()
+compile_toolchain: Final = tuple(tuple(x) for x in doot.config.on_fail([list(x) for x in bib_compile.DEFAULT_TOOLCHAIN], list).bibtex.toolchain())
 
 ENT_const        : Final = 'ENTRYTYPE'
 
@@ -93,7 +105,12 @@ class BibtexClean(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, bib_cle
         self.current_db   = None
         self.current_year = None
         self.issues       = []
+        self.snapshot     = None
+        self.moves        = MovePlan()
+        self.pending      = []
+        self.redirects    = {}
         self.locs.ensure("build", "temp", "bibtex", "pdfs")
+        self.journal      = MoveJournal(self.locs.temp / "bib_moves.journal", workers=bib_workers)
 
     def filter(self, fpath):
         if fpath.is_dir():
@@ -103,6 +120,7 @@ class BibtexClean(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, bib_cle
     def set_params(self):
         return [
             { "name": "move-files", "long": "move-files", "type": bool, "default": False },
+            { "name": "rollback-moves", "long": "rollback-moves", "type": bool, "default": False },
             { "name": "clean-in-place", "short": "i", "type": bool, "default": clean_in_place},
         ] + self.target_params()
 
@@ -110,6 +128,7 @@ class BibtexClean(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, bib_cle
         issue_report = self.locs.build / "bib_clean_issues.report"
         task.update({
             "actions" : [
+                self.relocate,
                 lambda: { "key_max" : max((len(x[0]) for x in self.issues), default=1) },
                 lambda task: { "issues" : "\n".join(f"{x[0]:<{task.values['key_max']}} {x[1]}" for x in self.issues) },
                 (self.write_to, [issue_report, "issues"]),
@@ -123,19 +142,84 @@ class BibtexClean(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, bib_cle
         task.update({
             "actions" : [
                 (self.load_and_clean, [fpath]), # -> cleaned
-                self.db_to_str, # -> db
-                (self.write_to, [target, "db"]),
+                (self.db_to_file, [fpath, target]),
             ],
         })
         return task
 
-    def db_to_str(self):
-        return {
-            "db" : self.bc_db_to_str(self.current_db, self.bc_prepare_entry_for_write, self.locs.pdfs)
-        }
+    def db_to_file(self, fpath, target):
+        if self.args['move-files']:
+            # written once every file has moved
+            self.pending.append((self.current_db, fpath, target))
+            return
+
+        self.bc_update_file(self.current_db, self.bc_prepare_entry_for_write, self.locs.pdfs, fpath, target)
+
+    def recover_moves(self):
+        """ Resume or roll back the moves of an interrupted run """
+        if not self.journal.exists():
+            return
+
+        if self.args['rollback-moves']:
+            self.journal.rollback()
+        else:
+            self.redirects = self.journal.resume()
+
+    def relocate(self):
+        """
+        Execute the library's planned moves, remove emptied directories,
+        then replace the bib files with their updates
+        """
+        if self.args['move-files']:
+            self.skip_colliding_moves()
+            if bool(self.moves):
+                self.journal.execute(self.moves)
+                for removed in prune_empty((x.parent for x in self.moves.moves), self.locs.pdfs):
+                    logging.info("Removed Empty Directory: %s", removed)
+                self.snapshot = None
+
+            staged = [(self.bc_stage_file(db, self.bc_prepare_entry_for_write, self.locs.pdfs, fpath, target), target)
+                      for db, fpath, target in self.pending]
+            for temp, target in staged:
+                if temp is not None:
+                    temp.replace(target)
+
+        if not self.journal.exists():
+            return
+        if self.args['clean-in-place']:
+            self.journal.complete()
+        else:
+            logging.warning("Bib files were not cleaned in place, so keeping the move journal: %s", self.journal.path)
+
+    def skip_colliding_moves(self):
+        """
+        Drop moves that can't execute cleanly from the plan,
+        pointing their entries back at the unmoved files,
+        so every other update is still written
+        """
+        colliding = self.moves.colliding(self.snapshot or LIVE_FILES)
+        for src, problems in colliding.items():
+            for problem in problems:
+                logging.error("Move Plan, Skipping %s : %s", src, problem)
+
+        reverted = self.moves.discard(colliding)
+        if not bool(reverted):
+            return
+
+        for db, _, _ in self.pending:
+            for entry in db.entries:
+                paths = entry.get('__paths', {})
+                if not any(x in reverted for x in paths.values()):
+                    continue
+                entry['__paths'] = {x: reverted.get(y, y) for x, y in paths.items()}
+                self.issues.append((entry['ID'], " : File Move Skipped, see the log"))
 
     def load_and_clean(self, fpath):
         logging.info("Cleaning: %s", fpath)
+        if self.snapshot is None:
+            self.recover_moves()
+            # one walk of the library, shared by every bib file
+            self.snapshot = LibrarySnapshot(self.locs.pdfs)
         self.current_year = fpath.stem
         self.current_db   = self.bc_load_db([fpath], fn=self.on_parse_clean_entry)
         # Everything loaded, crossrefs resolved
@@ -166,9 +250,11 @@ class BibtexClean(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, bib_cle
                 print(e_id + msg, file=sys.stderr)
                 self.issues.append(err)
 
-        self.bc_expand_paths(entry, self.locs.pdfs)
+        self.bc_expand_paths(entry, self.locs.pdfs, fs=self.snapshot)
         assert("__paths" in entry)
-        for e_id, msg in self.bc_check_files(entry, self.bad_file_msg):
+        if bool(self.redirects):
+            entry['__paths'] = {x: self.redirects.get(y, y) for x, y in entry['__paths'].items()}
+        for e_id, msg in self.bc_check_files(entry, self.bad_file_msg, fs=self.snapshot):
             self.issues.append((e_id, msg))
             logging.warning(e_id + msg)
 
@@ -183,37 +269,37 @@ class BibtexClean(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, bib_cle
 
         ##-- file path cleanup
         # Clean files [(field, orig, newloc, newstem)]
-        movements : list[tuple[str, pl.Path, pl.Path, str]] = self.bc_prepare_file_movements(entry, self.locs.pdfs)
+        movements : list[tuple[str, pl.Path, pl.Path, str]] = self.bc_prepare_file_movements(entry, self.locs.pdfs, fs=self.snapshot)
         orig_parents = set()
         for field, orig, new_dir, new_stem in movements:
             orig_parents.add(orig.parent)
-            unique = self.bc_unique_stem(orig, (new_dir / new_stem).with_suffix(orig.suffix))
+            unique = self.bc_unique_stem(orig, (new_dir / new_stem).with_suffix(orig.suffix), fs=self.snapshot)
             if unique is None:
                 continue
 
-            if self.args['move-files'] and not new_dir.exists():
-                new_dir.mkdir(parents=True)
-            elif not new_dir.exists():
-                logging.info("Proposed Directory Creation: %s", new_dir)
-
             if self.args['move-files']:
-                entry['__paths'][field] = orig.rename(unique)
-            else:
-                logging.info("Proposed File Move: %s -> %s", orig, unique)
+                # planned for the whole library, executed by relocate
+                entry['__paths'][field] = self.moves.add(orig, unique, fs=self.snapshot)
+                continue
+
+            if not self.snapshot.exists(new_dir):
+                logging.info("Proposed Directory Creation: %s", new_dir)
+            logging.info("Proposed File Move: %s -> %s", orig, unique)
         ##-- end file path cleanup
 
         ##-- parent path cleanup
+        if self.args['move-files']:
+            # emptied directories are removed once the moves are done
+            return
+
         for parent in orig_parents:
             try:
-                should_rm = not bool(list(parent.iterdir()))
-                # if should_rm and self.args['move-files']:
-                #     parent.rmdir()
-                if should_rm:
+                if self.snapshot.is_empty(parent):
                     logging.info("Proposed Directory Cleanup: %s", parent)
             except OSError as err:
                 if not err.args[0] == 66:
                     logging.exception("Removing empty directories went bad: ", err)
-            ##-- end parent path cleanup
+        ##-- end parent path cleanup
 
 class BibtexReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerMixin, BatchMixin, BibLoadSaveMixin, bib_clean.BibFieldCleanMixin, bib_clean.BibPathCleanMixin):
     """
@@ -223,32 +309,29 @@ class BibtexReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerM
     def __init__(self, name="bibtex::report", locs=None, roots=None, rec=True):
         super().__init__(name, locs, roots or [locs.bibtex], rec=rec, exts=[".bib"])
         self.locs.update(timelines=self.locs.build / "timelines")
-        self.locs.ensure("pdfs")
+        self.locs.ensure("pdfs", "temp")
 
         self.db                             = None
-        self.tag_file_mapping               = defaultdict(list)
-        self.tag_counts                     = defaultdict(lambda: 0)
+        self.sources                        = []
+        self.tag_table                      = BibTagTable(tag_year_range)
         self.year_counts                    = defaultdict(lambda: 0)
         self.type_counts                    = defaultdict(lambda: 0)
         self.files_counts                   = defaultdict(lambda: 0)
         self.authors : set[tuple[str, str]] = set()
         self.editors : set[tuple[str, str]] = set()
 
-    def setup_detail(self, task):
-        task.update({
-            "actions": [ (self.bc_load_db, [[], lambda x: x]) ]
-        })
-        return task
-
     def task_detail(self, task):
         years_target  = self.locs.build / "years.report"
         author_target = self.locs.build / "authors.report"
         editor_target = self.locs.build / "editors.report"
         types_target  = self.locs.build / "types.report"
         files_target  = self.locs.build / "files.report"
+        matrix_target = self.locs.build / "tag_years.tsv"
+        sparks_target = self.locs.build / "tag_sparklines.report"
 
         task.update({
             "actions" : [
+                self.load_all,
 
                 ##-- report on authors
                 lambda:      { "author_max" : max((len(x[0]) for x in self.authors), default=0) },
@@ -279,9 +362,16 @@ class BibtexReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerM
                 (self.write_to, [files_target, "files"]),
                 ##-- end report on entry files
 
+                ##-- report on tags by year
+                lambda: { "matrix" : self.tag_table.matrix_tsv() },
+                (self.write_to, [matrix_target, "matrix"]),
+                lambda: { "sparks" : self.tag_table.sparkline_report(min_tag_timeline) },
+                (self.write_to, [sparks_target, "sparks"]),
+                ##-- end report on tags by year
+
                 self.write_timelines,
             ],
-            "targets" : [ years_target, author_target, editor_target, types_target, files_target, self.locs.timelines ],
+            "targets" : [ years_target, author_target, editor_target, types_target, files_target, matrix_target, sparks_target, self.locs.timelines ],
             "clean" : True,
         })
         return task
@@ -289,21 +379,25 @@ class BibtexReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerM
     def subtask_detail(self, task, fpath):
         task.update({
             "actions" : [
-                (self.load_bib, [fpath]),
+                (self.sources.append, [fpath]),
             ]
         })
         return task
 
-    def load_bib(self, fpath):
-        self.db = self.bc_load_db([fpath], fn=self.process_entry, db=self.db)
+    def load_all(self):
+        """
+        Parse and preprocess each bib file in a worker process,
+        then collect from the merged, crossref resolved, database
+        """
+        self.db = self.bc_load_db_parallel(self.sources,
+                                           fn=bib_clean.BibEntryPreprocess(self.locs.pdfs),
+                                           workers=bib_workers,
+                                           cache=self.locs.temp / "bib_cache")
+        for entry in self.db.entries:
+            self.process_entry(entry)
 
     def process_entry(self, entry):
         try:
-            self.bc_to_unicode(entry)
-            self.bc_expand_paths(entry, self.locs.pdfs)
-            self.bc_tag_split(entry)
-            self.bc_split_names(entry)
-
             assert(all(x in entry for x in ['__paths', '__split_names', '__as_unicode', '__tags']))
             self.collect_tags(entry)
             self.collect_authors_and_editors(entry)
@@ -322,9 +416,7 @@ class BibtexReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerM
         """
         Get all tags from all entries
         """
-        for tag in entry['__tags']:
-            self.tag_file_mapping[tag].append((entry['year'], entry['ID']))
-            self.tag_counts[tag] += 1
+        self.tag_table.add(entry['ID'], entry['year'], entry['__tags'])
 
     def collect_authors_and_editors(self, entry):
         people = []
@@ -353,20 +445,12 @@ class BibtexReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerM
         """
         Report timelines of tag uses
         """
-        for tag, entries in self.tag_file_mapping.items():
-            if len(entries) < min_tag_timeline:
-                continue
-            out_target     = self.locs.timelines / f"{tag}.tag_timeline"
-
-            report = [f"---- Timeline of Tag: {tag} ----"]
-            last_year = None
-            for year, ent_id in sorted(entries, key=lambda x: x[0]):
-                if last_year != year:
-                    report.append(f"\n---------- {year} ----------")
-                last_year = year
-                report.append(f"{ent_id}")
-
-            out_target.write_text("\n".join(report))
+        for tag, entries in self.tag_table.timelines(min_tag_timeline).items():
+            out_target = self.locs.timelines / f"{tag}.timeline"
+            timeline   = TimelineFile([TimelineEntry(datetime.datetime(year, 1, 1), ent_id)
+                                       for year, ent_id in entries if datetime.MINYEAR <= year <= datetime.MAXYEAR],
+                                      tags={tag})
+            out_target.write_text(str(timeline))
 
 class BibtexStub(DelayedMixin, globber.DootEagerGlobber):
     """
@@ -470,28 +554,275 @@ class TODOBibtexWaybacker(DelayedMixin, TargetedMixin, globber.DootEagerGlobber)
     """
     pass
 
-class TODOPdfLibSummary(doot.DootTasker):
+class PdfLibSummary(DootTasker, BibLoadSaveMixin, FilerMixin):
     """
-    Compile the first n pages of each pdf in a decade together
+    (src -> build) Summarise every pdf in the library:
+    size, page count, and embedded title, author and DOI,
+    as a table joined to the bibtex IDs that reference each pdf
     """
-    pass
 
-class TODOPdfBibtexCompile(doot.DootTasker):
+    def __init__(self, name="pdflibrary::summary", locs=None):
+        super().__init__(name, locs)
+        self.locs.ensure("build", "temp", "bibtex", "pdfs")
+        self.owners = defaultdict(set)
+
+    def task_detail(self, task):
+        summary_target = self.locs.build / "pdf_summary.tsv"
+        task.update({
+            "actions" : [
+                self.load_owners,
+                self.summarise,
+                (self.write_to, [summary_target, "summary"]),
+            ],
+            "targets" : [summary_target],
+        })
+        return task
+
+    def load_owners(self):
+        sources = sorted(x for x in self.locs.bibtex.rglob("*.bib") if x.is_file())
+        db      = self.bc_load_db_parallel(sources,
+                                           fn=bib_clean.BibEntryPreprocess(self.locs.pdfs),
+                                           workers=bib_workers,
+                                           cache=self.locs.temp / "bib_cache")
+        for entry in db.entries:
+            for fpath in entry.get('__paths', {}).values():
+                self.owners[fpath].add(entry['ID'])
+
+    def summarise(self):
+        pdfs    = [x.resolve() for x in self.locs.pdfs.rglob("*.pdf") if x.is_file()]
+        index   = HashIndex.read(self.locs.temp / "file_hashes.index", workers=bib_workers)
+        summary = PdfLibrarySummary(self.locs.temp / "pdf_summary.cache", index, workers=bib_workers)
+        summary.run(pdfs)
+        return { "summary" : summary.table(self.owners) }
+
+class BibtexCompile(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BibLoadSaveMixin):
     """
-    Compile individual bibtex files into pdfs
-    then combine them together into decades and total
+    (src -> build) Compile a bibliography pdf per year, or per tag, with local TeX tools.
+    Targets are compiled in parallel, each in its own sandbox,
+    and only recompiled when their entries, the template or the toolchain change
     """
-    pass
 
-class TODOTimelineCompile(doot.DootTasker):
+    def __init__(self, name="bibtex::compile", locs=None, roots=None, rec=True):
+        super().__init__(name, locs, roots or [locs.bibtex], rec=rec, exts=[".bib"])
+        self.locs.ensure("build", "temp")
+        self.sources = []
+
+    def set_params(self):
+        return [
+            { "name": "tags", "long": "tags", "type": bool, "default": False },
+            { "name": "min",  "long": "min",  "type": int,  "default": 1 },
+        ] + self.target_params()
+
+    def task_detail(self, task):
+        task.update({
+            "actions" : [ self.compile_all ],
+        })
+        return task
+
+    def subtask_detail(self, task, fpath):
+        task.update({
+            "actions" : [
+                (self.sources.append, [fpath]),
+            ]
+        })
+        return task
+
+    def compile_all(self):
+        # raw entries, so the generated .bib is the library's own text
+        db      = self.bc_load_db_parallel(self.sources, workers=bib_workers, cache=self.locs.temp / "bib_cache")
+        by      = "tags" if self.args['tags'] else "years"
+        group   = bib_compile.group_by_tag if self.args['tags'] else bib_compile.group_by_year
+        targets = group(db.entries, min_entries=self.args['min'])
+        builder = bib_compile.BibCompiler(self.locs.build / "bib_pdfs" / by,
+                                          self.locs.temp / "bib_compile" / by,
+                                          toolchain=compile_toolchain,
+                                          workers=bib_workers)
+        results = builder.compile(targets)
+        failed  = sorted(x for x, y in results.items() if not y)
+        if bool(failed):
+            logging.warning("Failed to compile %s of %s targets: %s", len(failed), len(results), failed)
+
+class TimelineCompile(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BibLoadSaveMixin):
     """
-    take a timeline and create a pdf of the citations,
-    and the combined pdfs
+    (build -> build) Merge every timeline into one,
+    and compile a pdf of the citations of each timeline, and of the combined timeline.
+    Timeline events name the bibtex entry they cite
     """
-    pass
 
-class TODOHashVerify(doot.DootTasker):
+    def __init__(self, name="timeline::compile", locs=None, roots=None, rec=True):
+        super().__init__(name, locs, roots or [locs.build / "timelines"], rec=rec, exts=[".timeline"])
+        self.locs.ensure("build", "temp", "bibtex")
+        self.sources   = []
+        self.timelines = {}
+        self.combined  = None
+
+    def set_params(self):
+        return [
+            { "name": "start", "long": "start", "type": str, "default": "" },
+            { "name": "end",   "long": "end",   "type": str, "default": "" },
+        ] + self.target_params()
+
+    def task_detail(self, task):
+        combined_target = self.locs.build / "combined.timeline"
+        task.update({
+            "actions" : [
+                self.merge_timelines,
+                (self.write_to, [combined_target, "combined"]),
+                self.compile_citations,
+            ],
+            "targets" : [ combined_target ],
+        })
+        return task
+
+    def subtask_detail(self, task, fpath):
+        task.update({
+            "actions" : [
+                (self.sources.append, [fpath]),
+            ]
+        })
+        return task
+
+    def merge_timelines(self):
+        self.timelines = {x: TimelineFile.read(x) for x in sorted(self.sources)}
+        self.combined  = TimelineFile.merge(*self.timelines.values())
+        if bool(self.args['start']):
+            # eg: --start 1922 --end 1933, for everything overlapping those years
+            window        = self.combined.overlapping(self.args['start'], self.args['end'] or None)
+            self.combined = TimelineFile(window, tags=self.combined.tags)
+        return { "combined" : str(self.combined) }
+
+    def compile_citations(self):
+        bibs    = sorted(x for x in self.locs.bibtex.rglob("*.bib") if x.is_file())
+        db      = self.bc_load_db_parallel(bibs, workers=bib_workers, cache=self.locs.temp / "bib_cache")
+        by_id   = {x['ID']: x for x in db.entries}
+        targets = []
+        for fpath, timeline in [*self.timelines.items(), (pl.Path("combined"), self.combined)]:
+            cited = list({x.what: by_id[x.what] for x in timeline if x.what in by_id}.values())
+            if not bool(cited):
+                continue
+            targets.append(bib_compile.BibTarget(f"timeline_{fpath.stem}", f"Timeline: {fpath.stem}", cited))
+
+        builder = bib_compile.BibCompiler(self.locs.build / "bib_pdfs" / "timelines",
+                                          self.locs.temp / "bib_compile" / "timelines",
+                                          toolchain=compile_toolchain,
+                                          workers=bib_workers)
+        results = builder.compile(targets)
+        failed  = sorted(x for x, y in results.items() if not y)
+        if bool(failed):
+            logging.warning("Failed to compile %s of %s timelines: %s", len(failed), len(results), failed)
+
+class BibtexHashVerify(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BibLoadSaveMixin):
     """
-    Check a random selection of files for hash consistency
+    (src -> build) Hash every file the bibtex library references,
+    and check a random selection of unchanged files for hash consistency.
+    Reports missing, modified and corrupt files, and duplicates across entries
     """
-    pass
+
+    def __init__(self, name="bibtex::hash", locs=None, roots=None, rec=True):
+        super().__init__(name, locs, roots or [locs.bibtex], rec=rec, exts=[".bib"])
+        self.locs.ensure("build", "temp", "pdfs")
+        self.sources = []
+        self.owners  = defaultdict(set)
+
+    def set_params(self):
+        return [
+            { "name": "verify", "long": "verify", "type": float, "default": hash_verify },
+            { "name": "fast",   "long": "fast",   "type": bool,  "default": False },
+        ] + self.target_params()
+
+    def task_detail(self, task):
+        report_target = self.locs.build / "file_hashes.report"
+        task.update({
+            "actions" : [
+                self.load_all,
+                self.hash_all,
+                (self.write_to, [report_target, "report"]),
+            ],
+            "targets" : [report_target],
+        })
+        return task
+
+    def subtask_detail(self, task, fpath):
+        task.update({
+            "actions" : [
+                (self.sources.append, [fpath]),
+            ]
+        })
+        return task
+
+    def load_all(self):
+        db = self.bc_load_db_parallel(self.sources,
+                                      fn=bib_clean.BibEntryPreprocess(self.locs.pdfs),
+                                      workers=bib_workers,
+                                      cache=self.locs.temp / "bib_cache")
+        for entry in db.entries:
+            for fpath in entry.get('__paths', {}).values():
+                self.owners[fpath].add(entry['ID'])
+
+    def hash_all(self):
+        index  = HashIndex.read(self.locs.temp / "file_hashes.index", workers=bib_workers)
+        report = index.update(self.owners, verify=self.args['verify'], fast=self.args['fast'])
+        index.write()
+        report.owners = self.owners
+        logging.info("Hashed %s files, verified %s", report.hashed, report.verified)
+        return { "report" : str(report) }
+
+class BibtexDedupe(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BibLoadSaveMixin):
+    """
+    (src -> build) Find entries that are the same work,
+    by ID, DOI, ISBN, first surname, year and title prefix, or near identical titles.
+    With --merge, each cluster is merged into its most complete entry,
+    and the changed bib files are updated in place
+    """
+
+    def __init__(self, name="bibtex::dedupe", locs=None, roots=None, rec=True):
+        super().__init__(name, locs, roots or [locs.bibtex], rec=rec, exts=[".bib"])
+        self.locs.ensure("build", "temp")
+        self.sources  = []
+        self.dbs      = {}
+        self.owners   = []
+        self.finder   = None
+        self.clusters = []
+
+    def set_params(self):
+        return [
+            { "name": "merge", "long": "merge", "type": bool, "default": False },
+        ] + self.target_params()
+
+    def task_detail(self, task):
+        report_target = self.locs.build / "duplicates.report"
+        task.update({
+            "actions" : [
+                self.find_duplicates,
+                (self.write_to, [report_target, "report"]),
+                self.merge_duplicates,
+            ],
+            "targets" : [report_target],
+        })
+        return task
+
+    def subtask_detail(self, task, fpath):
+        task.update({
+            "actions" : [
+                (self.sources.append, [fpath]),
+            ]
+        })
+        return task
+
+    def find_duplicates(self):
+        # raw entries, per file, so merges can be written back
+        self.dbs      = self.bc_load_dbs_parallel(sorted(self.sources), workers=bib_workers, cache=self.locs.temp / "bib_cache")
+        self.owners   = [fpath for fpath, db in self.dbs.items() for _ in db.entries]
+        self.finder   = bib_dedupe.DupeFinder([entry for db in self.dbs.values() for entry in db.entries])
+        self.clusters = self.finder.clusters()
+        logging.info("Found %s candidate duplicate clusters", len(self.clusters))
+        return { "report" : self.finder.report(self.clusters, self.owners) }
+
+    def merge_duplicates(self):
+        if not self.args['merge'] or not bool(self.clusters):
+            return
+
+        changed = bib_dedupe.merge_clusters(self.dbs, self.clusters, self.finder.entries)
+        for fpath in sorted(changed):
+            plan = self.bc_update_file(self.dbs[fpath], lambda *_: None, None, fpath, fpath)
+            logging.info("Merged Duplicates: %s : %s", fpath, plan.name)
@@ -32,11 +32,21 @@ logging = logmod.getLogger(__name__)
 ##-- end logging
 
 import fileinput
+import os
 import re
 from collections import defaultdict
 
 import doot
 from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile, TagFile
+from bkmkorg.tag.graph import TagGraph
+from bkmkorg.tag.grep import TagGrep
+from bkmkorg.tag.preview import (SubstitutionPreview, bib_tag_re,
+                                 bookmark_tag_re, clean_bib_line,
+                                 clean_bookmark_line, clean_org_line,
+                                 org_tag_re)
+from bkmkorg.tag.occurrences import TagOccurrences
+from bkmkorg.tag.report import TagAnalytics
+from bkmkorg.tag.suggest import TagSuggester
 from doot import globber
 from doot.tasker import DootTasker
 from doot.mixins.batch import BatchMixin
@@ -45,9 +55,8 @@ from doot.mixins.targeted import TargetedMixin
 from doot.mixins.filer import FilerMixin
 
 empty_match     : Final = re.match("","")
-bib_tag_re      : Final = re.compile(r"^(\s+tags\s+=)\s+{(.+?)},$")
-org_tag_re      : Final = re.compile(r"^(\*\* .+?)\s+:(\S+):$")
-bookmark_tag_re : Final = re.compile(r"^(http.+?) : (.+)$")
+
+tag_workers     : Final = doot.config.on_fail(os.cpu_count(), int).tags.workers()
 
 class TagsCleaner(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMixin, FilerMixin):
     """
@@ -73,12 +82,12 @@ class TagsCleaner(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMi
         return task
 
     def subtask_detail(self, task, fpath):
-        task['actions'].append((self.copy_to, [self.locs.temp, fpath], {fn:"backup"}))
+        task['actions'].append((self.copy_to, [self.locs.temp, fpath], {"fn":"backup"}))
         match fpath.suffix:
             case ".bib":
                 task['actions'].append( (self.clean_bib, [fpath]) )
             case ".bookmarks":
-                task['actions'].append( (self.clean_bookmark, [fpath]) )
+                task['actions'].append( (self.clean_bookmarks, [fpath]) )
             case ".org":
                 task['actions'].append( (self.clean_org, [fpath]) )
         return task
@@ -92,55 +101,21 @@ class TagsCleaner(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMi
 
     def clean_org(self, fpath):
         logging.info("Cleaning Org: %s", fpath)
-        for line in fileinput.input(files=[ fpath ], inplace=True):
-            try:
-                match (org_tag_re.match(line) or empty_match).groups():
-                    case (pre, tags):
-                        tags_list = tags.split(":")
-                        cleaned   = ":".join(sorted({y for x in tags_list for y in self.tags.sub(x) if bool(y)}))
-                        print(f"{pre} :{cleaned}:")
-                    case ():
-                        print(line, end="")
-                        pass
-
-            except Exception as err:
-                logging.warning("Error Processing %s (l:%s) : %s",
-                                fileinput.filename(),
-                                fileinput.filelineno(),
-                                err)
-                print(line, end="")
+        self._clean_in_place(fpath, clean_org_line)
 
     def clean_bib(self, fpath):
         logging.info("Cleaning Bib: %s", fpath)
-        for line in fileinput.input(files=[fpath], inplace=True):
-            try:
-                match (bib_tag_re.match(line) or empty_match).groups():
-                    case (pre, tags):
-                        tags_list = tags.split(",")
-                        cleaned = ",".join(sorted({y for x in tags_list for y in self.tags.sub(x) if bool(y)}))
-                        print(f"{pre} {{{cleaned}}},")
-                    case ():
-                        print(line, end="")
-                        pass
-            except Exception as err:
-                logging.warning("Error Processing %s (l:%s) : %s",
-                                fileinput.filename(),
-                                fileinput.filelineno(),
-                                err)
-                print(line, end="")
+        self._clean_in_place(fpath, clean_bib_line)
 
     def clean_bookmarks(self, fpath):
         logging.info("Cleaning Bookmarks in %s", fpath)
+        self._clean_in_place(fpath, clean_bookmark_line)
+
+    def _clean_in_place(self, fpath, cleaner):
+        subs = self.tags.substitutions
         for line in fileinput.input(files=[fpath], inplace=True):
             try:
-                match (bookmark_tag_re.match(line.strip()) or empty_match).groups():
-                    case (pre, tags):
-                        tags_list = tags.split(":")
-                        cleaned = " : ".join(sorted({y for x in tags_list for y in self.tags.sub(x) if bool(y)}))
-                        print(f"{pre} : {cleaned}")
-                    case ():
-                        print(line, end="")
-                        pass
+                print(cleaner(line, subs), end="")
             except Exception as err:
                 logging.warning("Error Processing %s (l:%s) : %s",
                                 fileinput.filename(),
@@ -155,25 +130,29 @@ class TagsReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMix
 
     def __init__(self, name="tags::report", locs=None, roots=None, rec=True, exts=None):
         super().__init__(name, locs, roots or [locs.tags], rec=rec, exts=exts or [".sub"])
-        self.tags = SubstitutionFile()
-        self.locs.ensure("build", "temp")
+        self.tags        = SubstitutionFile()
+        self.occurrences = TagOccurrences()
+        self.locs.ensure("build", "temp", "bibtex", "bookmarks", "orgs")
 
     def set_params(self):
         return self.target_params()
 
     def task_detail(self, task):
         report     = self.locs.build / "tags.report"
+        analytics  = self.locs.build / "tags.analytics.json"
         all_subs   = self.locs.temp  / "tags" / "all_subs.sub"
         all_counts = self.locs.temp  / "tags" / "all_counts.tags"
         task.update({
             "actions" : [ self.report_totals,
                           self.report_alphas,
                           self.report_subs,
-                          (self.write_to, [report, ["sum_count", "subs", "alphas"]]),
+                          self.report_analytics,
+                          (self.write_to, [report, ["sum_count", "subs", "alphas", "analytics"]]),
+                          (self.write_to, [analytics, "analytics_json"]),
                           (self.write_to, [all_subs, "all_subs"]),
                           (self.write_to, [all_counts, "all_counts"]),
                          ],
-            "targets" : [ report, all_subs, all_counts ]
+            "targets" : [ report, analytics, all_subs, all_counts ]
         })
         return task
 
@@ -213,6 +192,20 @@ class TagsReport(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMix
         count = len(self.tags.substitutions)
         return { "subs" : f"Number of Subsitutions: {count}" }
 
+    def report_analytics(self):
+        """
+        Stream the tags used in bibtex, orgs and bookmarks
+        into a columnar table, and aggregate it
+        """
+        for root, exts in [(self.locs.bibtex, [".bib"]), (self.locs.orgs, [".org"]), (self.locs.bookmarks, [".bookmarks"])]:
+            for fpath in self.glob_target(root, exts=exts, rec=True, fn=lambda x: x.is_file()):
+                self.occurrences.add_file(fpath)
+
+        analytics = TagAnalytics(self.occurrences)
+        return { "analytics"      : "Tag Analytics:\n" + str(analytics),
+                 "analytics_json" : analytics.to_json(),
+                }
+
 class TagsIndexer(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMixin, FilerMixin):
     """
     extract tags from all globbed bookmarks, orgs, bibtexs
@@ -231,12 +224,13 @@ class TagsIndexer(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMi
         return self.target_params()
 
     def task_detail(self, task):
-        existing_indices = self.locs.temp.glob("*.index")
         all_subs         = self.locs.temp / "all_subs.sub"
         new_tags         = self.locs.temp / "new_tags.tags"
         bkmk_if          = self.locs.temp / "bkmk.index"
         bib_if           = self.locs.temp / "bib.index"
         org_if           = self.locs.temp / "org.index"
+        # only this task's indices, not tags::grep's or the pdf hash index
+        existing_indices = [x for x in [bkmk_if, bib_if, org_if] if x.exists()]
 
         task.update({
             "actions" : [
@@ -308,16 +302,204 @@ class TagsIndexer(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMi
         new_tags.update(new_bkmk | new_bib | new_org)
         return { "new_tags" : str(new_tags) }
 
-class TODOTagsGrep(DootTasker, FilerMixin):
+class TagsGraph(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, BatchMixin, FilerMixin):
+    """
+    (src -> build) Build the tag co-occurrence graph of bibtex, orgs and bookmarks,
+    using worker processes
+    """
+
+    def __init__(self, name="tags::graph", locs=None, roots=None, rec=True, exts=None):
+        super().__init__(name, locs, roots or [locs.bibtex, locs.bookmarks, locs.orgs], rec=rec, exts=exts or [".bib", ".bookmarks", ".org"])
+        self.sources = []
+        self.graph   = TagGraph()
+        self.locs.ensure("build")
+
+    def set_params(self):
+        return self.target_params()
+
+    def filter(self, fpath):
+        if fpath.is_file():
+            return self.globc.keep
+        return self.globc.discard
+
+    def task_detail(self, task):
+        graph_target  = self.locs.build / "tags.graph"
+        counts_target = self.locs.build / "tags.counts"
+        task.update({
+            "actions" : [
+                self.build_graph,
+                (self.graph.write, [graph_target]),
+                lambda: { "counts" : str(self.graph.tags) },
+                (self.write_to, [counts_target, "counts"]),
+            ],
+            "targets" : [ graph_target, counts_target ],
+        })
+        return task
+
+    def subtask_detail(self, task, fpath):
+        task.update({
+            "actions" : [ (self.sources.append, [fpath]) ],
+        })
+        return task
+
+    def build_graph(self):
+        total = self.graph.extract_files(self.sources, workers=tag_workers)
+        logging.info("Tag Graph Built: %s tags", len(total))
+
+class TagsSuggest(TagsGraph):
+    """
+    (src -> build) Suggest tag substitutions for tags similar in use or spelling,
+    ranked best first, in .sub format
+    """
+
+    def __init__(self, name="tags::suggest", locs=None, roots=None, rec=True, exts=None):
+        super().__init__(name, locs, roots, rec=rec, exts=exts)
+        self.subs = SubstitutionFile()
+        self.locs.ensure("tags")
+
+    def task_detail(self, task):
+        suggestions = self.locs.build / "suggestions.sub"
+        task.update({
+            "actions" : [
+                self.read_subs,
+                self.build_graph,
+                self.suggest, # -> suggestions
+                (self.write_to, [suggestions, "suggestions"]),
+            ],
+            "targets" : [ suggestions ],
+        })
+        return task
+
+    def read_subs(self):
+        targets = self.glob_target(self.locs.tags , exts=[".sub"], rec=True, fn=lambda x: x.is_file())
+        for sub in targets:
+            self.subs += SubstitutionFile.read(sub)
+
+    def suggest(self):
+        # Don't suggest for tags that already have a substitution
+        suggester   = TagSuggester(self.graph.matrix, exclude=set(self.subs.substitutions.keys()))
+        suggestions = suggester.suggest()
+        logging.info("Suggested %s substitutions", len(suggestions))
+        return { "suggestions" : TagSuggester.to_sub_str(suggestions) }
+
+class TagsPreview(DelayedMixin, TargetedMixin, globber.DootEagerGlobber, FilerMixin):
     """
-    grep directories slowly to build tag indices
+    (temp -> build) Dry run tags::clean, diffing only the files
+    the tag indices of tags::index say use a substituted tag
     """
 
-    def __init__(self, name="tags::grep", dirs=None):
-        super().__init__(name, dirs)
+    def __init__(self, name="tags::preview", locs=None, roots=None, rec=True, exts=None):
+        super().__init__(name, locs, roots or [locs.tags], rec=rec, exts=exts or [".sub"])
+        self.subs  = SubstitutionFile()
+        self.index = IndexFile()
+        self.locs.ensure("build", "temp", "tags")
+
+    def set_params(self):
+        return self.target_params()
+
+    def filter(self, fpath):
+        if fpath.is_file():
+            return self.globc.keep
+        return self.globc.discard
 
     def task_detail(self, task):
+        summary = self.locs.build / "tags.preview"
+        diff    = self.locs.build / "tags.preview.diff"
         task.update({
-            "actions" : [],
+            "actions" : [
+                self.read_files,
+                self.preview, # -> summary, diff
+                (self.write_to, [summary, "summary"]),
+                (self.write_to, [diff, "diff"]),
+            ],
+            "targets" : [ summary, diff ],
         })
         return task
+
+    def read_files(self):
+        targets = self.glob_target(self.locs.tags , exts=[".sub"], rec=True, fn=lambda x: x.is_file())
+        for sub in targets:
+            self.subs += SubstitutionFile.read(sub)
+        # read by name, as tags::grep's indices share the directory, and would double the counts
+        for name in ["bkmk.index", "bib.index", "org.index"]:
+            if (index:=self.locs.temp / name).exists():
+                self.index += IndexFile.read(index)
+
+    def preview(self):
+        preview = SubstitutionPreview(self.subs, self.index, workers=tag_workers)
+        preview.run()
+        return { "summary" : str(preview), "diff" : preview.unified() }
+
+class TagsClouds(DootTasker, FilerMixin):
+    """
+    (src -> build) Render word clouds of tag frequencies, per source and per year,
+    in worker processes, reusing cached layouts of unchanged frequencies
+    """
+
+    def __init__(self, name="tags::clouds", locs=None):
+        super().__init__(name, locs)
+        self.occurrences = TagOccurrences()
+        self.locs.ensure("build", "temp", "bibtex", "bookmarks", "orgs")
+
+    def task_detail(self, task):
+        task.update({
+            "actions" : [
+                self.read_sources,
+                self.render,
+            ],
+        })
+        return task
+
+    def read_sources(self):
+        for root, ext in [(self.locs.bibtex, ".bib"), (self.locs.orgs, ".org"), (self.locs.bookmarks, ".bookmarks")]:
+            for fpath in root.rglob(f"*{ext}"):
+                if fpath.is_file():
+                    self.occurrences.add_file(fpath)
+
+    def render(self):
+        # wordcloud and matplotlib are only needed here, not by every tags task
+        from bkmkorg.utils.word_cloud import render_clouds
+
+        clouds = self.locs.build / "clouds"
+        jobs   = [(tags, clouds / f"{key}.png", key.replace("_", " "))
+                  for key, tags in TagAnalytics(self.occurrences).snapshots().items()]
+        render_clouds(jobs, workers=tag_workers, cache_dir=self.locs.temp / "clouds")
+
+class TagsGrep(DootTasker, FilerMixin):
+    """
+    ( -> temp ) grep arbitrary directories with threads, to build tag indices.
+    Directories come from `--dirs`, or the configured orgs root
+    """
+
+    def __init__(self, name="tags::grep", locs=None):
+        super().__init__(name, locs)
+        self.grep = TagGrep(workers=tag_workers)
+        self.locs.ensure("temp", "orgs")
+
+    def set_params(self):
+        return [
+            { "name": "dirs", "long": "dirs", "type": list, "default": [] },
+        ]
+
+    def task_detail(self, task):
+        bkmk_if = self.locs.temp / "bkmk.grep.index"
+        bib_if  = self.locs.temp / "bib.grep.index"
+        org_if  = self.locs.temp / "org.grep.index"
+        task.update({
+            "actions" : [
+                self.scan,
+                lambda: {"bkmk_str" : str(self.grep[".bookmarks"]),
+                         "bib_str"  : str(self.grep[".bib"]),
+                         "org_str"  : str(self.grep[".org"]),
+                         },
+                (self.write_to, [bkmk_if, "bkmk_str"]),
+                (self.write_to, [bib_if, "bib_str"]),
+                (self.write_to, [org_if, "org_str"]),
+            ],
+            "targets" : [ bkmk_if, bib_if, org_if ],
+        })
+        return task
+
+    def scan(self):
+        dirs = [pl.Path(x) for x in self.args['dirs']] or [self.locs.orgs]
+        self.grep.scan(*dirs)
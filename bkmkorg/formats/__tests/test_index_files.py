@@ -6,7 +6,13 @@ from os.path import splitext, split
 import unittest
 import unittest.mock as mock
 
-import logging
+import logging as logmod
+import pathlib as pl
+import tempfile
+
+from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile, TagFile
+
+DATA = pl.Path(__file__).parent
 
 
 class IndexFileTests(unittest.TestCase):
@@ -39,3 +45,24 @@ class IndexFileTests(unittest.TestCase):
     # mock.Mock / MagicMock
     # create_autospec
     # @patch(' ') / with patch.object(...)
+
+    def test_read(self):
+        index = IndexFile.read(DATA / "example.index")
+        self.assertEqual(index.get_count("1619_project"), 5)
+        self.assertEqual(index.get_count("100_year_olds"), 1)
+        self.assertIn(pl.Path("/volumes/documents/twitterthreads/group_a/AndrewBloch.org"), index.mapping["100_year_olds"])
+
+    def test_update(self):
+        index = IndexFile()
+        index.update(("a", 1, "/a/b.org"), ("a", 1, "/a/c.org"))
+        self.assertEqual(index.get_count("a"), 2)
+        self.assertEqual(str(index), "a : 2 : /a/b.org : /a/c.org")
+        index.update(("b", 1, "/a/b.org"))
+        self.assertEqual(str(index), "a : 2 : /a/b.org : /a/c.org\nb : 1 : /a/b.org")
+
+    def test_merge(self):
+        left, right = IndexFile(), IndexFile()
+        left.update(("a", 1, "/a/b.org"))
+        right.update(("a", 1, "/a/c.org"), ("b", 1, "/a/c.org"))
+        left += right
+        self.assertEqual(str(left), "a : 2 : /a/b.org : /a/c.org\nb : 1 : /a/c.org")
@@ -6,7 +6,13 @@ from os.path import splitext, split
 import unittest
 import unittest.mock as mock
 
-import logging
+import logging as logmod
+import pathlib as pl
+import tempfile
+
+from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile, TagFile
+
+DATA = pl.Path(__file__).parent
 
 
 class SubFileTests(unittest.TestCase):
@@ -39,3 +45,45 @@ class SubFileTests(unittest.TestCase):
     # mock.Mock / MagicMock
     # create_autospec
     # @patch(' ') / with patch.object(...)
+
+    def test_read(self):
+        subs = SubstitutionFile.read(DATA / "test.sub")
+        self.assertEqual(len(subs), 20)
+        self.assertEqual(subs.get_count("x_com"), 14)
+        self.assertEqual(subs.sub("xcom"), {"x_com"})
+        self.assertEqual(subs.sub("xbox"), {"xbox"})
+        self.assertFalse(subs.has_sub("xbox"))
+
+    def test_str_round_trip(self):
+        subs = SubstitutionFile.read(DATA / "test.sub")
+        with tempfile.TemporaryDirectory() as tmp:
+            target = pl.Path(tmp) / "out.sub"
+            target.write_text(str(subs))
+            loaded = SubstitutionFile.read(target)
+
+        self.assertEqual(dict(subs.counts), dict(loaded.counts))
+        self.assertEqual(dict(subs.substitutions), dict(loaded.substitutions))
+
+    def test_str_does_not_add_substitutions(self):
+        subs = SubstitutionFile.read(DATA / "test.sub")
+        str(subs)
+        self.assertFalse(subs.has_sub("xbox"))
+
+    def test_counts_str(self):
+        subs = SubstitutionFile.read(DATA / "test.sub")
+        self.assertIn("xcom : 2 : x_com", str(subs))
+        self.assertIn("xcom : 2\n", TagFile.__str__(subs))
+
+    def test_str_cache_invalidated(self):
+        subs = SubstitutionFile()
+        subs.update(("a", "1", "b"))
+        self.assertEqual(str(subs), "a : 1 : b")
+        subs.update(("a", "1", "c"))
+        self.assertEqual(str(subs), "a : 2 : b : c")
+
+    def test_merge(self):
+        subs = SubstitutionFile()
+        subs.update(("xcom", "1", "xcom_game"))
+        subs += SubstitutionFile.read(DATA / "test.sub")
+        self.assertEqual(subs.get_count("xcom"), 3)
+        self.assertEqual(subs.sub("xcom"), {"x_com", "xcom_game"})
@@ -6,7 +6,13 @@ from os.path import splitext, split
 import unittest
 import unittest.mock as mock
 
-import logging
+import logging as logmod
+import pathlib as pl
+import tempfile
+
+from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile, TagFile
+
+DATA = pl.Path(__file__).parent
 
 
 class TagFileTests(unittest.TestCase):
@@ -39,3 +45,46 @@ class TagFileTests(unittest.TestCase):
     # mock.Mock / MagicMock
     # create_autospec
     # @patch(' ') / with patch.object(...)
+
+    def test_read(self):
+        tags = TagFile.read(DATA / "test.tags")
+        self.assertEqual(len(tags), 20)
+        self.assertEqual(tags.get_count("history"), 2089)
+        self.assertIn("rite of passage", tags)
+
+    def test_read_normalises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            target = pl.Path(tmp) / "test.tags"
+            target.write_text("a  tag : 2\nbad : line\nalone\n\nother : 3 : extra")
+            tags = TagFile.read(target)
+
+        self.assertEqual(tags.get_count("a_tag"), 2)
+        self.assertEqual(tags.get_count("other"), 3)
+        self.assertNotIn("bad", tags)
+        self.assertNotIn("alone", tags)
+
+    def test_str_round_trip(self):
+        tags = TagFile.read(DATA / "test.tags")
+        with tempfile.TemporaryDirectory() as tmp:
+            target = pl.Path(tmp) / "out.tags"
+            target.write_text(str(tags))
+            loaded = TagFile.read(target)
+
+        self.assertEqual(dict(tags.counts), dict(loaded.counts))
+
+    def test_str_cache_invalidated(self):
+        tags = TagFile()
+        tags.update("a", "b")
+        self.assertEqual(str(tags), "a : 1\nb : 1")
+        tags.update("a")
+        self.assertEqual(str(tags), "a : 2\nb : 1")
+        tags.set_count("c", 5)
+        self.assertEqual(str(tags), "a : 2\nb : 1\nc : 5")
+        tags += TagFile.read(DATA / "test.tags")
+        self.assertIn("history : 2089", str(tags))
+
+    def test_merge(self):
+        tags = TagFile()
+        tags.update("history")
+        tags.update(TagFile.read(DATA / "test.tags"))
+        self.assertEqual(tags.get_count("history"), 2090)
@@ -0,0 +1,124 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import logging as logmod
+import pathlib as pl
+import random
+import tempfile
+import unittest
+import unittest.mock as mock
+from datetime import datetime, timedelta
+
+from bkmkorg.formats.timelinefile import TimelineEntry, TimelineFile, parse_date
+
+EXAMPLE = """# an example timeline
+:tags history
+
+1922 -> 1933 "an event"   england blah_bloo bloo_blee :tags blah,blee :link https://a.com
+2003         something    usa     a_person            :tags politics  :link https://b.com :desc a long description: with colons
+1950-06-25   war          korea
+bad line
+"""
+
+class TimelineFileTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp  = tempfile.TemporaryDirectory()
+        self.root = pl.Path(self.tmp.name)
+        self.path = self.root / "example.timeline"
+        self.path.write_text(EXAMPLE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date("1922"), datetime(1922, 1, 1))
+        self.assertEqual(parse_date("1950-06"), datetime(1950, 6, 1))
+        self.assertEqual(parse_date("1950-06-25"), datetime(1950, 6, 25))
+        with self.assertRaises(ValueError):
+            parse_date("nineteen")
+
+    def test_read(self):
+        timeline = TimelineFile.read(self.path)
+        self.assertEqual(len(timeline), 3)
+        self.assertEqual([x.what for x in timeline], ["an event", "war", "something"])
+
+        period, war, event = timeline.entries
+        self.assertEqual(period.range(), (datetime(1922, 1, 1), datetime(1933, 1, 1)))
+        self.assertEqual(period.who, {"blah_bloo", "bloo_blee"})
+        self.assertEqual(period.tags, {"history", "blah", "blee"})
+        self.assertEqual(period.urls, {"https://a.com"})
+        self.assertEqual(war.range(), (datetime(1950, 6, 25), datetime(1950, 6, 25)))
+        self.assertEqual(event.desc, "a long description: with colons")
+
+    def test_round_trip(self):
+        timeline = TimelineFile.read(self.path)
+        self.path.write_text(str(timeline))
+        again    = TimelineFile.read(self.path)
+        self.assertEqual(again.entries, timeline.entries)
+        self.assertEqual(again.tags, {"history"})
+
+    def test_merge(self):
+        other = self.root / "other.timeline"
+        other.write_text("1900 first _\n1960 later france\n")
+        merged = TimelineFile.read_all([self.path, other])
+        self.assertEqual([x.what for x in merged], ["first", "an event", "war", "later", "something"])
+        self.assertEqual(merged.range(), (datetime(1900, 1, 1), datetime(2003, 1, 1)))
+
+    def test_add_keeps_order(self):
+        timeline  = TimelineFile.read(self.path)
+        timeline += TimelineEntry(datetime(1930, 1, 1), "added")
+        self.assertEqual([x.what for x in timeline], ["an event", "added", "war", "something"])
+        self.assertIn(datetime(1930, 1, 1), timeline)
+        self.assertNotIn(datetime(1931, 1, 1), timeline)
+
+class IntervalIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        rand          = random.Random(7)
+        self.timeline = TimelineFile()
+        for i in range(500):
+            start = datetime(rand.randint(1800, 2000), rand.randint(1, 12), 1)
+            span  = None if rand.random() < 0.4 else timedelta(days=rand.randint(0, 365 * 30))
+            self.timeline.add(TimelineEntry(start, f"event_{i}", duration=span))
+
+    def brute(self, start, end):
+        return [x for x in self.timeline if x.range()[0] <= end and start <= x.range()[1]]
+
+    def test_overlapping_matches_scan(self):
+        rand = random.Random(11)
+        for _ in range(200):
+            start = datetime(rand.randint(1780, 2040), 1, 1)
+            end   = start + timedelta(days=rand.randint(0, 365 * 10))
+            self.assertEqual(self.timeline.overlapping(start, end), self.brute(start, end))
+
+    def test_stabbing(self):
+        when = datetime(1922, 3, 1)
+        self.assertEqual(self.timeline.overlapping(when), self.brute(when, when))
+
+    def test_year_queries(self):
+        found = self.timeline.overlapping(1922, 1933)
+        self.assertEqual(found, self.brute(datetime(1922, 1, 1), datetime(1933, 12, 31, 23, 59, 59, 999999)))
+        self.assertTrue(all(datetime(1922, 1, 1) <= x.range()[0] and x.range()[1] < datetime(1934, 1, 1)
+                            for x in self.timeline.within("1922", "1933")))
+
+    def test_max_tracks_adds(self):
+        self.assertEqual(self.timeline.max, max(x.range()[1] for x in self.timeline))
+        self.timeline.add(TimelineEntry(datetime(1700, 1, 1), "long", duration=timedelta(days=365 * 400)))
+        self.assertEqual(self.timeline.max, datetime(1700, 1, 1) + timedelta(days=365 * 400))
+        self.assertEqual(self.timeline.overlapping(2090)[-1].what, "long")
+
+    def test_intersects(self):
+        period = TimelineFile([TimelineEntry(datetime(1922, 1, 1), "period", duration=timedelta(days=3000))])
+        gap    = TimelineFile([TimelineEntry(datetime(1900, 1, 1), "before"), TimelineEntry(datetime(1950, 1, 1), "after")])
+        inside = TimelineEntry(datetime(1925, 1, 1), "inside")
+        self.assertTrue(period.intersects(inside))
+        self.assertFalse(period.intersects(TimelineEntry(datetime(1960, 1, 1), "outside")))
+        self.assertFalse(period.intersects(gap))
+        self.assertTrue(gap.encompasses(period))
+        gap += inside
+        self.assertTrue(period.intersects(gap))
@@ -22,7 +22,13 @@ TAG_NORM : Final = re.compile(" +")
 
 @dataclass
 class TagFile:
-    """ A Basic TagFile holds the counts for each tag use """
+    """ A Basic TagFile holds the counts for each tag use
+
+    Modify counts through `update` and `set_count`,
+    as string conversion is cached until the next modification.
+    Treat `counts`, and subclasses' `substitutions` and `mapping`, as read-only:
+    writing to them directly leaves `str()` stale.
+    """
 
     counts : dict[str, int] = field(default_factory=lambda: defaultdict(lambda: 0))
     sep    : str            = field(default=" : ")
@@ -30,16 +36,32 @@ class TagFile:
 
     norm_regex : re.Pattern  = TAG_NORM
 
+    _str_cache : dict[str, str] = field(default_factory=dict, init=False, repr=False, compare=False)
+
     @classmethod
     def read(cls, fpath:pl.Path, sep=None) -> TagFile:
+        """ Bulk load a file, in a single pass over its lines """
         obj = cls(sep=sep or cls.sep)
-        for i, line in enumerate(fpath.read_text().split("\n")):
+        obj._load_lines(fpath.read_text().splitlines(), fpath)
+        return obj
+
+    def _load_lines(self, lines:list[str], fpath:pl.Path):
+        """ Load `key : count` lines directly into the counts """
+        counts, norm_tag, sep = self.counts, self.norm_tag, self.sep
+        for i, line in enumerate(lines):
+            parts = line.split(sep)
+            if len(parts) < 2:
+                continue
             try:
-                obj.update(tuple(x.strip() for x in line.split(obj.sep)))
-            except Exception as err:
+                amnt = int(parts[1])
+                key  = parts[0].strip()
+                if " " in key:
+                    key = norm_tag(key)
+                counts[key] += amnt
+            except ValueError as err:
                 logging.warning("Failure Tag Reading %s (l:%s) : %s", fpath, i, err)
 
-        return obj
+        self._str_cache.clear()
 
     def __iter__(self):
         return iter(self.counts)
@@ -49,12 +71,11 @@ class TagFile:
         Export the counts, 1 entry per line, as:
         `key` : `value`
         """
-        all_lines = []
-        for key in sorted(self.counts.keys()):
-            if not bool(self.counts[key]):
-                continue
-            all_lines.append(self.sep.join([key, str(self.counts[key])]))
-        return "\n".join(all_lines)
+        if "counts" not in self._str_cache:
+            sep, counts = self.sep, self.counts
+            self._str_cache["counts"] = "\n".join([f"{key}{sep}{counts[key]}" for key in sorted(counts) if bool(counts[key])])
+
+        return self._str_cache["counts"]
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: {len(self)}>"
@@ -71,8 +92,16 @@ class TagFile:
     def _inc(self, key, *, amnt=1):
         norm_key = self.norm_tag(key)
         self.counts[norm_key] += amnt
+        self._str_cache.clear()
         return norm_key
 
+    def _merge_counts(self, other:TagFile):
+        """ Add another tag file's (already normalised) counts """
+        counts = self.counts
+        for key, amnt in other.counts.items():
+            counts[key] += amnt
+        self._str_cache.clear()
+
     def update(self, *values):
         for val in values:
             match val:
@@ -83,7 +112,7 @@ class TagFile:
                 case (str() as key, str() as counts):
                     self._inc(key, amnt=int(counts))
                 case TagFile():
-                    self.update(*values.counts.items())
+                    self._merge_counts(val)
                 case set():
                     self.update(*val)
         return self
@@ -94,6 +123,12 @@ class TagFile:
     def get_count(self, tag):
         return self.counts[self.norm_tag(tag)]
 
+    def set_count(self, tag, count:int):
+        norm_key = self.norm_tag(tag)
+        self.counts[norm_key] = count
+        self._str_cache.clear()
+        return norm_key
+
     def norm_tag(self, tag):
         return self.norm_regex.sub("_", tag.strip())
 
@@ -104,18 +139,49 @@ class SubstitutionFile(TagFile):
     ext           : str                  = field(default=".sub")
     substitutions : Dict[str, set[str]] = field(default_factory=lambda: defaultdict(set))
 
+    def _load_lines(self, lines:list[str], fpath:pl.Path):
+        """ Load `key : count : sub...` lines directly """
+        counts, subs, norm_tag, sep = self.counts, self.substitutions, self.norm_tag, self.sep
+        for i, line in enumerate(lines):
+            parts = line.split(sep)
+            if len(parts) < 2:
+                continue
+            try:
+                amnt = int(parts[1])
+                key  = parts[0].strip()
+                if " " in key:
+                    key = norm_tag(key)
+                counts[key] += amnt
+            except ValueError as err:
+                logging.warning("Failure Tag Reading %s (l:%s) : %s", fpath, i, err)
+                continue
+
+            if len(parts) < 3:
+                continue
+
+            normed = [y for y in (norm_tag(x) for x in parts[2:]) if bool(y)]
+            if bool(normed):
+                subs[key].update(normed)
+
+        self._str_cache.clear()
+
     def __str__(self):
         """
         Export the substitutions, 1 entry per line, as:
         `key` : `counts` : `substitution`
         """
-        all_lines = []
-        for key in sorted(self.counts.keys()):
-            line = [key, str(self.counts[key])]
-            line += sorted(self.substitutions[key])
-            all_lines.append(self.sep.join(line))
+        if "subs" not in self._str_cache:
+            sep, counts, subs = self.sep, self.counts, self.substitutions
+            all_lines = []
+            for key in sorted(counts):
+                line = f"{key}{sep}{counts[key]}"
+                if key in subs and bool(subs[key]):
+                    line = sep.join([line, *sorted(subs[key])])
+                all_lines.append(line)
+
+            self._str_cache["subs"] = "\n".join(all_lines)
 
-        return "\n".join(all_lines)
+        return self._str_cache["subs"]
 
     def sub(self, value:str) -> set[str]:
         """ apply a substitution if it exists """
@@ -129,6 +195,7 @@ class SubstitutionFile(TagFile):
         return value in self.substitutions
 
     def update(self, *values):
+        self._str_cache.clear()
         for val in values:
             match val:
                 case None | "":
@@ -145,11 +212,11 @@ class SubstitutionFile(TagFile):
                     for key, val in val.items():
                         self._inc(key, amnt=val)
                 case SubstitutionFile():
-                    self.update(val.counts)
+                    self._merge_counts(val)
                     for tag, subs in val.substitutions.items():
                         self.substitutions[tag].update(subs)
                 case TagFile():
-                    self.update(val.counts.items())
+                    self._merge_counts(val)
 
         return self
 
@@ -163,21 +230,46 @@ class IndexFile(TagFile):
     def __iadd__(self, value) -> IndexFile:
         return self.update(value)
 
+    def _load_lines(self, lines:list[str], fpath:pl.Path):
+        """ Load `key : count : path...` lines directly """
+        counts, mapping, norm_tag, sep = self.counts, self.mapping, self.norm_tag, self.sep
+        for i, line in enumerate(lines):
+            parts = line.split(sep)
+            if len(parts) < 2:
+                continue
+            try:
+                amnt = int(parts[1])
+                key  = parts[0].strip()
+                if " " in key:
+                    key = norm_tag(key)
+                counts[key] += amnt
+            except ValueError as err:
+                logging.warning("Failure Tag Reading %s (l:%s) : %s", fpath, i, err)
+                continue
+
+            mapping[key].update(pl.Path(x.strip()) for x in parts[2:] if bool(x.strip()))
+
+        self._str_cache.clear()
+
     def __str__(self):
         """
         Export the mapping, 1 key per line, as:
         `key` : `len(values)` : ":".join(`values`)
         """
-        key_sort = sorted(list(self.mapping.keys()))
-        total = [self.sep.join([k, str(self.counts[k])]
-                               + sorted(str(y) for y in self.mapping[k]))
-                 for k in key_sort]
-        return "\n".join(total)
+        if "index" not in self._str_cache:
+            key_sort = sorted(self.mapping.keys())
+            total = [self.sep.join([k, str(self.counts[k])]
+                                   + sorted(str(y) for y in self.mapping[k]))
+                     for k in key_sort]
+            self._str_cache["index"] = "\n".join(total)
+
+        return self._str_cache["index"]
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: {len(self)}>"
 
     def update(self, *values):
+        self._str_cache.clear()
         for val in values:
             match val:
                 case (str() as key, maybecount, *rest):
@@ -185,11 +277,15 @@ class IndexFile(TagFile):
                     try:
                         count = int(maybecount)
                     except ValueError:
-                        paths.add(pl.Path(count))
+                        paths.add(pl.Path(maybecount))
                         count = len(paths)
 
                     norm_key = self._inc(key, amnt=count)
                     self.mapping[norm_key].update(paths)
+                case IndexFile():
+                    self._merge_counts(val)
+                    for tag, paths in val.mapping.items():
+                        self.mapping[tag].update(paths)
                 case _:
                     raise TypeError("Unexpected form in index update", val)
 
@@ -1,37 +1,240 @@
 #!/usr/bin/env python3
+"""
+Utility classes for working with timeline files
+"""
 ##-- imports
 from __future__ import annotations
 
+import heapq
+import logging as logmod
 import pathlib as pl
+import re
+import shlex
+from bisect import bisect_left, bisect_right
 from dataclasses import InitVar, dataclass, field
-from typing import (Any, Callable, ClassVar, Generic, Iterable, Iterator,
+from typing import (Any, Callable, ClassVar, Final, Generic, Iterable, Iterator,
                     Mapping, Match, MutableMapping, Sequence, Tuple, TypeAlias,
                     TypeVar, cast)
 
 ##-- end imports
 
 from datetime import datetime, timedelta
-from collections import defaultdict
+
+logging = logmod.getLogger(__name__)
+
+DATE_RE     : Final = re.compile(r"^(\d{1,4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?$")
+KEYWORD_RE  : Final = re.compile(r"(?:^|\s):(tags|link|wiki|url|desc)(?=\s|$)")
+TAGSPLIT_RE : Final = re.compile(r"\s*,\s*")
+NEEDS_QUOTE : Final = re.compile(r"[\s\"'\\#]")
+EMPTY       : Final = "_"
+PERIOD      : Final = "->"
+
+def parse_date(text:str) -> datetime:
+    """ A year, year-month, or year-month-day """
+    match DATE_RE.match(text):
+        case None:
+            raise ValueError(f"Bad Timeline Date: {text}")
+        case found:
+            return datetime(int(found[1]), int(found[2] or 1), int(found[3] or 1))
+
+def format_date(date:datetime) -> str:
+    """ The inverse of parse_date, at the precision the date was given """
+    if date.day != 1:
+        return f"{date.year}-{date.month:02}-{date.day:02}"
+    if date.month != 1:
+        return f"{date.year}-{date.month:02}"
+    return str(date.year)
+
+def _quote(text:str) -> str:
+    if not bool(text):
+        return EMPTY
+    if NEEDS_QUOTE.search(text) is None:
+        return text
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
 
 @dataclass
 class TimelineEntry:
 
     when     : datetime       = field()
     what     : str            = field()
-    where    : str            = field()
+    where    : str            = field(default="")
     duration : None|timedelta = field(default=None)
-    tags     : set[str]       = field(default=set)
-    urls     : set[str]       = field(default=set)
-    who      : set[str]       = field(default=set)
+    tags     : set[str]       = field(default_factory=set)
+    urls     : set[str]       = field(default_factory=set)
+    who      : set[str]       = field(default_factory=set)
+    desc     : None|str       = field(default=None)
+
+    @staticmethod
+    def parse(line:str, tags:None|set[str]=None) -> TimelineEntry:
+        """ Parse a single event or period line, adding the file's `tags` """
+        head, *rest = KEYWORD_RE.split(line)
+        tokens      = shlex.split(head, comments=False)
+        if len(tokens) < 2:
+            raise ValueError("Timeline lines need at least a date and an event")
+
+        when, duration = parse_date(tokens[0]), None
+        if tokens[1] == PERIOD:
+            if len(tokens) < 4:
+                raise ValueError("Timeline periods need a start, an end and an event")
+            end = parse_date(tokens[2])
+            if end < when:
+                raise ValueError(f"Timeline period ends before it starts: {tokens[0]} -> {tokens[2]}")
+            duration = end - when
+            tokens   = tokens[3:]
+        else:
+            tokens   = tokens[1:]
+
+        what, where, *who = tokens + ([EMPTY] if len(tokens) == 1 else [])
+        entry = TimelineEntry(when, what,
+                              where="" if where == EMPTY else where,
+                              duration=duration,
+                              tags=set(tags or ()),
+                              who=set(who))
+
+        for key, value in zip(rest[::2], rest[1::2]):
+            value = value.strip()
+            match key:
+                case "tags":
+                    entry.tags.update(x for x in TAGSPLIT_RE.split(value) if bool(x))
+                case "link" | "wiki" | "url":
+                    entry.urls.update(value.split())
+                case "desc":
+                    entry.desc = value or None
+
+        return entry
 
     def __str__(self):
-        return ""
+        return self.to_line()
+
+    def to_line(self, skip_tags:None|set[str]=None) -> str:
+        """ The entry as a timeline line, without the file's `skip_tags` """
+        parts = [format_date(self.when)]
+        if self.duration is not None:
+            parts += [PERIOD, format_date(self.when + self.duration)]
+        parts += [_quote(self.what), _quote(self.where), *sorted(_quote(x) for x in self.who)]
+
+        tags = self.tags - (skip_tags or set())
+        if bool(tags):
+            parts += [":tags", ",".join(sorted(tags))]
+        if bool(self.urls):
+            parts += [":link", *sorted(self.urls)]
+        if self.desc is not None:
+            parts += [":desc", self.desc]
+        return " ".join(parts)
 
     def range(self) -> tuple[datetime, datetime]:
         if self.duration is None:
             return (self.when , self.when)
         return (self.when, self.when + self.duration)
 
+def _entry_key(entry:TimelineEntry) -> tuple[datetime, datetime]:
+    return entry.range()
+
+def date_bounds(value:datetime|int|str) -> tuple[datetime, datetime]:
+    """
+    The span of a query date, at its precision:
+    a year or "1950-06" covers the whole year or month, a datetime is exact
+    """
+    match value:
+        case datetime():
+            return (value, value)
+        case int():
+            start, precision = datetime(value, 1, 1), 1
+        case str():
+            start, precision = parse_date(value), value.count("-") + 1
+        case _:
+            raise TypeError(f"Bad Timeline Query: {value!r}")
+
+    match precision:
+        case 1:
+            end = datetime(start.year + 1, 1, 1) if start.year < 9999 else datetime.max
+        case 2 if start.month == 12:
+            end = datetime(start.year + 1, 1, 1) if start.year < 9999 else datetime.max
+        case 2:
+            end = datetime(start.year, start.month + 1, 1)
+        case _:
+            end = start + timedelta(days=1)
+
+    return (start, min(end - timedelta(microseconds=1), datetime.max))
+
+class IntervalIndex:
+    """
+    An implicit interval tree over entries sorted by (start, end).
+
+    The middle of each subrange of the sorted array is a tree node,
+    and `_max_end[mid]` is the latest end in that node's subrange,
+    so overlap queries prune subtrees that end too early, or start too late,
+    and cost O(log n + k).
+    The index is rebuilt in O(n) on the first query after a change.
+    """
+
+    def __init__(self, entries:list[TimelineEntry]):
+        self.entries  = entries
+        self.starts   = [x.when for x in entries]
+        self._max_end : None|list[datetime] = None
+
+    def insert(self, index:int, entry:TimelineEntry):
+        self.entries.insert(index, entry)
+        self.starts.insert(index, entry.when)
+        self._max_end = None
+
+    def _build(self) -> list[datetime]:
+        if self._max_end is not None:
+            return self._max_end
+
+        ends    = [x.range()[1] for x in self.entries]
+        max_end = ends[:]
+        # children before parents: deepest subranges first
+        stack, order = [(0, len(ends))], []
+        while bool(stack):
+            lo, hi = stack.pop()
+            if hi <= lo:
+                continue
+            mid = (lo + hi) // 2
+            order.append((lo, mid, hi))
+            stack += [(lo, mid), (mid + 1, hi)]
+
+        for lo, mid, hi in reversed(order):
+            if lo < mid:
+                max_end[mid] = max(max_end[mid], max_end[(lo + mid) // 2])
+            if mid + 1 < hi:
+                max_end[mid] = max(max_end[mid], max_end[(mid + 1 + hi) // 2])
+
+        self._max_end = max_end
+        return max_end
+
+    @property
+    def max_end(self) -> None|datetime:
+        if not bool(self.entries):
+            return None
+        return self._build()[len(self.entries) // 2]
+
+    def overlapping(self, start:datetime, end:datetime, limit:None|int=None) -> list[TimelineEntry]:
+        """ Entries whose range shares any moment with [start, end], in order, up to `limit` of them """
+        max_end, starts, entries = self._build(), self.starts, self.entries
+        found = []
+
+        def visit(lo:int, hi:int):
+            if hi <= lo or (limit is not None and limit <= len(found)):
+                return
+            mid = (lo + hi) // 2
+            if max_end[mid] < start:
+                return
+            visit(lo, mid)
+            if end < starts[mid]:
+                return
+            if start <= entries[mid].range()[1]:
+                found.append(entries[mid])
+            visit(mid + 1, hi)
+
+        visit(0, len(entries))
+        return found
+
+    def within(self, start:datetime, end:datetime) -> list[TimelineEntry]:
+        """ Entries whose whole range is inside [start, end], in order """
+        lo = bisect_left(self.starts, start)
+        hi = bisect_right(self.starts, end)
+        return [x for x in self.entries[lo:hi] if x.range()[1] <= end]
 
 class TimelineFile:
     """
@@ -49,36 +252,67 @@ class TimelineFile:
 
     1922 -> 1933 "event"      england blah_bloo bloo_blee :tags blah,blee,blah :link blah
     2003         "something"  usa     a_person            :tags politics       :link https://blah :desc
+
+    Dates are a year, year-month or year-month-day.
+    `_` is an empty country. :link, :wiki and :url all add urls.
+    Lines starting with `#` are comments.
+
+    Entries are kept sorted by (start, end), so files merge in one pass,
+    and an IntervalIndex over them answers overlap queries in O(log n + k).
     """
 
-    date_dict : dict[datetime, list[TimelineEntry]]
+    entries : list[TimelineEntry]
+    tags    : set[str]
 
+    def __init__(self, entries:None|Iterable[TimelineEntry]=None, tags:None|set[str]=None):
+        self.tags    = set(tags or ())
+        self.entries = sorted(entries or (), key=_entry_key)
+        self._index  = IntervalIndex(self.entries)
 
-    entries : dict[str, TimelineEntry]
+    @staticmethod
+    def read(fpath:pl.Path) -> TimelineFile:
+        """ Parse a timeline file. Bad lines are logged and skipped """
+        tags, entries = set(), []
+        for i, line in enumerate(fpath.read_text().splitlines(), 1):
+            line = line.strip()
+            if not bool(line) or line[0] == "#":
+                continue
+            if line.startswith(":tags"):
+                tags.update(x for x in TAGSPLIT_RE.split(line[5:].strip()) if bool(x))
+                continue
+            try:
+                entries.append(TimelineEntry.parse(line))
+            except ValueError as err:
+                logging.warning("Failure Timeline Reading %s (l:%s) : %s", fpath, i, err)
+
+        for entry in entries:
+            entry.tags.update(tags)
+
+        return TimelineFile(entries, tags=tags)
 
-    def __init__(self):
-        self.date_dict = defaultdict(list)
-        self.entries   = dict()
-        self.min = None
-        self.max = None
+    @staticmethod
+    def merge(*timelines:TimelineFile) -> TimelineFile:
+        """ Merge already sorted timelines into one, in a single pass """
+        merged         = TimelineFile()
+        merged.entries = list(heapq.merge(*(x.entries for x in timelines), key=_entry_key))
+        merged._index  = IntervalIndex(merged.entries)
+        if bool(timelines):
+            merged.tags = set.intersection(*(x.tags for x in timelines))
+        return merged
 
     @staticmethod
-    def read(fpath:pl.Path):
-        result = TimelineFile()
-        for line in fpath.read_text().split("\n"):
-            # parse line
-            data = TimelineEntry()
-            results.add(data)
+    def read_all(fpaths:Iterable[pl.Path]) -> TimelineFile:
+        return TimelineFile.merge(*(TimelineFile.read(x) for x in fpaths))
 
     def __iter__(self):
-        for key in sorted(self.date_dict.keys()):
-            yield self.date_dict[key]
+        return iter(self.entries)
 
     def __str__(self):
         results = []
-        for entry_group in self:
-            results += [str(x) for x in entry_group]
+        if bool(self.tags):
+            results.append(":tags " + ",".join(sorted(self.tags)))
 
+        results += [x.to_line(skip_tags=self.tags) for x in self.entries]
         return "\n".join(results)
 
     def __repr__(self):
@@ -87,66 +321,97 @@ class TimelineFile:
     def __contains__(self, value):
         match value:
             case datetime():
-                return value in self.date_dict
+                starts = self._index.starts
+                index  = bisect_right(starts, value)
+                return 0 < index and starts[index - 1] == value
             case TimelineEntry():
-                return value.when in self.date_dict
+                return value in self.entries
 
     def __iadd__(self, values):
         match values:
             case [] | None:
                 pass
             case [*args]:
-                for arg in args:
-                    assert(isinstance(arg, TimelineEntry))
-                    self.add(arg)
+                self.add(*args)
             case TimelineEntry():
                 self.add(values)
             case TimelineFile():
-                for entrygroup in values:
-                    self.add(*entrygroup)
+                merged       = TimelineFile.merge(self, values)
+                self.entries = merged.entries
+                self._index  = merged._index
 
         return self
 
     def __len__(self):
-        return len(self.date_dict)
+        return len(self.entries)
+
+    @property
+    def min(self) -> None|datetime:
+        if not bool(self.entries):
+            return None
+        return self.entries[0].when
+
+    @property
+    def max(self) -> None|datetime:
+        return self._index.max_end
 
     def range(self):
         return (self.min, self.max)
 
+    def overlapping(self, start:datetime|int|str, end:None|datetime|int|str=None) -> list[TimelineEntry]:
+        """
+        Entries that share any moment with `start` to `end`, in order.
+        With no `end`, the entries that cover `start`.
+        Years and partial dates cover their whole span, so overlapping(1922, 1933) includes all of 1933
+        """
+        qmin, _ = date_bounds(start)
+        _, qmax = date_bounds(start if end is None else end)
+        return self._index.overlapping(qmin, qmax)
+
+    def within(self, start:datetime|int|str, end:None|datetime|int|str=None) -> list[TimelineEntry]:
+        """ Entries that start and end inside `start` to `end`, in order """
+        qmin, _ = date_bounds(start)
+        _, qmax = date_bounds(start if end is None else end)
+        return self._index.within(qmin, qmax)
+
     def encompasses(self, value):
+        """ Whether the timeline's whole range covers the value """
+        if not bool(self.entries):
+            return False
         match value:
             case datetime():
                 return self.min <= value <= self.max
             case TimelineEntry():
                 valMin, valMax = value.range()
                 return self.min <= valMin and valMax <= self.max
-            case TimelineFile():
+            case TimelineFile() if bool(value.entries):
                 return self.min <= value.min and value.max <= self.max
+            case _:
+                return False
 
     def intersects(self, value):
+        """ Whether any entry overlaps the value, or any of its entries """
         match value:
             case datetime():
-                return self.encompasses(value)
+                return bool(self._index.overlapping(value, value, limit=1))
             case TimelineEntry():
-                valMin, valMax = value.range()
-                return self.min <= valMin or valMax <= self.max
+                return bool(self._index.overlapping(*value.range(), limit=1))
             case TimelineFile():
-                left_intersect = self.min <= value.min and self.max <= value.max
-                right_intersect = value.min <= self.min and value.max <= self.max
-                return left_intersect or right_intersect
-
-
+                if not (bool(self.entries) and bool(value.entries)):
+                    return False
+                if self.max < value.min or value.max < self.min:
+                    return False
+                # query with the smaller timeline's entries
+                small, large = sorted([self, value], key=len)
+                return any(bool(large._index.overlapping(*x.range(), limit=1)) for x in small)
+            case _:
+                return False
 
     def add(self, *data):
         for entry in data:
             assert(isinstance(entry, TimelineEntry))
-            self.date_dict[entry.when].append(entry)
-            match self.min, self.max:
-                case None, None:
-                    self.min = entry.when
-                    self.max = entry.when
-                case minDate, _ if entry.when < minDate:
-                    self.min = entry.when
-                case _, maxDate if maxDate < entry.when:
-                    self.max = entry.when
-
+            # insert after equal keys, so equal entries keep their insertion order
+            index = bisect_right(self._index.starts, entry.when)
+            while 0 < index and entry.range() < self.entries[index - 1].range():
+                index -= 1
+            self._index.insert(index, entry)
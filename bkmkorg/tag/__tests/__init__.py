@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures of the tag tests
+"""
+import logging as logmod
+import pathlib as pl
+import tempfile
+import unittest
+
+def write_files(root:pl.Path, files:dict[str, list[str]]) -> dict[str, pl.Path]:
+    """ Write each relative path's lines under root, returning name -> path """
+    paths = {}
+    for name, lines in files.items():
+        fpath = root / name
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+        fpath.write_text("\n".join(lines))
+        paths[name] = fpath
+
+    return paths
+
+class TagFilesFixture(unittest.TestCase):
+    """ A temporary directory of the tagged bib, org and bookmark files in `files` """
+
+    files : dict[str, list[str]] = {}
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.WARNING)
+
+    def setUp(self):
+        self.tmp   = tempfile.TemporaryDirectory()
+        self.root  = pl.Path(self.tmp.name)
+        self.paths = write_files(self.root, self.files)
+
+    def tearDown(self):
+        self.tmp.cleanup()
@@ -0,0 +1,170 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+import pickle
+import tempfile
+import pathlib as pl
+
+from bkmkorg.tag.cooccurrence import CooccurrenceMatrix
+from bkmkorg.tag.graph import TagGraph
+from bkmkorg.tag.__tests import TagFilesFixture
+
+class CooccurrenceMatrixTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.WARNING)
+
+    def test_initial(self):
+        matrix = CooccurrenceMatrix()
+        self.assertEqual(len(matrix), 0)
+        self.assertEqual(matrix.matrix.nnz, 0)
+
+    def test_counts_and_weights(self):
+        matrix = CooccurrenceMatrix()
+        matrix.add(["a", "b", "c"])
+        matrix.add(["a", "b"])
+        matrix.add(["c"])
+        self.assertEqual(matrix.get_count("a"), 2)
+        self.assertEqual(matrix.get_count("c"), 2)
+        self.assertEqual(matrix.get_count("d"), 0)
+        self.assertEqual(matrix.get_weight("a", "b"), 2)
+        self.assertEqual(matrix.get_weight("b", "a"), 2)
+        self.assertEqual(matrix.get_weight("a", "c"), 1)
+        self.assertEqual(matrix.get_weight("a", "a"), 0)
+
+    def test_duplicates_counted_once(self):
+        matrix = CooccurrenceMatrix()
+        matrix.add(["a", "a", "b"])
+        self.assertEqual(matrix.get_count("a"), 1)
+        self.assertEqual(matrix.get_weight("a", "b"), 1)
+
+    def test_small_batches(self):
+        batched = CooccurrenceMatrix(batch_size=2)
+        single  = CooccurrenceMatrix()
+        docs = [["a", "b", "c"], ["b", "d"], ["d", "a", "e", "b"], ["e"], ["c", "e"]]
+        for doc in docs:
+            batched.add(doc)
+            single.add(doc)
+
+        self.assertEqual(sorted(batched.edges()), sorted(single.edges()))
+        self.assertEqual(batched.counts.tolist(), single.counts.tolist())
+
+    def test_merge(self):
+        left  = CooccurrenceMatrix()
+        right = CooccurrenceMatrix()
+        total = CooccurrenceMatrix()
+        left.add(["a", "b"])
+        right.add(["c", "b", "a"])
+        total.add(["a", "b"])
+        total.add(["c", "b", "a"])
+
+        left += right
+        self.assertEqual(sorted((min(x, y), max(x, y), w) for x, y, w in left.edges()),
+                         sorted((min(x, y), max(x, y), w) for x, y, w in total.edges()))
+        self.assertEqual(left.get_count("b"), 2)
+
+    def test_pickle(self):
+        matrix = CooccurrenceMatrix()
+        matrix.add(["a", "b"])
+        loaded = pickle.loads(pickle.dumps(matrix))
+        self.assertEqual(loaded.get_weight("a", "b"), 1)
+
+    def test_networkx_export(self):
+        matrix = CooccurrenceMatrix()
+        matrix.add(["a", "b", "c"])
+        matrix.add(["a", "b"])
+        graph = matrix.to_networkx()
+        self.assertEqual(graph.nodes['a']['count'], 2)
+        self.assertEqual(graph['a']['b']['weight'], 2)
+        self.assertEqual(graph['c']['b']['weight'], 1)
+
+class TagGraphTests(unittest.TestCase):
+
+    def test_link(self):
+        graph = TagGraph()
+        result = graph.link(["a tag", " b ", ""])
+        self.assertEqual(result, ["a_tag", "b"])
+        self.assertEqual(graph.get_count("a_tag"), 1)
+
+    def test_tags(self):
+        graph = TagGraph()
+        graph.link(["a", "b"])
+        graph.link(["a"])
+        tags = graph.tags
+        self.assertEqual(tags.get_count("a"), 2)
+        self.assertEqual(tags.get_count("b"), 1)
+
+    def test_write_matches_networkx(self):
+        import networkx as nx
+        graph = TagGraph()
+        graph.link(["a", "b", "c"])
+        graph.link(["b", "c"])
+        with tempfile.TemporaryDirectory() as tmp:
+            ours   = pl.Path(tmp) / "ours.edgelist"
+            theirs = pl.Path(tmp) / "theirs.edgelist"
+            graph.write(ours)
+            nx.write_weighted_edgelist(graph.to_networkx(), str(theirs))
+            self.assertEqual(sorted(ours.read_text().splitlines()),
+                             sorted(theirs.read_text().splitlines()))
+
+class TagGraphExtractionTests(TagFilesFixture):
+    files = {
+        "1990.bib"        : ["@article{a,",
+                             "  title         = {A},",
+                             "  tags          = {ai,planning},",
+                             "}",
+                             "@book{b,",
+                             "  tags          = {ai,ethics},",
+                             "}"],
+        "threads.org"     : ["* Threads",
+                             "** A Thread     :ai:games:",
+                             "** Untagged",
+                             "** Another     :games:"],
+        "total.bookmarks" : ["http://a.com : ai : web",
+                             "http://b.com : web"],
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.bib  = self.paths["1990.bib"]
+        self.org  = self.paths["threads.org"]
+        self.bkmk = self.paths["total.bookmarks"]
+
+    def test_serial_extraction(self):
+        graph = TagGraph()
+        graph.extract_org([self.org])
+        self.assertEqual(graph.get_count("games"), 2)
+        self.assertEqual(graph.matrix.get_weight("ai", "games"), 1)
+
+    def test_extract_bibtex_small_db(self):
+        db = mock.Mock()
+        db.entries = [{"ID": "a", "tags": "ai,planning"}]
+        graph = TagGraph()
+        total = graph.extract_bibtex(db)
+        self.assertEqual(total.get_count("planning"), 1)
+        self.assertEqual(graph.matrix.get_weight("ai", "planning"), 1)
+
+    def test_extract_files_in_process(self):
+        graph = TagGraph()
+        total = graph.extract_files([self.bib, self.org, self.bkmk], workers=0, shard_size=1)
+        self.assertEqual(total.get_count("ai"), 4)
+        self.assertEqual(graph.get_count("web"), 2)
+        self.assertEqual(graph.matrix.get_weight("ai", "planning"), 1)
+        self.assertEqual(graph.matrix.get_weight("ai", "web"), 1)
+
+    def test_extract_files_parallel_matches_serial(self):
+        serial   = TagGraph()
+        parallel = TagGraph()
+        files    = [self.bib, self.org, self.bkmk]
+        serial.extract_files(files, workers=0)
+        parallel.extract_files(files, workers=2, shard_size=1)
+        self.assertEqual(sorted(str(serial).splitlines()), sorted(str(parallel).splitlines()))
+        self.assertEqual(sorted((min(x, y), max(x, y), w) for x, y, w in serial.matrix.edges()),
+                         sorted((min(x, y), max(x, y), w) for x, y, w in parallel.matrix.edges()))
@@ -0,0 +1,64 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+import pathlib as pl
+
+from bkmkorg.tag.grep import TagGrep, grep_file
+from bkmkorg.tag.__tests import TagFilesFixture
+
+class TestTagGrep(TagFilesFixture):
+    files = {
+        "a/test.bib"          : ["@article{a,",
+                                 "  tags          = {ai,planning},",
+                                 "}",
+                                 "@book{b,",
+                                 "  tags          = {ai;ethics},",
+                                 "}"],
+        "a/b/notes.org"       : ["* Threads",
+                                 "** Thread: 2021-03-04     :ai:games:",
+                                 "*** not a thread     :other:",
+                                 "** Thread: 2022-01-01     :games:"],
+        "total.bookmarks"     : ["http://a.com : ai : web",
+                                 "http://b.com"],
+        "empty.org"           : [],
+        ".hidden/skipped.org" : ["** Thread     :hidden:"],
+        "a/other.txt"         : ["** Thread     :ignored:"],
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.bib  = self.paths["a/test.bib"]
+        self.org  = self.paths["a/b/notes.org"]
+        self.bkmk = self.paths["total.bookmarks"]
+
+    def test_grep_file(self):
+        self.assertEqual(dict(grep_file(self.bib)), {"ai": 2, "planning": 1, "ethics": 1})
+        self.assertEqual(dict(grep_file(self.org)), {"ai": 1, "games": 2})
+        self.assertEqual(dict(grep_file(self.bkmk)), {"ai": 1, "web": 1})
+        self.assertEqual(dict(grep_file(self.root / "empty.org")), {})
+
+    def test_scan(self):
+        grep    = TagGrep(workers=2)
+        indices = grep.scan(self.root)
+        self.assertEqual(indices[".bib"].get_count("ai"), 2)
+        self.assertEqual(indices[".org"].get_count("games"), 2)
+        self.assertEqual(indices[".org"].mapping["games"], {self.org.resolve()})
+        self.assertNotIn("hidden", indices[".org"])
+        self.assertNotIn("ignored", indices[".org"])
+        self.assertEqual(indices[".bookmarks"].to_set(), {"ai", "web"})
+
+    def test_scan_restricted(self):
+        grep    = TagGrep(exts={".org"})
+        indices = grep.scan(self.root, self.bib)
+        self.assertEqual(list(indices.keys()), [".org"])
+        self.assertIn("ai", grep[".org"])
+
+    def test_bad_ext(self):
+        with self.assertRaises(TypeError):
+            TagGrep(exts={".txt"})
@@ -0,0 +1,62 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+import pathlib as pl
+
+from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile
+from bkmkorg.tag.preview import (SubstitutionPreview, clean_bib_line,
+                                 clean_bookmark_line, clean_org_line)
+from bkmkorg.tag.__tests import TagFilesFixture
+
+class TestSubstitutionPreview(TagFilesFixture):
+    files = {
+        "test.bib"  : ["@article{a,",
+                       "  tags          = {ai,planing},",
+                       "}",
+                       "@book{b,",
+                       "  tags          = {history},",
+                       "}", ""],
+        "notes.org" : ["** Thread: 2021     :games:planing:", ""],
+        "other.org" : ["** Thread: 2021     :planing:", ""],
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.bib   = self.paths["test.bib"]
+        self.org   = self.paths["notes.org"]
+        self.other = self.paths["other.org"]
+        self.subs = SubstitutionFile()
+        self.subs.update(("planing", "3", "planning"), ("ai", "1", "ai"))
+        self.index = IndexFile()
+        # other.org is deliberately not indexed
+        self.index.update(("planing", 2, str(self.bib), str(self.org)),
+                          ("ai", 1, str(self.bib)),
+                          ("history", 1, str(self.bib)))
+
+    def test_line_cleaners(self):
+        subs = {"planing": {"planning"}}
+        self.assertEqual(clean_bib_line("  tags          = {b,planing},\n", subs), "  tags          = {b,planning},\n")
+        self.assertEqual(clean_org_line("** Thread     :planing:a:\n", subs), "** Thread :a:planning:\n")
+        self.assertEqual(clean_bookmark_line("http://a.com : planing : b\n", subs), "http://a.com : b : planning\n")
+        self.assertEqual(clean_bib_line("  year = {1990},\n", subs), "  year = {1990},\n")
+
+    def test_affected_files(self):
+        preview = SubstitutionPreview(self.subs, self.index)
+        self.assertEqual(preview.changed_tags(), {"planing"})
+        self.assertEqual(preview.affected_files(), {self.bib, self.org})
+
+    def test_run(self):
+        before  = self.bib.read_text()
+        preview = SubstitutionPreview(self.subs, self.index, workers=2)
+        diffs   = preview.run()
+        self.assertEqual(self.bib.read_text(), before)
+        self.assertEqual(sorted(x.path for x in diffs), sorted([self.bib, self.org]))
+        self.assertEqual(preview.summary(), {"planing": (2, 2)})
+        self.assertIn("+  tags          = {ai,planning},", preview.unified())
+        self.assertIn("planing : 2 : 2 : planning", str(preview))
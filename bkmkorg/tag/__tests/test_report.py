@@ -0,0 +1,121 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import json
+import logging as logmod
+import pathlib as pl
+
+from bkmkorg.tag.occurrences import NO_TIME, TagOccurrences
+from bkmkorg.tag.report import TagAnalytics
+from bkmkorg.tag.__tests import TagFilesFixture
+
+class TagSourcesFixture(TagFilesFixture):
+    files = {
+        "1990.bib"        : ["@article{a,",
+                             "  year          = {1990},",
+                             "  tags          = {ai,planning},",
+                             "}",
+                             "@book{b,",
+                             "  tags          = {ai,ethics},",
+                             "  year          = {1992},",
+                             "}",
+                             "@book{c,",
+                             "  tags          = {history},",
+                             "}"],
+        "threads.org"     : ["* Threads",
+                             "** Thread: 2021-03-04 10:00:00     :ai:games:",
+                             "** Untagged",
+                             "** Thread: 2022-01-01 10:00:00     :games:"],
+        "total.bookmarks" : ["http://a.com : ai : web",
+                             "http://b.com : web"],
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.bib  = self.paths["1990.bib"]
+        self.org  = self.paths["threads.org"]
+        self.bkmk = self.paths["total.bookmarks"]
+
+class TagOccurrencesTests(TagSourcesFixture):
+
+    def test_add(self):
+        table = TagOccurrences()
+        table.add(["a", "b", "a", " "], "org", 2000)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.documents, 1)
+        cols = table.columns()
+        self.assertEqual(cols['source'].tolist(), [1, 1])
+        self.assertEqual(cols['when'].tolist(), [2000, 2000])
+
+    def test_add_files(self):
+        table = TagOccurrences()
+        for fpath in [self.bib, self.org, self.bkmk]:
+            table.add_file(fpath)
+
+        self.assertEqual(table.documents, 7)
+        cols  = table.columns()
+        years = sorted(set(cols['when'][cols['source'] == 0].tolist()))
+        self.assertEqual(years, [NO_TIME, 1990, 1992])
+        org_years = sorted(set(cols['when'][cols['source'] == 1].tolist()))
+        self.assertEqual(org_years, [2021, 2022])
+
+    def test_merge(self):
+        left, right = TagOccurrences(), TagOccurrences()
+        left.add(["a"], "bibtex", 1990)
+        right.add(["b", "a"], "org", 2000)
+        left += right
+        self.assertEqual(left.documents, 2)
+        self.assertEqual(sorted(left.names[x] for x in left.columns()['tag'].tolist()), ["a", "a", "b"])
+        self.assertEqual(left.columns()['doc'].tolist(), [0, 1, 1])
+
+class TagAnalyticsTests(TagSourcesFixture):
+
+    def setUp(self):
+        super().setUp()
+        self.table = TagOccurrences()
+        for fpath in [self.bib, self.org, self.bkmk]:
+            self.table.add_file(fpath)
+        self.analytics = TagAnalytics(self.table, bookmark_bucket=1)
+
+    def test_frequencies(self):
+        freqs = self.analytics.frequencies()
+        self.assertEqual(freqs[self.table.vocab['ai']], 4)
+
+    def test_histogram(self):
+        # 1 use: planning, ethics, history. 2-3: games, web. 4-7: ai
+        self.assertEqual(self.analytics.histogram(), [(1, 2, 3), (2, 4, 2), (4, 8, 1)])
+
+    def test_singletons(self):
+        self.assertEqual(self.analytics.singletons(), ["ethics", "history", "planning"])
+
+    def test_growth(self):
+        growth = self.analytics.growth()
+        self.assertEqual(growth['bibtex'], [(1990, 2, 2), (1992, 1, 3)])
+        self.assertEqual(growth['org'], [(2021, 2, 2)])
+        self.assertEqual(growth['bookmarks'], [(0, 2, 2)])
+
+    def test_snapshots(self):
+        snapshots = self.analytics.snapshots()
+        self.assertEqual(sorted(snapshots.keys()),
+                         ["bibtex", "bibtex_1990", "bibtex_1992", "bookmarks", "org", "org_2021", "org_2022"])
+        self.assertEqual(snapshots['bibtex'].get_count("ai"), 2)
+        self.assertEqual(snapshots['bibtex_1992'].to_set(), {"ai", "ethics"})
+        self.assertEqual(str(snapshots['org_2022']), "games : 1")
+
+    def test_overlap(self):
+        overlap = self.analytics.overlap()
+        self.assertEqual(overlap['bibtex+org+bookmarks'], 1)
+        self.assertEqual(overlap['bibtex'], 3)
+        self.assertEqual(overlap['org'], 1)
+        self.assertEqual(overlap['bookmarks'], 1)
+
+    def test_outputs(self):
+        as_json = json.loads(self.analytics.to_json())
+        self.assertEqual(as_json['total_tags'], 6)
+        self.assertEqual(as_json['sources']['org'], {"uses": 3, "tags": 2})
+        self.assertIn("Singletons: 3", str(self.analytics))
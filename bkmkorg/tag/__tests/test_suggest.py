@@ -0,0 +1,66 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+
+from bkmkorg.tag.cooccurrence import CooccurrenceMatrix
+from bkmkorg.tag.suggest import TagSuggester, TagSuggestion
+
+class TagSuggesterTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.WARNING)
+
+    def setUp(self):
+        self.matrix = CooccurrenceMatrix()
+        # 'ai_planning' and 'planning_ai' are used in the same contexts
+        for _ in range(5):
+            self.matrix.add(["ai_planning", "search", "games"])
+            self.matrix.add(["planning_ai", "search", "games"])
+            self.matrix.add(["history", "politics"])
+            self.matrix.add(["politics", "election"])
+        self.matrix.add(["xfiles", "tv"])
+        self.matrix.add(["x_files", "tv"])
+        self.matrix.add(["x_files", "scifi"])
+
+    def test_ngrams(self):
+        suggester = TagSuggester(self.matrix, ngram=3)
+        self.assertEqual(suggester.ngrams("x_files"), suggester.ngrams("xfiles"))
+        self.assertEqual(suggester.ngrams("a"), {"^a$"})
+
+    def test_string_similarity(self):
+        suggester = TagSuggester(self.matrix, max_df=1.0)
+        pairs = {(self.matrix.names[i], self.matrix.names[j]) for i, j, _ in suggester.string_similarity()}
+        self.assertIn(("xfiles", "x_files"), pairs)
+        self.assertNotIn(("history", "politics"), pairs)
+
+    def test_context_similarity(self):
+        suggester = TagSuggester(self.matrix)
+        pairs = {(self.matrix.names[i], self.matrix.names[j]) for i, j, _ in suggester.context_similarity()}
+        self.assertIn(("ai_planning", "planning_ai"), pairs)
+        self.assertNotIn(("ai_planning", "history"), pairs)
+
+    def test_suggest_direction(self):
+        suggester   = TagSuggester(self.matrix, max_df=1.0)
+        suggestions = suggester.suggest()
+        as_pairs    = {(x.tag, x.target) for x in suggestions}
+        # the less used tag is substituted with the more used one
+        self.assertIn(("xfiles", "x_files"), as_pairs)
+        self.assertEqual(suggestions, sorted(suggestions, reverse=True))
+
+    def test_exclude(self):
+        suggester = TagSuggester(self.matrix, max_df=1.0, exclude={"xfiles"})
+        self.assertNotIn("xfiles", {x.tag for x in suggester.suggest()})
+
+    def test_substitution_file(self):
+        suggestions = [TagSuggestion(0.9, "xfiles", "x_files", "string", 1),
+                       TagSuggestion(0.8, "xfiles", "files", "string", 1)]
+        subs = TagSuggester.to_substitution_file(suggestions)
+        self.assertEqual(subs.sub("xfiles"), {"x_files"})
+        self.assertEqual(TagSuggester.to_sub_str(suggestions), "xfiles : 1 : x_files")
@@ -0,0 +1,69 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+from os.path import splitext, split
+
+import unittest
+import unittest.mock as mock
+
+import logging as logmod
+import pathlib as pl
+
+from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile, TagFile
+from bkmkorg.tag.trie import TagTrie
+
+class TestTagTrie(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.WARNING)
+
+    def setUp(self):
+        self.trie = TagTrie()
+        self.trie.update(("ai", "1"), ("ai_planning", "4"), ("ai_ethics", "2"),
+                         ("aircraft", "3"), ("history_uk_london", "5"), ("history_uk", "1"))
+
+    def test_counts(self):
+        self.assertEqual(len(self.trie), 6)
+        self.assertEqual(self.trie.get_count("ai_planning"), 4)
+        self.assertEqual(self.trie.get_count("ai_plan"), 0)
+        self.assertEqual(self.trie.prefix_count("ai"), 10)
+        self.assertEqual(self.trie.namespace_count("ai"), 7)
+        self.assertEqual(self.trie.namespace_count("history"), 6)
+        self.assertIn("history uk", self.trie)
+        self.assertNotIn("history", self.trie)
+
+    def test_completions(self):
+        self.assertEqual(self.trie.completions("ai_"), [("ai_ethics", 2), ("ai_planning", 4)])
+        self.assertEqual(self.trie.completions("ai", limit=2), [("ai", 1), ("ai_ethics", 2)])
+        self.assertEqual(self.trie.completions("zz"), [])
+        self.assertEqual(list(self.trie)[-1], "history_uk_london")
+
+    def test_namespace(self):
+        self.assertEqual([x for x, _ in self.trie.namespace("ai")], ["ai", "ai_ethics", "ai_planning"])
+        self.assertEqual(self.trie.children(), {"ai": 7, "aircraft": 3, "history": 6})
+        self.assertEqual(self.trie.children("history"), {"history_uk": 6})
+        self.assertEqual(self.trie.children("history_uk"), {"history_uk_london": 5})
+
+    def test_remove(self):
+        self.assertEqual(self.trie.remove("ai_planning"), 4)
+        self.assertEqual(self.trie.remove("ai_planning"), 0)
+        self.assertEqual(self.trie.prefix_count("ai"), 6)
+        self.assertEqual(self.trie.completions("ai_"), [("ai_ethics", 2)])
+        self.assertIsNone(self.trie._find("ai_p"))
+        self.assertEqual(len(self.trie), 5)
+
+    def test_load_files(self):
+        tags  = TagFile()
+        tags.update(("ai", "2"))
+        subs  = SubstitutionFile()
+        subs.update(("ai_plan", "1", "ai_planning"))
+        index = IndexFile()
+        index.update(("ai_ethics", "1", "a.org"))
+
+        trie = TagTrie()
+        trie += tags
+        trie.update(subs, index)
+        self.assertEqual(trie.namespace_count("ai"), 4)
+        self.assertEqual(trie.get_data("ai_plan"), {"ai_planning"})
+        self.assertEqual(trie.files_for("ai_e"), {pl.Path("a.org")})
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Sparse tag co-occurrence accumulation.
+
+Documents are added as lists of tags, converted to arrays of tag ids,
+and buffered. When the buffer is flushed, every pairwise combination
+of ids is generated with numpy and summed into a scipy sparse matrix
+in a single operation, rather than mutating a graph one edge at a time.
+
+Only the upper triangle (row id < col id) is stored.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import pathlib as pl
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import numpy as np
+from scipy import sparse
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+Tag : TypeAlias = str
+
+DEFAULT_BATCH : Final = 2_000_000
+ID_DTYPE      : Final = np.int64
+COUNT_DTYPE   : Final = np.int64
+
+class CooccurrenceMatrix:
+    """
+    Accumulates tag counts and pairwise co-occurrence weights.
+
+    `add` buffers a document's tag ids, `flush` reduces the buffer
+    into the sparse matrix. Queries flush automatically.
+    """
+
+    def __init__(self, batch_size:int=DEFAULT_BATCH):
+        self.batch_size               = batch_size
+        self.documents                = 0
+        self.vocab    : dict[Tag,int] = {}
+        self.names    : list[Tag]     = []
+        self._counts  : np.ndarray    = np.zeros(0, dtype=COUNT_DTYPE)
+        self._matrix  : sparse.csr_matrix = sparse.csr_matrix((0, 0), dtype=COUNT_DTYPE)
+        self._pending : list[list[int]]   = []
+        self._pending_size                = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, tag:Tag):
+        return tag in self.vocab
+
+    def __iter__(self) -> Iterator[Tag]:
+        return iter(self.names)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} tags, {self.matrix.nnz} edges>"
+
+    def __getstate__(self):
+        self.flush()
+        state = self.__dict__.copy()
+        state['_pending'] = []
+        return state
+
+    def tag_id(self, tag:Tag) -> int:
+        """ Get the id of a tag, assigning a new one if necessary """
+        idx = self.vocab.get(tag, None)
+        if idx is None:
+            idx = len(self.names)
+            self.vocab[tag] = idx
+            self.names.append(tag)
+        return idx
+
+    def add(self, tags:Iterable[Tag]) -> None:
+        """
+        Buffer a single document's (already normalised) tags.
+        Duplicate tags in a document are counted once.
+        """
+        vocab  = self.vocab
+        tag_id = self.tag_id
+        ids    = sorted({vocab[x] if x in vocab else tag_id(x) for x in tags})
+        if not bool(ids):
+            return
+
+        self.documents += 1
+        self._pending.append(ids)
+        self._pending_size += (len(ids) * (len(ids) + 1)) // 2
+        if self.batch_size <= self._pending_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Reduce all buffered documents into the counts and matrix """
+        if not bool(self._pending):
+            self._resize()
+            return
+
+        pending             = self._pending
+        self._pending       = []
+        self._pending_size  = 0
+        self._resize()
+
+        all_ids      = np.fromiter((x for ids in pending for x in ids), dtype=ID_DTYPE)
+        self._counts += np.bincount(all_ids, minlength=len(self.names)).astype(COUNT_DTYPE)
+
+        rows, cols = self._pairs(pending)
+        if not bool(rows.size):
+            return
+
+        size    = len(self.names)
+        weights = np.ones(rows.size, dtype=COUNT_DTYPE)
+        batch   = sparse.coo_matrix((weights, (rows, cols)), shape=(size, size)).tocsr()
+        self._matrix = self._matrix + batch
+
+    def update(self, other:CooccurrenceMatrix) -> CooccurrenceMatrix:
+        """ Merge another matrix's counts and weights into this one """
+        other.flush()
+        self.flush()
+        if not bool(len(other)):
+            return self
+
+        self.documents += other.documents
+        remap = np.fromiter((self.tag_id(x) for x in other.names), dtype=ID_DTYPE, count=len(other))
+        self._resize()
+        np.add.at(self._counts, remap, other._counts)
+
+        coo = other._matrix.tocoo()
+        if bool(coo.nnz):
+            rows    = remap[coo.row]
+            cols    = remap[coo.col]
+            low     = np.minimum(rows, cols)
+            high    = np.maximum(rows, cols)
+            size    = len(self.names)
+            merged  = sparse.coo_matrix((coo.data, (low, high)), shape=(size, size)).tocsr()
+            self._matrix = self._matrix + merged
+
+        return self
+
+    def __iadd__(self, other:CooccurrenceMatrix):
+        return self.update(other)
+
+    @property
+    def counts(self) -> np.ndarray:
+        self.flush()
+        return self._counts
+
+    @property
+    def matrix(self) -> sparse.csr_matrix:
+        """ The upper triangular co-occurrence matrix """
+        self.flush()
+        return self._matrix
+
+    def symmetric(self) -> sparse.csr_matrix:
+        """ The full symmetric co-occurrence matrix, with a zero diagonal """
+        upper = self.matrix
+        return (upper + upper.T).tocsr()
+
+    def get_count(self, tag:Tag) -> int:
+        if tag not in self.vocab:
+            return 0
+        return int(self.counts[self.vocab[tag]])
+
+    def get_weight(self, tag_a:Tag, tag_b:Tag) -> int:
+        if tag_a not in self.vocab or tag_b not in self.vocab or tag_a == tag_b:
+            return 0
+        low, high = sorted([self.vocab[tag_a], self.vocab[tag_b]])
+        return int(self.matrix[low, high])
+
+    def edges(self) -> Iterator[tuple[Tag, Tag, int]]:
+        """ Yield (tag, tag, weight) for every non-zero pair """
+        coo   = self.matrix.tocoo()
+        names = self.names
+        for row, col, weight in zip(coo.row.tolist(), coo.col.tolist(), coo.data.tolist()):
+            yield names[row], names[col], weight
+
+    def to_networkx(self) -> "nx.Graph":
+        """ Export to a networkx graph, with node 'count' and edge 'weight' attributes """
+        import networkx as nx
+        graph = nx.Graph()
+        graph.add_nodes_from((name, {"count": int(count)}) for name, count in zip(self.names, self.counts.tolist()))
+        graph.add_weighted_edges_from(self.edges())
+        return graph
+
+    def write_edgelist(self, target:pl.Path, delimiter:str=" ") -> None:
+        """
+        Write the weighted edgelist, in the same format as
+        networkx.write_weighted_edgelist: `tag tag weight`, one per line
+        """
+        with open(target, 'w') as f:
+            for tag_a, tag_b, weight in self.edges():
+                f.write(f"{tag_a}{delimiter}{tag_b}{delimiter}{weight}\n")
+
+    def _resize(self) -> None:
+        size = len(self.names)
+        if self._counts.size < size:
+            self._counts = np.concatenate([self._counts, np.zeros(size - self._counts.size, dtype=COUNT_DTYPE)])
+        if self._matrix.shape[0] < size:
+            self._matrix.resize((size, size))
+
+    @staticmethod
+    def _pairs(docs:list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generate the (low, high) id pairs for every document,
+        grouping documents by size so each group is a single vectorised operation
+        """
+        by_size : dict[int, list[list[int]]] = {}
+        for ids in docs:
+            if len(ids) < 2:
+                continue
+            by_size.setdefault(len(ids), []).append(ids)
+
+        rows, cols = [], []
+        for size, group in by_size.items():
+            stacked    = np.array(group, dtype=ID_DTYPE)
+            upper      = np.triu_indices(size, k=1)
+            rows.append(stacked[:, upper[0]].ravel())
+            cols.append(stacked[:, upper[1]].ravel())
+
+        if not bool(rows):
+            return np.zeros(0, dtype=ID_DTYPE), np.zeros(0, dtype=ID_DTYPE)
+
+        return np.concatenate(rows), np.concatenate(cols)
@@ -7,16 +7,18 @@ Tagset Reading
 from __future__ import annotations
 
 import logging as logmod
+import pathlib as pl
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from typing import (Any, Callable, ClassVar, Dict, Generic, Iterable, Iterator,
                     List, Mapping, Match, MutableMapping, Optional, Sequence,
                     Set, Tuple, TypeVar, Union, cast, Final, TypeAlias)
 
-import networkx as nx
 import regex
-from bkmkorg.bookmarks.collection import BookmarkCollection
-from bkmkorg.tag.tagfile import TagFile
+from bkmkorg.formats.bookmarks import BookmarkCollection
+from bkmkorg.formats.tagfile import TagFile
+from bkmkorg.tag.cooccurrence import CooccurrenceMatrix
 ##-- end imports
 
 logging = logmod.getLogger(__name__)
@@ -26,104 +28,182 @@ IGNORE_REPLACEMENTS = ["TO_CHECK"]
 TAG_NORM    : Final = regex.compile(" +")
 ORG_PATTERN : str   = r"^\*\*\s+.+?\s+:(\S+):$"
 ORG_SEP     : str   = ":"
+BIB_PATTERN : str   = r"^\s*tags\s*=\s*{(.*?)},?\s*$"
+BIB_SEP     : Final = regex.compile(r",|;")
+
+SHARD_SIZE  : Final = 20
 
 Tag : TypeAlias = str
 
+def bib_tags(fpath:pl.Path) -> Iterator[list[Tag]]:
+    """
+    Stream the tags of each entry in a bibtex file,
+    without parsing the rest of the entry
+    """
+    tag_re = regex.compile(BIB_PATTERN, flags=regex.IGNORECASE)
+    with open(fpath, 'r', errors="replace") as f:
+        for line in f:
+            if "tags" not in line:
+                continue
+            match tag_re.match(line):
+                case None:
+                    continue
+                case result:
+                    yield BIB_SEP.split(result[1])
+
+def org_tags(fpath:pl.Path, tag_regex:None|str=None) -> Iterator[list[Tag]]:
+    """ Stream the tags of each thread heading in an org file """
+    tag_re = regex.compile(tag_regex or ORG_PATTERN)
+    with open(fpath, 'r', errors="replace") as f:
+        for line in f:
+            match tag_re.findall(line):
+                case []:
+                    continue
+                case [tags, *_]:
+                    yield tags.split(ORG_SEP)
+
+def bookmark_tags(fpath:pl.Path) -> Iterator[list[Tag]]:
+    """ The tags of each bookmark in a bookmark file """
+    for bkmk in BookmarkCollection.read(fpath):
+        yield list(bkmk.tags)
+
+def file_tags(fpath:pl.Path) -> Iterator[list[Tag]]:
+    """ Dispatch to the tag streamer for the file's type """
+    match fpath.suffix:
+        case ".bib":
+            return bib_tags(fpath)
+        case ".org":
+            return org_tags(fpath)
+        case ".bookmarks":
+            return bookmark_tags(fpath)
+        case _:
+            raise TypeError("Unrecognised Tag Source", fpath)
+
+def extract_shard(files:list[pl.Path]) -> CooccurrenceMatrix:
+    """
+    The map step of TagGraph.extract_files.
+    Build a partial graph for a shard of files
+    """
+    graph = TagGraph()
+    for fpath in files:
+        try:
+            for tags in file_tags(fpath):
+                graph.link(tags)
+        except Exception as err:
+            logging.warning("Failed to extract tags from %s : %s", fpath, err)
+
+    return graph.matrix
+
 class TagGraph:
+    """
+    Tag counts and co-occurrences, accumulated into a sparse matrix.
+    Use `to_networkx` for a networkx.Graph
+    """
+
+    def __init__(self, batch_size:None|int=None):
+        self.matrix : CooccurrenceMatrix = CooccurrenceMatrix(batch_size) if batch_size else CooccurrenceMatrix()
 
-    def __init__(self):
-        self.graph : nx.Graph = nx.Graph()
+    def extract_files(self, files:Iterable[pl.Path], workers:None|int=None, shard_size:int=SHARD_SIZE) -> TagFile:
+        """
+        Map-reduce extraction from any mix of .bib, .org and .bookmarks files.
+        Shards of files are processed by worker processes into partial graphs,
+        which are merged here as they complete.
+        workers=0 processes the shards in this process.
+        """
+        files  = sorted({pl.Path(x) for x in files})
+        shards = [files[i:i+shard_size] for i in range(0, len(files), shard_size)]
+        total  = CooccurrenceMatrix()
+        logging.info("Extracting Tags from %s files in %s shards", len(files), len(shards))
+
+        if workers == 0:
+            results = (extract_shard(shard) for shard in shards)
+            self._reduce(total, zip(shards, results), len(files))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(extract_shard, shard) : shard for shard in shards}
+                results = ((futures[x], x.result()) for x in as_completed(futures))
+                self._reduce(total, results, len(files))
+
+        self.matrix.update(total)
+        return self._to_tagfile(total)
 
     def extract_bibtex(self, db:bibtexparser.BibtexDatabase) -> TagFile:
         logging.info("Processing Bibtex: %s", len(db.entries))
-
-        proportion = int(len(db.entries) / 10)
-        count = 0
-        total = TagFile()
-
-        for i, entry in enumerate(db.entries):
-            if i % proportion == 0:
-                logging.info("%s/10 Complete", count)
-                count += 1
-
-            #get tags
-            total.update(self.link(entry['tags']))
+        total     = TagFile()
+        num       = len(db.entries)
+        step      = max(1, num // 10)
+
+        for i, entry in enumerate(db.entries, 1):
+            match entry:
+                case {"__tags": tags}:
+                    pass
+                case {"tags": str() as tags}:
+                    tags = BIB_SEP.split(tags)
+                case _:
+                    tags = []
+
+            total.update(*self.link(tags))
+            if i % step == 0 or i == num:
+                logging.info("%s/%s Complete", i, num)
 
         return total
 
     def extract_org(self, org_files:List[pl.Path], tag_regex=None) -> TagFile:
         logging.info("Extracting data from orgs")
-        tag_regex = tag_regex or ORG_PATTERN
-
-        ORG_TAG_REGEX = regex.compile(tag_regex)
         total = TagFile()
 
         for org in org_files:
-            #read
-            text = []
-            with open(org,'r') as f:
-                text = f.readlines()
-
-            #line by line
-            for line in text:
-                tags = ORG_TAG_REGEX.findall(line)
-                e_tags = []
-                if not bool(tags):
-                    continue
-
-                e_tags = [x for x in tags[0].split(ORG_SEP)]
-                total.update(self.link(e_tags))
+            for tags in org_tags(org, tag_regex):
+                total.update(*self.link(tags))
 
         return total
 
     def extract_bookmark(self, bkmk_files: List[pl.Path]) -> TagFile:
         total = TagFile()
         for bkmk_f in bkmk_files:
-            bkmks = BookmarkCollection.read(bkmk_f)
-
-            for bkmk in bkmks:
-                tags          = bkmk.tags
-                total.update(self.link(tags))
+            for tags in bookmark_tags(bkmk_f):
+                total.update(*self.link(tags))
 
         return total
 
-    def link(self, tags:Iterable[Tag]) -> Iterable[Tag]:
+    def link(self, tags:Iterable[Tag]) -> list[Tag]:
         """
         Add a set of tags to the graph, after normalising
         """
-        norm_tags = [TAG_NORM.sub("_", x.strip()) for x in tags if bool(x)]
-        remaining = norm_tags[:]
-
-        [self.graph.add_node(x, count=0) for x in norm_tags if x not in self.graph]
-
-        for tag in norm_tags:
-            self.graph.nodes[tag]['count'] += 1
-            remaining.remove(tag)
-            edges_to_increment = [(tag, y) for y in remaining]
-            for u,v in edges_to_increment:
-                if not self.graph.has_edge(u,v):
-                    self.graph.add_edge(u,v, weight=0)
-
-                self.graph[u][v]['weight'] += 1
-
+        stripped  = (x.strip() for x in tags)
+        norm_tags = [TAG_NORM.sub("_", x) if " " in x else x for x in stripped if bool(x)]
+        self.matrix.add(norm_tags)
         return norm_tags
 
     def write(self, target:pl.Path):
-        nx.write_weighted_edgelist(self.graph, str(target))
+        self.matrix.write_edgelist(target)
+
+    def to_networkx(self) -> nx.Graph:
+        return self.matrix.to_networkx()
 
     def __str__(self):
-        keys    = self.tags
-        tag_str = "\n".join(["{} : {}".format(k, self.graph.nodes[k]['count']) for k in keys])
+        counts  = self.matrix.counts
+        tag_str = "\n".join("{} : {}".format(k, counts[self.matrix.vocab[k]]) for k in sorted(self.matrix))
         return tag_str
 
     @property
     def tags(self) -> TagFile:
+        return self._to_tagfile(self.matrix)
+
+    def get_count(self, tag:Tag) -> int:
+        return self.matrix.get_count(tag)
+
+    def _reduce(self, total:CooccurrenceMatrix, results:Iterable[tuple[list[pl.Path], CooccurrenceMatrix]], num_files:int):
+        """ The reduce step of extract_files """
+        done = 0
+        for shard, partial in results:
+            total.update(partial)
+            done += len(shard)
+            logging.info("Tag Extraction: %s/%s files", done, num_files)
+
+    @staticmethod
+    def _to_tagfile(matrix:CooccurrenceMatrix) -> TagFile:
         result = TagFile()
-        for tag in self.graph.nodes:
-            result.set_count(tag, self.graph.nodes[tag]['count'])
+        for tag, count in zip(matrix.names, matrix.counts.tolist()):
+            result.set_count(tag, count)
         return result
-
-    def get_count(self, tag:Tag):
-        if tag not in self.graph:
-            return 0
-        return self.graph[tag]['count']
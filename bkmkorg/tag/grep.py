@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Scan arbitrary directory trees for tag lines, to build IndexFiles.
+
+Directories are walked in parallel by a thread pool,
+files are memory mapped and searched with pre-compiled bytes regexes,
+so only the matched tags are ever decoded.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import mmap
+import os
+import pathlib as pl
+import re
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bkmkorg.formats.tagfile import IndexFile
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+Tag : TypeAlias = str
+
+# (quick reject bytes, line pattern with a single group of tags, separator)
+GREP_PATTERNS : Final[dict[str, tuple[bytes, re.Pattern, re.Pattern]]] = {
+    ".bib"       : (b"tags",
+                    re.compile(rb"^[ \t]*tags[ \t]*=[ \t]*{(.*?)},?[ \t]*\r?$", flags=re.MULTILINE | re.IGNORECASE),
+                    re.compile(rb",|;")),
+    ".org"       : (b"**",
+                    re.compile(rb"^\*\*[ \t]+.+?[ \t]+:(\S+):[ \t]*\r?$", flags=re.MULTILINE),
+                    re.compile(rb":")),
+    ".bookmarks" : (b" : ",
+                    re.compile(rb"^\S+? : (.+?)\r?$", flags=re.MULTILINE),
+                    re.compile(rb" : ")),
+}
+
+def grep_file(fpath:pl.Path, patterns:dict=GREP_PATTERNS) -> Counter[Tag]:
+    """ Count the tags used in a single file, through a memory map """
+    quick, line_re, sep_re = patterns[fpath.suffix]
+    counts                 = Counter()
+    with open(fpath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return counts
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped.find(quick) == -1:
+                return counts
+
+            for match in line_re.finditer(mapped):
+                for tag in sep_re.split(match[1]):
+                    tag = tag.strip()
+                    if bool(tag):
+                        counts[tag.decode("utf-8", errors="replace")] += 1
+
+    return counts
+
+def scan_dir(dpath:pl.Path, exts:set[str]) -> tuple[list[pl.Path], list[pl.Path]]:
+    """ A single level of a directory: (matching files, subdirectories) """
+    files, dirs = [], []
+    try:
+        with os.scandir(dpath) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(pl.Path(entry.path))
+                elif entry.is_file() and os.path.splitext(entry.name)[1] in exts:
+                    files.append(pl.Path(entry.path))
+    except OSError as err:
+        logging.warning("Failed to scan %s : %s", dpath, err)
+
+    return files, dirs
+
+@dataclass
+class TagGrep:
+    """
+    Walk directory trees in parallel, indexing the tags of
+    .bib, .org and .bookmarks files into an IndexFile per extension
+    """
+
+    workers  : None|int = field(default=None)
+    exts     : set[str] = field(default_factory=lambda: set(GREP_PATTERNS.keys()))
+
+    indices  : dict[str, IndexFile] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        unknown = self.exts - set(GREP_PATTERNS.keys())
+        if bool(unknown):
+            raise TypeError("Unrecognised Tag Sources", unknown)
+
+        self.indices = {x : IndexFile() for x in self.exts}
+
+    def __getitem__(self, ext:str) -> IndexFile:
+        return self.indices[ext]
+
+    def scan(self, *roots:pl.Path) -> dict[str, IndexFile]:
+        """
+        Directories and files are both work items in the same pool,
+        so files start being searched while the walk continues
+        """
+        pending : set[Future] = set()
+        count                 = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for root in roots:
+                root = pl.Path(root).expanduser().resolve()
+                if root.is_file() and root.suffix in self.exts:
+                    pending.add(pool.submit(self._grep, root))
+                elif root.is_dir():
+                    pending.add(pool.submit(scan_dir, root, self.exts))
+
+            while bool(pending):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    match future.result():
+                        case (pl.Path() as fpath, Counter() as counts):
+                            count += 1
+                            self._index(fpath, counts)
+                        case (list() as files, list() as dirs):
+                            pending.update(pool.submit(self._grep, x) for x in files)
+                            pending.update(pool.submit(scan_dir, x, self.exts) for x in dirs)
+
+        logging.info("Tag Grep: %s files", count)
+        return self.indices
+
+    def _grep(self, fpath:pl.Path) -> tuple[pl.Path, Counter[Tag]]:
+        try:
+            return fpath, grep_file(fpath)
+        except OSError as err:
+            logging.warning("Failed to grep %s : %s", fpath, err)
+            return fpath, Counter()
+
+    def _index(self, fpath:pl.Path, counts:Counter[Tag]):
+        if not bool(counts):
+            return
+
+        path_str = str(fpath)
+        self.indices[fpath.suffix].update(*((tag, str(amnt), path_str) for tag, amnt in counts.items()))
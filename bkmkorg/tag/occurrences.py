@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Columnar storage of individual tag uses.
+
+Each use of a tag is a row of (tag, source, when, doc),
+appended to compact typed arrays and exposed as numpy arrays
+for vectorised aggregation.
+`when` is a year for bibtex and org threads, and the position in the file for bookmarks.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import pathlib as pl
+import re
+from array import array
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import numpy as np
+import regex
+
+from bkmkorg.formats.bookmarks import BookmarkCollection
+from bkmkorg.tag.graph import BIB_PATTERN, BIB_SEP, ORG_PATTERN, ORG_SEP, TAG_NORM
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+Tag : TypeAlias = str
+
+SOURCES      : Final = ("bibtex", "org", "bookmarks")
+NO_TIME      : Final = -1
+
+BIB_ENTRY_RE : Final = re.compile(r"^\s*@")
+BIB_YEAR_RE  : Final = re.compile(r"^\s*year\s*=\s*[{\"]?(\d{4})", flags=re.IGNORECASE)
+ORG_DATE_RE  : Final = re.compile(r"^\*\*\s+.*?(\d{4})-\d{2}-\d{2}")
+
+def bib_uses(fpath:pl.Path) -> Iterator[tuple[int, list[Tag]]]:
+    """ Stream (year, tags) for each entry in a bibtex file """
+    tag_re      = regex.compile(BIB_PATTERN, flags=regex.IGNORECASE)
+    year, tags  = NO_TIME, None
+    with open(fpath, 'r', errors="replace") as f:
+        for line in f:
+            if BIB_ENTRY_RE.match(line):
+                if tags is not None:
+                    yield year, tags
+                year, tags = NO_TIME, None
+                continue
+
+            if (result:=BIB_YEAR_RE.match(line)) is not None:
+                year = int(result[1])
+            elif "tags" in line and (result:=tag_re.match(line)) is not None:
+                tags = BIB_SEP.split(result[1])
+
+    if tags is not None:
+        yield year, tags
+
+def org_uses(fpath:pl.Path) -> Iterator[tuple[int, list[Tag]]]:
+    """ Stream (year, tags) for each tagged thread heading in an org file """
+    tag_re = regex.compile(ORG_PATTERN)
+    with open(fpath, 'r', errors="replace") as f:
+        for line in f:
+            match tag_re.findall(line):
+                case []:
+                    continue
+                case [tags, *_]:
+                    date = ORG_DATE_RE.match(line)
+                    yield (int(date[1]) if date else NO_TIME), tags.split(ORG_SEP)
+
+def bookmark_uses(fpath:pl.Path) -> Iterator[tuple[int, list[Tag]]]:
+    """ (position, tags) for each bookmark in a bookmark file """
+    for i, bkmk in enumerate(BookmarkCollection.read(fpath)):
+        yield i, list(bkmk.tags)
+
+class TagOccurrences:
+    """
+    A growable columnar table of tag uses
+    """
+
+    def __init__(self):
+        self.vocab  : dict[Tag, int] = {}
+        self.names  : list[Tag]      = []
+        self._tag    = array('I')
+        self._source = array('B')
+        self._when   = array('i')
+        self._doc    = array('I')
+        self._docs   = 0
+
+    def __len__(self):
+        return len(self._tag)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} uses, {len(self.names)} tags, {self._docs} docs>"
+
+    def tag_id(self, tag:Tag) -> int:
+        idx = self.vocab.get(tag, None)
+        if idx is None:
+            idx = len(self.names)
+            self.vocab[tag] = idx
+            self.names.append(tag)
+        return idx
+
+    def add(self, tags:Iterable[Tag], source:int|str, when:int=NO_TIME) -> int:
+        """ Add a single document's tags, returning the document's id """
+        if isinstance(source, str):
+            source = SOURCES.index(source)
+
+        doc      = self._docs
+        stripped = (x.strip() for x in tags)
+        normed   = {TAG_NORM.sub("_", x) if " " in x else x for x in stripped if bool(x)}
+        ids      = [self.tag_id(x) for x in normed]
+        self._tag.extend(ids)
+        self._source.extend([source] * len(ids))
+        self._when.extend([when] * len(ids))
+        self._doc.extend([doc] * len(ids))
+        self._docs += 1
+        return doc
+
+    def add_file(self, fpath:pl.Path) -> None:
+        """ Stream all tag uses of a .bib, .org or .bookmarks file into the table """
+        match fpath.suffix:
+            case ".bib":
+                uses, source = bib_uses(fpath), 0
+            case ".org":
+                uses, source = org_uses(fpath), 1
+            case ".bookmarks":
+                uses, source = bookmark_uses(fpath), 2
+            case _:
+                raise TypeError("Unrecognised Tag Source", fpath)
+
+        for when, tags in uses:
+            self.add(tags, source, when)
+
+    def update(self, other:TagOccurrences) -> TagOccurrences:
+        """ Append another table's rows, remapping its tag and document ids """
+        remap = np.fromiter((self.tag_id(x) for x in other.names), dtype=np.uint32, count=len(other.names))
+        cols  = other.columns()
+        self._tag.extend(remap[cols['tag']].tolist())
+        self._source.extend(other._source)
+        self._when.extend(other._when)
+        self._doc.extend((cols['doc'] + self._docs).tolist())
+        self._docs += other._docs
+        return self
+
+    def __iadd__(self, other:TagOccurrences):
+        return self.update(other)
+
+    @property
+    def documents(self) -> int:
+        return self._docs
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """ Each column as a numpy array """
+        # copied, as arrays can't be resized while exporting buffers
+        return {
+            "tag"    : np.frombuffer(self._tag,    dtype=np.uint32).copy(),
+            "source" : np.frombuffer(self._source, dtype=np.uint8).copy(),
+            "when"   : np.frombuffer(self._when,   dtype=np.int32).copy(),
+            "doc"    : np.frombuffer(self._doc,    dtype=np.uint32).copy(),
+        }
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tag substitution line cleaning, and dry-run previews of it.
+
+The line cleaners are shared with tags::clean.
+A preview uses the tag -> file index to find only the files a
+substitution batch would touch, and diffs them in worker processes,
+without writing anything.
+"""
+##-- imports
+from __future__ import annotations
+
+import difflib
+import logging as logmod
+import pathlib as pl
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    Mapping, TypeAlias)
+
+from bkmkorg.formats.tagfile import TAG_NORM, IndexFile, SubstitutionFile
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+Tag  : TypeAlias = str
+Subs : TypeAlias = Mapping[Tag, set[Tag]]
+
+bib_tag_re      : Final = re.compile(r"^(\s+tags\s+=)\s+{(.+?)},$")
+org_tag_re      : Final = re.compile(r"^(\*\* .+?)\s+:(\S+):$")
+bookmark_tag_re : Final = re.compile(r"^(http.+?) : (.+)$")
+
+def sub_tag(tag:Tag, subs:Subs) -> set[Tag]:
+    """ As SubstitutionFile.sub, but on a plain mapping, so it can be sent to workers """
+    normed = TAG_NORM.sub("_", tag.strip())
+    if normed in subs:
+        return subs[normed]
+    return {normed}
+
+def clean_tags(tags:Iterable[Tag], subs:Subs) -> list[Tag]:
+    return sorted({y for x in tags for y in sub_tag(x, subs) if bool(y)})
+
+def clean_bib_line(line:str, subs:Subs) -> str:
+    match bib_tag_re.match(line):
+        case None:
+            return line
+        case result:
+            return "{} {{{}}},\n".format(result[1], ",".join(clean_tags(result[2].split(","), subs)))
+
+def clean_org_line(line:str, subs:Subs) -> str:
+    match org_tag_re.match(line):
+        case None:
+            return line
+        case result:
+            return "{} :{}:\n".format(result[1], ":".join(clean_tags(result[2].split(":"), subs)))
+
+def clean_bookmark_line(line:str, subs:Subs) -> str:
+    match bookmark_tag_re.match(line.strip()):
+        case None:
+            return line
+        case result:
+            return "{} : {}\n".format(result[1], " : ".join(clean_tags(result[2].split(":"), subs)))
+
+CLEANERS : Final[dict[str, Callable[[str, Subs], str]]] = {
+    ".bib"       : clean_bib_line,
+    ".org"       : clean_org_line,
+    ".bookmarks" : clean_bookmark_line,
+}
+
+@dataclass
+class FileDiff:
+    """ The changes cleaning would make to a single file """
+
+    path    : pl.Path                       = field()
+    changes : list[tuple[int, str, str]]    = field(default_factory=list)
+    tags    : dict[Tag, int]                = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def unified(self) -> str:
+        """ A unified diff of just the changed lines """
+        lines = []
+        for lineno, old, new in self.changes:
+            lines.append(f"@@ -{lineno} +{lineno} @@\n")
+            lines.append(f"-{old}" if old.endswith("\n") else f"-{old}\n")
+            lines.append(f"+{new}" if new.endswith("\n") else f"+{new}\n")
+
+        return "".join([f"--- {self.path}\n", f"+++ {self.path}\n", *lines])
+
+def diff_file(fpath:pl.Path, subs:Subs) -> FileDiff:
+    """ Clean a file in memory, recording changed lines and the tags that caused them """
+    cleaner = CLEANERS[fpath.suffix]
+    result  = FileDiff(fpath)
+    tags    = defaultdict(lambda: 0)
+    with open(fpath, 'r', errors="replace") as f:
+        for lineno, line in enumerate(f, start=1):
+            cleaned = cleaner(line, subs)
+            if cleaned.rstrip("\n") == line.rstrip("\n"):
+                continue
+
+            result.changes.append((lineno, line, cleaned))
+            for tag in _line_tags(line, fpath.suffix):
+                if sub_tag(tag, subs) != {TAG_NORM.sub("_", tag.strip())}:
+                    tags[TAG_NORM.sub("_", tag.strip())] += 1
+
+    result.tags = dict(tags)
+    return result
+
+def _line_tags(line:str, suffix:str) -> list[Tag]:
+    match suffix:
+        case ".bib" if (result:=bib_tag_re.match(line)) is not None:
+            return result[2].split(",")
+        case ".org" if (result:=org_tag_re.match(line)) is not None:
+            return result[2].split(":")
+        case ".bookmarks" if (result:=bookmark_tag_re.match(line.strip())) is not None:
+            return result[2].split(":")
+        case _:
+            return []
+
+@dataclass
+class SubstitutionPreview:
+    """
+    A dry run of applying `subs` to every file the `index` says uses a substituted tag
+    """
+
+    subs    : SubstitutionFile = field()
+    index   : IndexFile        = field()
+    workers : None|int         = field(default=None)
+
+    diffs   : list[FileDiff]   = field(init=False, default_factory=list)
+
+    def changed_tags(self) -> set[Tag]:
+        """ Tags whose substitution is not just themselves """
+        return {tag for tag, targets in self.subs.substitutions.items() if targets != {tag}}
+
+    def affected_files(self) -> set[pl.Path]:
+        files = set()
+        for tag in self.changed_tags():
+            files.update(self.index.mapping.get(tag, set()))
+
+        return {pl.Path(x) for x in files if pl.Path(x).suffix in CLEANERS}
+
+    def run(self) -> list[FileDiff]:
+        # plain dicts, as SubstitutionFiles hold unpicklable lambdas
+        subs  = {tag: set(targets) for tag, targets in self.subs.substitutions.items()}
+        files = sorted(self.affected_files())
+        logging.info("Previewing Substitutions in %s files", len(files))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(diff_file, fpath, subs) : fpath for fpath in files if fpath.exists()}
+            for future in as_completed(futures):
+                try:
+                    diff = future.result()
+                except OSError as err:
+                    logging.warning("Failed to Preview %s : %s", futures[future], err)
+                    continue
+                if bool(diff):
+                    self.diffs.append(diff)
+
+        self.diffs.sort(key=lambda x: x.path)
+        return self.diffs
+
+    def summary(self) -> dict[Tag, tuple[int, int]]:
+        """ tag -> (lines changed, files changed) """
+        lines, files = defaultdict(lambda: 0), defaultdict(lambda: 0)
+        for diff in self.diffs:
+            for tag, count in diff.tags.items():
+                lines[tag] += count
+                files[tag] += 1
+
+        return {tag: (lines[tag], files[tag]) for tag in lines}
+
+    def __str__(self):
+        summary = self.summary()
+        total   = sum(len(x.changes) for x in self.diffs)
+        report  = [f"Files Changed: {len(self.diffs)}",
+                   f"Lines Changed: {total}",
+                   "",
+                   "-- Tag : Lines : Files : Substitution"]
+        report += [f"{tag} : {lines} : {files} : {' '.join(sorted(self.subs.substitutions[tag]))}"
+                   for tag, (lines, files) in sorted(summary.items(), key=lambda x: (-x[1][0], x[0]))]
+        return "\n".join(report)
+
+    def unified(self) -> str:
+        return "".join(x.unified() for x in self.diffs)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Tag usage analytics, aggregated from a TagOccurrences table with numpy.
+"""
+##-- imports
+from __future__ import annotations
+
+import json
+import logging as logmod
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import numpy as np
+
+from bkmkorg.formats.tagfile import TagFile
+from bkmkorg.tag.occurrences import NO_TIME, SOURCES, TagOccurrences
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+@dataclass
+class TagAnalytics:
+    """
+    Frequency histograms, long tail, growth over time and source overlap of tags.
+
+    Growth is by year for bibtex and org,
+    and by buckets of `bookmark_bucket` positions for bookmarks.
+    """
+
+    occurrences     : TagOccurrences = field()
+    bookmark_bucket : int            = field(default=500)
+    top             : int            = field(default=25)
+
+    _cols           : dict[str, np.ndarray] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._cols = self.occurrences.columns()
+
+    @property
+    def num_tags(self) -> int:
+        return len(self.occurrences.names)
+
+    def frequencies(self) -> np.ndarray:
+        """ Total uses of each tag """
+        return np.bincount(self._cols['tag'], minlength=self.num_tags)
+
+    def source_frequencies(self) -> np.ndarray:
+        """ A tags x sources matrix of uses """
+        combined = self._cols['tag'].astype(np.int64) * len(SOURCES) + self._cols['source']
+        counts   = np.bincount(combined, minlength=self.num_tags * len(SOURCES))
+        return counts.reshape(self.num_tags, len(SOURCES))
+
+    def histogram(self) -> list[tuple[int, int, int]]:
+        """ The number of tags used [lo, hi) times, in power of 2 buckets """
+        freqs = self.frequencies()
+        freqs = freqs[freqs > 0]
+        if not bool(freqs.size):
+            return []
+
+        buckets = np.floor(np.log2(freqs)).astype(np.int64)
+        counts  = np.bincount(buckets)
+        return [(2**i, 2**(i+1), int(x)) for i, x in enumerate(counts.tolist()) if bool(x)]
+
+    def singletons(self) -> list[str]:
+        """ Tags used exactly once """
+        names = self.occurrences.names
+        return sorted(names[x] for x in np.flatnonzero(self.frequencies() == 1).tolist())
+
+    def most_used(self) -> list[tuple[str, int]]:
+        freqs = self.frequencies()
+        order = np.argsort(-freqs, kind="stable")[:self.top]
+        names = self.occurrences.names
+        return [(names[x], int(freqs[x])) for x in order.tolist() if bool(freqs[x])]
+
+    def growth(self) -> dict[str, list[tuple[int, int, int]]]:
+        """
+        For each source, a list of (time, new tags, total tags),
+        where a tag is new at the earliest time it was used in that source
+        """
+        results = {}
+        for i, source in enumerate(SOURCES):
+            mask = (self._cols['source'] == i) & (self._cols['when'] != NO_TIME)
+            if not mask.any():
+                continue
+
+            when = self._cols['when'][mask].astype(np.int64)
+            if source == "bookmarks":
+                when = (when // self.bookmark_bucket) * self.bookmark_bucket
+
+            first = np.full(self.num_tags, np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(first, self._cols['tag'][mask], when)
+            first         = first[first != np.iinfo(np.int64).max]
+            times, counts = np.unique(first, return_counts=True)
+            totals        = np.cumsum(counts)
+            results[source] = list(zip(times.tolist(), counts.tolist(), totals.tolist()))
+
+        return results
+
+    def snapshots(self) -> dict[str, TagFile]:
+        """
+        Tag frequencies for each source, and for each year of bibtex and org,
+        keyed as `source` and `source_year`
+        """
+        names   = self.occurrences.names
+        results = {}
+        for i, source in enumerate(SOURCES):
+            mask = self._cols['source'] == i
+            if not mask.any():
+                continue
+
+            results[source] = self._to_tagfile(self._cols['tag'][mask], names)
+            if source == "bookmarks":
+                continue
+
+            when = self._cols['when'][mask]
+            tags = self._cols['tag'][mask]
+            for year in np.unique(when[when != NO_TIME]).tolist():
+                results[f"{source}_{year}"] = self._to_tagfile(tags[when == year], names)
+
+        return results
+
+    def _to_tagfile(self, tags:np.ndarray, names:list[str]) -> TagFile:
+        counts = np.bincount(tags, minlength=len(names))
+        result = TagFile()
+        for idx in np.flatnonzero(counts).tolist():
+            result.set_count(names[idx], int(counts[idx]))
+        return result
+
+    def overlap(self) -> dict[str, int]:
+        """ The number of tags used in each combination of sources """
+        present = self.source_frequencies() > 0
+        codes   = present @ (1 << np.arange(len(SOURCES)))
+        counts  = np.bincount(codes, minlength=2**len(SOURCES))
+        results = {}
+        for code, count in enumerate(counts.tolist()):
+            if not bool(code) or not bool(count):
+                continue
+            combo = "+".join(x for i, x in enumerate(SOURCES) if code & (1 << i))
+            results[combo] = count
+
+        return results
+
+    def to_dict(self) -> dict:
+        source_freqs = self.source_frequencies()
+        uses         = np.bincount(self._cols['source'], minlength=len(SOURCES))
+        return {
+            "total_uses"  : len(self.occurrences),
+            "total_tags"  : self.num_tags,
+            "documents"   : self.occurrences.documents,
+            "sources"     : { x : {"uses" : int(uses[i]), "tags" : int((source_freqs[:, i] > 0).sum()) }
+                              for i, x in enumerate(SOURCES) },
+            "histogram"   : [{"min" : lo, "max" : hi, "tags" : n} for lo, hi, n in self.histogram()],
+            "most_used"   : dict(self.most_used()),
+            "singletons"  : self.singletons(),
+            "growth"      : { x : [{"when" : w, "new" : n, "total" : t} for w, n, t in y]
+                              for x, y in self.growth().items() },
+            "overlap"     : self.overlap(),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def __str__(self):
+        summary    = self.to_dict()
+        report     = [f"Total Uses: {summary['total_uses']}",
+                      f"Distinct Tags: {summary['total_tags']}",
+                      f"Documents: {summary['documents']}",
+                      "",
+                      "-- Sources:"]
+        report    += [f"{x:<10} : {y['uses']} uses, {y['tags']} tags" for x, y in summary['sources'].items()]
+        report    += ["", "-- Frequency Histogram (uses : tags):"]
+        report    += [f"{x['min']:>6} - {x['max'] - 1:<6} : {x['tags']}" for x in summary['histogram']]
+        report    += ["", f"-- Most Used:"]
+        report    += [f"{x:<30} : {y}" for x, y in summary['most_used'].items()]
+        report    += ["", f"-- Singletons: {len(summary['singletons'])}"]
+        report    += ["", "-- Source Overlap (sources : tags):"]
+        report    += [f"{x:<25} : {y}" for x, y in summary['overlap'].items()]
+        for source, growth in summary['growth'].items():
+            report += ["", f"-- Growth of {source} (when : new : total):"]
+            report += [f"{x['when']:<8} : {x['new']:<6} : {x['total']}" for x in growth]
+
+        return "\n".join(report)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Suggest tag substitutions, for curating .sub files.
+
+Two tags are candidates for collapsing together if:
+- they are used in similar contexts: the cosine similarity of their
+  positive PMI co-occurrence vectors, or
+- they are spelt similarly: the dice coefficient of their character n-grams.
+
+Both are computed as chunked sparse matrix products,
+keeping only the top k candidates per tag, so there is no pairwise loop.
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import pathlib as pl
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+import numpy as np
+from scipy import sparse
+import regex
+
+from bkmkorg.formats.tagfile import SubstitutionFile
+from bkmkorg.tag.cooccurrence import CooccurrenceMatrix
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+STRING_NORM : Final = regex.compile(r"[\W_]+")
+CHUNK_SIZE  : Final = 2_000
+
+@dataclass(order=True)
+class TagSuggestion:
+    """ A proposed substitution of `tag` with `target` """
+    score  : float = field()
+    tag    : str   = field(compare=False)
+    target : str   = field(compare=False)
+    kind   : str   = field(compare=False)
+    count  : int   = field(compare=False, default=0)
+
+    def __str__(self):
+        return f"{self.tag} -> {self.target} ({self.kind}: {self.score:.3f})"
+
+@dataclass
+class TagSuggester:
+    """
+    Builds ranked TagSuggestions from a CooccurrenceMatrix.
+
+    min_count   : minimum uses of a tag to have a meaningful context vector
+    min_context : minimum cosine similarity of context vectors
+    min_string  : minimum dice coefficient of ngrams
+    max_df      : ngrams used by more than this proportion of tags are ignored for candidate generation
+    features    : context vectors are pruned to their highest weighted features
+    """
+
+    matrix      : CooccurrenceMatrix = field()
+    top_k       : int                = field(default=5)
+    min_count   : int                = field(default=2)
+    min_context : float              = field(default=0.6)
+    min_string  : float              = field(default=0.75)
+    ngram       : int                = field(default=3)
+    max_df      : float              = field(default=0.05)
+    features    : int                = field(default=25)
+    exclude     : set[str]           = field(default_factory=set)
+
+    def suggest(self) -> list[TagSuggestion]:
+        """ All suggestions, best first, with one suggestion per pair of tags """
+        best   : dict[tuple[int, int], tuple[float, str]] = {}
+        counts = self.matrix.counts
+        for kind, pairs in [("context", self.context_similarity()), ("string", self.string_similarity())]:
+            for i, j, score in pairs:
+                key = (min(i, j), max(i, j))
+                if key not in best or best[key][0] < score:
+                    best[key] = (score, kind)
+
+        names   = self.matrix.names
+        results = []
+        for (i, j), (score, kind) in best.items():
+            # Substitute the less used tag with the more used
+            tag, target = (i, j) if (counts[i], names[j]) < (counts[j], names[i]) else (j, i)
+            if names[tag] in self.exclude:
+                continue
+            results.append(TagSuggestion(float(score), names[tag], names[target], kind, int(counts[tag])))
+
+        results.sort(reverse=True)
+        return results
+
+    def context_similarity(self) -> Iterator[tuple[int, int, float]]:
+        """ Cosine similarity of PPMI vectors, for tags used at least min_count times """
+        vectors = self.ppmi()
+        keep    = (self.matrix.counts >= self.min_count).astype(np.float64)
+        vectors = self._prune((sparse.diags(keep) @ vectors).tocsr(), self.features)
+        norms   = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        vectors = (sparse.diags(1 / norms) @ vectors).tocsr()
+        yield from self._top_k(vectors, self.min_context, lambda i, cols, vals: vals)
+
+    def string_similarity(self) -> Iterator[tuple[int, int, float]]:
+        """ Dice coefficient of character ngrams, through an ngram index """
+        index, sizes = self.ngram_index()
+        score_fn     = lambda i, cols, vals: (2 * vals) / (sizes[i] + sizes[cols])
+        yield from self._top_k(index, self.min_string, score_fn)
+
+    def ppmi(self) -> sparse.csr_matrix:
+        """ The positive pointwise mutual information of the symmetric co-occurrence matrix """
+        coo     = self.matrix.symmetric().tocoo()
+        counts  = self.matrix.counts.astype(np.float64)
+        total   = max(self.matrix.documents, 1)
+        pmi     = np.log((coo.data * total) / (counts[coo.row] * counts[coo.col]))
+        mask    = pmi > 0
+        size    = len(self.matrix)
+        return sparse.csr_matrix((pmi[mask], (coo.row[mask], coo.col[mask])), shape=(size, size))
+
+    def ngram_index(self) -> tuple[sparse.csr_matrix, np.ndarray]:
+        """
+        A binary tag x ngram matrix, with overly common ngrams removed,
+        and the total number of ngrams of each tag
+        """
+        gram_ids : dict[str, int] = {}
+        rows, cols, sizes = [], [], []
+        for i, tag in enumerate(self.matrix.names):
+            grams = self.ngrams(tag)
+            sizes.append(len(grams))
+            for gram in grams:
+                rows.append(i)
+                cols.append(gram_ids.setdefault(gram, len(gram_ids)))
+
+        shape = (len(self.matrix), len(gram_ids))
+        index = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        df    = np.asarray((index > 0).sum(axis=0)).ravel()
+        limit = max(2, int(self.max_df * shape[0]))
+        index = (index @ sparse.diags((df <= limit).astype(np.float64))).tocsr()
+        index.eliminate_zeros()
+        return index, np.asarray(sizes, dtype=np.float64)
+
+    def ngrams(self, tag:str) -> set[str]:
+        normed = STRING_NORM.sub("", tag.lower())
+        padded = f"^{normed}$"
+        if len(padded) <= self.ngram:
+            return {padded}
+        return {padded[i:i+self.ngram] for i in range(len(padded) - self.ngram + 1)}
+
+    def _top_k(self, vectors:sparse.csr_matrix, threshold:float, score_fn:Callable) -> Iterator[tuple[int, int, float]]:
+        """
+        Multiply `vectors` by its transpose in chunks of rows,
+        yielding the top_k scoring (row, col, score) above threshold for each row
+        """
+        transposed = vectors.T.tocsr()
+        size       = vectors.shape[0]
+        for start in range(0, size, CHUNK_SIZE):
+            block = (vectors[start:start+CHUNK_SIZE] @ transposed).tocsr()
+            for offset in range(block.shape[0]):
+                i      = start + offset
+                lo, hi = block.indptr[offset], block.indptr[offset+1]
+                cols   = block.indices[lo:hi]
+                scores = score_fn(i, cols, block.data[lo:hi])
+                mask   = (cols != i) & (threshold <= scores)
+                cols, scores = cols[mask], scores[mask]
+                if self.top_k < cols.size:
+                    best         = np.argpartition(-scores, self.top_k)[:self.top_k]
+                    cols, scores = cols[best], scores[best]
+
+                yield from ((i, j, s) for j, s in zip(cols.tolist(), scores.tolist()))
+
+    @staticmethod
+    def _prune(vectors:sparse.csr_matrix, features:int) -> sparse.csr_matrix:
+        """ Keep only the highest `features` values of each row """
+        vectors.eliminate_zeros()
+        lengths = np.diff(vectors.indptr)
+        for i in np.flatnonzero(features < lengths).tolist():
+            lo, hi = vectors.indptr[i], vectors.indptr[i+1]
+            row    = vectors.data[lo:hi]
+            cutoff = np.partition(row, -features)[-features]
+            row[row < cutoff] = 0
+
+        vectors.eliminate_zeros()
+        return vectors
+
+    @staticmethod
+    def to_substitution_file(suggestions:Iterable[TagSuggestion]) -> SubstitutionFile:
+        """ The best suggestion for each tag, as a SubstitutionFile """
+        result = SubstitutionFile()
+        for suggestion in sorted(suggestions, reverse=True):
+            if result.has_sub(suggestion.tag):
+                continue
+            result.update((suggestion.tag, str(suggestion.count), suggestion.target))
+
+        return result
+
+    @staticmethod
+    def to_sub_str(suggestions:Iterable[TagSuggestion], sep=" : ") -> str:
+        """
+        The best suggestion for each tag, in SubstitutionFile format,
+        ranked best first instead of alphabetically
+        """
+        seen  = set()
+        lines = []
+        for suggestion in sorted(suggestions, reverse=True):
+            if suggestion.tag in seen:
+                continue
+            seen.add(suggestion.tag)
+            lines.append(sep.join([suggestion.tag, str(suggestion.count), suggestion.target]))
+
+        return "\n".join(lines)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+A prefix trie of normalised tags, for their implicit hierarchies.
+
+Tags like `ai_planning` and `ai_ethics` are both under the namespace `ai`.
+Each node keeps the total count of its subtree,
+so namespace and prefix counts are O(len(prefix)),
+and completions are O(len(prefix) + size of the results).
+"""
+##-- imports
+from __future__ import annotations
+
+import logging as logmod
+import pathlib as pl
+from dataclasses import InitVar, dataclass, field
+from typing import (Any, Callable, ClassVar, Final, Iterable, Iterator,
+                    TypeAlias)
+
+from bkmkorg.formats.tagfile import IndexFile, SubstitutionFile, TagFile, TAG_NORM
+
+##-- end imports
+
+logging = logmod.getLogger(__name__)
+
+Tag : TypeAlias = str
+
+class TrieNode:
+    """ A single character of a tag """
+
+    __slots__ = ("children", "count", "total", "terminal", "data")
+
+    def __init__(self):
+        self.children : dict[str, TrieNode] = {}
+        self.count    : int                 = 0
+        self.total    : int                 = 0
+        self.terminal : bool                = False
+        self.data     : None|set            = None
+
+class TagTrie:
+    """
+    A hierarchical tag store.
+    Load TagFiles, SubstitutionFiles and IndexFiles through `update`.
+    Substitutions and index paths are kept as each tag's `data`
+    """
+
+    def __init__(self, sep:str="_"):
+        self.sep    = sep
+        self.root   = TrieNode()
+        self._size  = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} tags, {self.root.total} uses>"
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, tag:Tag) -> bool:
+        node = self._find(self.norm_tag(tag))
+        return node is not None and node.terminal
+
+    def __iter__(self) -> Iterator[Tag]:
+        return (tag for tag, _ in self.completions(""))
+
+    def __iadd__(self, values):
+        return self.update(values)
+
+    def norm_tag(self, tag:Tag) -> Tag:
+        return TAG_NORM.sub("_", tag.strip())
+
+    def add(self, tag:Tag, count:int=1, data:None|Iterable=None) -> Tag:
+        """ Add uses of a tag, updating the totals of every prefix of it """
+        normed = self.norm_tag(tag)
+        if not bool(normed):
+            return normed
+
+        node        = self.root
+        node.total += count
+        for char in normed:
+            node = node.children.setdefault(char, TrieNode())
+            node.total += count
+
+        if not node.terminal:
+            node.terminal = True
+            self._size   += 1
+
+        node.count += count
+        if data is not None:
+            if node.data is None:
+                node.data = set()
+            node.data.update(data)
+
+        return normed
+
+    def remove(self, tag:Tag) -> int:
+        """ Remove a tag entirely, pruning empty branches. Returns its count """
+        normed = self.norm_tag(tag)
+        path   = [self.root]
+        for char in normed:
+            node = path[-1].children.get(char, None)
+            if node is None:
+                return 0
+            path.append(node)
+
+        target = path[-1]
+        if not target.terminal:
+            return 0
+
+        count = target.count
+        for node in path:
+            node.total -= count
+
+        target.terminal, target.count, target.data = False, 0, None
+        self._size -= 1
+        for char, parent, node in zip(reversed(normed), reversed(path[:-1]), reversed(path)):
+            if bool(node.children) or node.terminal:
+                break
+            del parent.children[char]
+
+        return count
+
+    def update(self, *values) -> TagTrie:
+        for val in values:
+            match val:
+                case None | "":
+                    continue
+                case str():
+                    self.add(val)
+                case (str() as key, str()|int() as count):
+                    self.add(key, int(count))
+                case IndexFile():
+                    for key, count in val.counts.items():
+                        self.add(key, count, data=val.mapping.get(key, None))
+                case SubstitutionFile():
+                    for key, count in val.counts.items():
+                        self.add(key, count, data=val.substitutions.get(key, None))
+                case TagFile():
+                    for key, count in val.counts.items():
+                        self.add(key, count)
+                case set() | list():
+                    self.update(*val)
+                case _:
+                    raise TypeError("Unexpected form in trie update", val)
+
+        return self
+
+    def get_count(self, tag:Tag) -> int:
+        """ The uses of exactly this tag """
+        node = self._find(self.norm_tag(tag))
+        return 0 if node is None else node.count
+
+    def get_data(self, tag:Tag) -> set:
+        node = self._find(self.norm_tag(tag))
+        return set() if node is None or node.data is None else node.data
+
+    def prefix_count(self, prefix:str) -> int:
+        """ The total uses of all tags starting with `prefix` """
+        node = self._find(self.norm_tag(prefix))
+        return 0 if node is None else node.total
+
+    def namespace_count(self, namespace:str) -> int:
+        """ The total uses of `namespace`, and all tags under it """
+        normed = self.norm_tag(namespace)
+        return self.get_count(normed) + self.prefix_count(normed + self.sep)
+
+    def completions(self, prefix:str, limit:None|int=None) -> list[tuple[Tag, int]]:
+        """ (tag, count) of tags starting with `prefix`, in alphabetical order """
+        normed = self.norm_tag(prefix)
+        node   = self._find(normed)
+        if node is None:
+            return []
+
+        results = []
+        stack   = [(normed, node)]
+        while bool(stack) and (limit is None or len(results) < limit):
+            tag, node = stack.pop()
+            if node.terminal:
+                results.append((tag, node.count))
+            stack.extend((tag + char, child) for char, child in sorted(node.children.items(), reverse=True))
+
+        return results
+
+    def namespace(self, namespace:str) -> list[tuple[Tag, int]]:
+        """ (tag, count) of `namespace` itself, and all tags under it """
+        normed = self.norm_tag(namespace)
+        result = [(normed, count)] if bool(count:=self.get_count(normed)) else []
+        return result + self.completions(normed + self.sep)
+
+    def children(self, namespace:str="") -> dict[str, int]:
+        """
+        The immediate sub-namespaces of `namespace`, with their aggregated counts.
+        eg: children("ai") -> {"ai_planning": 10, "ai_ethics": 5}
+        """
+        normed = self.norm_tag(namespace)
+        prefix = normed + self.sep if bool(normed) else ""
+        node   = self._find(prefix)
+        if node is None:
+            return {}
+
+        results = {}
+        stack   = [(prefix + char, child) for char, child in node.children.items()]
+        while bool(stack):
+            tag, node = stack.pop()
+            sub       = node.children.get(self.sep, None)
+            if node.terminal or sub is not None:
+                # the total of this namespace, excluding longer tags that only share a prefix
+                results[tag] = node.count + (0 if sub is None else sub.total)
+            stack.extend((tag + char, child) for char, child in node.children.items() if char != self.sep)
+
+        return results
+
+    def files_for(self, prefix:str) -> set:
+        """ The union of the data of all tags starting with `prefix` """
+        results = set()
+        for tag, _ in self.completions(prefix):
+            results.update(self.get_data(tag))
+        return results
+
+    def _find(self, prefix:str) -> None|TrieNode:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char, None)
+            if node is None:
+                return None
+        return node
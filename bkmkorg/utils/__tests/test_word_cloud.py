@@ -0,0 +1,88 @@
+#https://docs.python.org/3/library/unittest.html
+# https://docs.python.org/3/library/unittest.mock.html
+
+import importlib.util
+import logging as logmod
+import pathlib as pl
+import sys
+import tempfile
+import types
+import unittest
+import unittest.mock as mock
+
+from bkmkorg.utils.word_cloud import (CLOUD_ARGS, CloudLayoutCache,
+                                      cloud_layout, frequency_hash)
+
+has_wordcloud = importlib.util.find_spec("wordcloud") is not None
+
+class StubCloud:
+    """ Lays out each word at the origin, counting layouts """
+    generated = 0
+
+    def __init__(self, **kwargs):
+        self.layout_ = None
+
+    def generate_from_frequencies(self, freqs):
+        StubCloud.generated += 1
+        self.layout_ = [((word, 1.0), count, (0, 0), None, "black") for word, count in sorted(freqs.items())]
+        return self
+
+class TestWordCloudCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        logmod.getLogger('').setLevel(logmod.ERROR)
+
+    def setUp(self):
+        self.tmp   = tempfile.TemporaryDirectory()
+        self.cache = CloudLayoutCache(pl.Path(self.tmp.name) / "clouds")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_frequency_hash(self):
+        key = frequency_hash({"ai": 2, "games": 1}, CLOUD_ARGS)
+        self.assertEqual(key, frequency_hash({"games": 1, "ai": 2, "empty": 0}, CLOUD_ARGS))
+        self.assertNotEqual(key, frequency_hash({"ai": 3, "games": 1}, CLOUD_ARGS))
+        self.assertNotEqual(key, frequency_hash({"ai": 2, "games": 1}, {**CLOUD_ARGS, "width": 640}))
+
+    def test_cache_miss_then_hit(self):
+        key    = frequency_hash({"ai": 2}, CLOUD_ARGS)
+        layout = [(("ai", 1.0), 50, (0, 0), None, "black")]
+        self.assertNotIn(key, self.cache)
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, layout)
+        self.assertIn(key, self.cache)
+        self.assertEqual(self.cache.get(key), layout)
+
+    def test_put_leaves_no_partial_files(self):
+        self.cache.put("key", [1, 2, 3])
+        self.assertEqual([x.name for x in self.cache.root.iterdir()], [f"key{self.cache.ext}"])
+
+    def test_cloud_layout_stubbed(self):
+        freqs = {"ai": 3, "games": 2, "unused": 0}
+        with mock.patch.dict(sys.modules, {"wordcloud": types.SimpleNamespace(WordCloud=StubCloud)}):
+            StubCloud.generated = 0
+            first, cached  = cloud_layout(freqs, CLOUD_ARGS, self.cache)
+            self.assertFalse(cached)
+            second, cached = cloud_layout(freqs, CLOUD_ARGS, self.cache)
+            self.assertTrue(cached)
+
+        self.assertEqual(StubCloud.generated, 1)
+        self.assertEqual(second.layout_, first.layout_)
+        self.assertEqual([x[0][0] for x in second.layout_], ["ai", "games"])
+
+    def test_bad_cache_entry_is_a_miss(self):
+        (self.cache.root / f"bad{self.cache.ext}").write_bytes(b"not a pickle")
+        self.assertIsNone(self.cache.get("bad"))
+
+    @unittest.skipUnless(has_wordcloud, "wordcloud not installed")
+    def test_cloud_layout_cached(self):
+        params         = {**CLOUD_ARGS, "width": 200, "height": 200}
+        freqs          = {"ai": 3, "games": 2, "play": 1}
+        first, cached  = cloud_layout(freqs, params, self.cache)
+        self.assertFalse(cached)
+        second, cached = cloud_layout(freqs, params, self.cache)
+        self.assertTrue(cached)
+        self.assertEqual(second.layout_, first.layout_)
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 """
+Headless, batch word cloud rendering of tag frequencies.
 
+Layouts are the expensive part, so they are cached on disk,
+keyed by a hash of the frequency table and the layout parameters.
+Rendering uses matplotlib's Agg canvas directly, never pyplot,
+so it is safe in worker processes without a display.
+wordcloud and matplotlib are only imported when a cloud is laid out or rendered.
 """
 ##-- imports
 from __future__ import annotations
@@ -19,47 +25,133 @@ from uuid import UUID, uuid1
 from weakref import ref
 
 if TYPE_CHECKING:
-    pass
+    from wordcloud import WordCloud
 ##-- end imports
 
 ##-- logging
 logging = logmod.getLogger(__name__)
 ##-- end logging
 
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
-from wordcloud import WordCloud
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def getFrequencyDictForText(lines):
-    tmpDict = {}
+from bkmkorg.formats.tagfile import TagFile
 
-    # making dict for counting frequencies
-    for line in lines:
-        vals = line.split(":")
-        if len(vals) < 2:
-            continue
+CLOUD_ARGS : Final = {
+    "background_color" : "white",
+    "max_words"        : 500,
+    "width"            : 1280,
+    "height"           : 1280,
+    "scale"            : 1,
+    "collocations"     : False,
+    "random_state"     : 0,
+}
+
+DPI : Final = 100
+
+def frequency_hash(freqs:Mapping[str, int], params:dict) -> str:
+    """ A stable hash of a frequency table, and the parameters it is laid out with """
+    hasher = hashlib.sha256()
+    hasher.update(repr(sorted(params.items())).encode())
+    for tag in sorted(freqs):
+        if bool(freqs[tag]):
+            hasher.update(f"{tag}\t{freqs[tag]}\n".encode())
+    return hasher.hexdigest()
+
+@dataclass
+class CloudLayoutCache:
+    """ Pickled WordCloud layouts, one file per frequency hash """
+
+    root : pl.Path = field()
+    ext  : str     = field(default=".layout")
+
+    def __post_init__(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def __contains__(self, key:str) -> bool:
+        return (self.root / f"{key}{self.ext}").exists()
+
+    def get(self, key:str) -> None|list:
+        target = self.root / f"{key}{self.ext}"
+        if not target.exists():
+            return None
         try:
-            tmpDict[vals[0].strip()] = int(vals[1])
-        except IndexError as err:
-            breakpoint()
-
-    return tmpDict
-
-def makeImage(text:dict[str,int], output:None|pl.Path=None):
-    wc = WordCloud(background_color="white",
-                   max_words=500,
-                   width=1280,
-                   height=1280,
-                   scale=1,
-                   collocations=False,
-                   )
-    # generate word cloud
-    wc.generate_from_frequencies(text)
-
-    if output is not None:
-        plt.savefig(str(output))
-    # show
-    plt.imshow(wc, interpolation="bilinear")
-    plt.axis("off")
-    plt.show()
+            return pickle.loads(target.read_bytes())
+        except (pickle.UnpicklingError, EOFError) as err:
+            logging.warning("Bad Cached Layout %s : %s", target, err)
+            return None
+
+    def put(self, key:str, layout:list):
+        # write then rename, so concurrent workers never read a partial layout
+        target = self.root / f"{key}{self.ext}"
+        temp   = target.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_bytes(pickle.dumps(layout))
+        temp.replace(target)
+
+def cloud_layout(freqs:Mapping[str, int], params:None|dict=None, cache:None|CloudLayoutCache=None) -> tuple[WordCloud, bool]:
+    """
+    A WordCloud with its layout generated, or restored from the cache.
+    Returns the cloud and whether the layout was cached
+    """
+    from wordcloud import WordCloud
+
+    params = params or CLOUD_ARGS
+    cloud  = WordCloud(**params)
+    key    = frequency_hash(freqs, params)
+    if cache is not None and (layout:=cache.get(key)) is not None:
+        cloud.layout_ = layout
+        return cloud, True
+
+    cloud.generate_from_frequencies({x: y for x, y in freqs.items() if bool(y)})
+    if cache is not None:
+        cache.put(key, cloud.layout_)
+
+    return cloud, False
+
+def render_cloud(freqs:Mapping[str, int], output:pl.Path, title:None|str=None, cache_dir:None|pl.Path=None, params:None|dict=None) -> bool:
+    """ Render a single word cloud to an image file. Returns whether the layout was cached """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    params        = params or CLOUD_ARGS
+    cache         = CloudLayoutCache(cache_dir) if cache_dir is not None else None
+    cloud, cached = cloud_layout(freqs, params, cache)
+
+    size   = (params['width'] / DPI, params['height'] / DPI)
+    fig    = Figure(figsize=size, dpi=DPI)
+    canvas = FigureCanvasAgg(fig)
+    axis   = fig.add_axes([0, 0, 1, 1])
+    axis.imshow(cloud.to_array(), interpolation="bilinear")
+    axis.axis("off")
+    if title is not None:
+        axis.set_title(title, loc="left")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(str(output), dpi=DPI)
+    return cached
+
+def render_clouds(jobs:Iterable[tuple[TagFile|Mapping[str, int], pl.Path, None|str]], workers:None|int=None, cache_dir:None|pl.Path=None, params:None|dict=None) -> int:
+    """
+    Render (frequencies, output, title) jobs in worker processes.
+    Returns the number of layouts restored from the cache
+    """
+    cached = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for freqs, output, title in jobs:
+            # TagFile counts are defaultdicts of lambdas, so send plain dicts to workers
+            counts = dict(freqs.counts if isinstance(freqs, TagFile) else freqs)
+            if not bool(counts):
+                continue
+            futures[pool.submit(render_cloud, counts, output, title, cache_dir, params)] = output
+
+        for future in as_completed(futures):
+            try:
+                cached += int(future.result())
+            except Exception as err:
+                logging.warning("Word Cloud Failed: %s : %s", futures[future], err)
+
+    logging.info("Word Clouds: %s rendered, %s cached layouts", len(futures), cached)
+    return cached